@@ -0,0 +1,143 @@
+# backend/admission.py
+import math
+import os
+import threading
+import time
+from collections import OrderedDict
+
+# --- Configuration ---
+# Limits are for the whole deployment; each worker process enforces its share
+# (the limit divided by WEB_CONCURRENCY, the number of gunicorn workers).
+WEB_CONCURRENCY = max(int(os.environ.get('WEB_CONCURRENCY', '1')), 1)
+INFERENCE_MAX_CONCURRENT = int(os.environ.get('INFERENCE_MAX_CONCURRENT', '8'))  # Generation requests in flight
+INFERENCE_MAX_WAITING = int(os.environ.get('INFERENCE_MAX_WAITING', '0'))  # Requests that may wait for a slot
+INFERENCE_MAX_WAIT_SECONDS = float(os.environ.get('INFERENCE_MAX_WAIT_SECONDS', '5'))
+RATE_LIMIT_PER_MINUTE = float(os.environ.get('RATE_LIMIT_PER_MINUTE', '60'))  # Per client; 0 disables
+RATE_LIMIT_BURST = int(os.environ.get('RATE_LIMIT_BURST', '20'))
+RATE_LIMIT_MAX_CLIENTS = int(os.environ.get('RATE_LIMIT_MAX_CLIENTS', '10000'))
+
+
+class AdmissionRejected(Exception):
+    """Raised when a request is turned away; carries the HTTP status and Retry-After seconds."""
+
+    def __init__(self, message: str, status_code: int, retry_after: int):
+        super().__init__(message)
+        self.status_code = status_code
+        self.retry_after = retry_after
+
+
+class InferenceSlot:
+    """A held slot of the ConcurrencyLimiter; release() is idempotent."""
+
+    def __init__(self, limiter: 'ConcurrencyLimiter'):
+        self._limiter = limiter
+        self._acquired_at = time.monotonic()
+        self._released = False
+        self._lock = threading.Lock()
+
+    def release(self) -> None:
+        with self._lock:
+            if self._released:
+                return
+            self._released = True
+        self._limiter._release(time.monotonic() - self._acquired_at)
+
+
+class ConcurrencyLimiter:
+    """
+    Caps the generation requests in flight. Beyond the limit a request may wait (up to
+    max_waiting requests, for at most max_wait_seconds); otherwise it is rejected at once,
+    so accepted requests keep a bounded latency instead of all of them slowing down.
+    """
+
+    def __init__(self, limit: int, max_waiting: int = 0, max_wait_seconds: float = 0.0):
+        self.limit = max(limit, 1)
+        self.max_waiting = max_waiting
+        self.max_wait_seconds = max_wait_seconds
+        self.in_flight = 0
+        self.waiting = 0
+        self.rejected = 0
+        self._average_hold_seconds = None
+        self._condition = threading.Condition()
+
+    def try_acquire(self) -> InferenceSlot:
+        """
+        Returns a slot to release when the request is done.
+
+        Raises:
+            AdmissionRejected: (503) if no slot frees up in time.
+        """
+        with self._condition:
+            if self.in_flight >= self.limit and self.waiting < self.max_waiting:
+                self.waiting += 1
+                try:
+                    self._condition.wait_for(lambda: self.in_flight < self.limit, timeout=self.max_wait_seconds)
+                finally:
+                    self.waiting -= 1
+            if self.in_flight >= self.limit:
+                self.rejected += 1
+                raise AdmissionRejected("The server is at its inference capacity. Please retry later.", 503,
+                                        self.retry_after())
+            self.in_flight += 1
+        return InferenceSlot(self)
+
+    def _release(self, held_seconds: float) -> None:
+        with self._condition:
+            self.in_flight -= 1
+            # Moving average of how long a request holds its slot, for Retry-After
+            self._average_hold_seconds = held_seconds if self._average_hold_seconds is None \
+                else 0.8 * self._average_hold_seconds + 0.2 * held_seconds
+            self._condition.notify()
+
+    def retry_after(self) -> int:
+        return max(math.ceil(self._average_hold_seconds or 1.0), 1)
+
+    def stats(self) -> dict:
+        with self._condition:
+            return {"in_flight": self.in_flight, "limit": self.limit, "waiting": self.waiting,
+                    "rejected": self.rejected, "saturated": self.in_flight >= self.limit}
+
+
+class RateLimiter:
+    """Token bucket per client key: `per_minute` requests on average, bursts up to `burst`."""
+
+    def __init__(self, per_minute: float, burst: int, max_clients: int = RATE_LIMIT_MAX_CLIENTS):
+        self.rate_per_second = per_minute / 60.0
+        self.burst = max(burst, 1)
+        self.max_clients = max_clients
+        self._buckets = OrderedDict()  # client -> (tokens, updated_at); least recently seen first
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return self.rate_per_second > 0
+
+    def check(self, client: str) -> None:
+        """
+        Takes one token from the client's bucket.
+
+        Raises:
+            AdmissionRejected: (429) if the bucket is empty.
+        """
+        if not self.enabled:
+            return
+        now = time.monotonic()
+        with self._lock:
+            tokens, updated_at = self._buckets.pop(client, (float(self.burst), now))
+            tokens = min(self.burst, tokens + (now - updated_at) * self.rate_per_second)
+            allowed = tokens >= 1
+            if allowed:
+                tokens -= 1
+            self._buckets[client] = (tokens, now)
+            while len(self._buckets) > self.max_clients:
+                self._buckets.popitem(last=False)
+        if not allowed:
+            retry_after = max(math.ceil((1 - tokens) / self.rate_per_second), 1)
+            raise AdmissionRejected("Too many requests from this client. Please slow down.", 429, retry_after)
+
+
+# Shared instances used by app.py, sized to this worker's share of the deployment limits
+inference_limiter = ConcurrencyLimiter(max(INFERENCE_MAX_CONCURRENT // WEB_CONCURRENCY, 1),
+                                       max_waiting=INFERENCE_MAX_WAITING // WEB_CONCURRENCY,
+                                       max_wait_seconds=INFERENCE_MAX_WAIT_SECONDS)
+rate_limiter = RateLimiter(RATE_LIMIT_PER_MINUTE / WEB_CONCURRENCY, max(RATE_LIMIT_BURST // WEB_CONCURRENCY, 1))
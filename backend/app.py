@@ -1,168 +1,1171 @@
-from flask import Flask, request, jsonify
+from flask import Flask, request, jsonify, Response, stream_with_context, make_response, send_file
+from werkzeug.middleware.proxy_fix import ProxyFix
 from werkzeug.utils import secure_filename
+import io
+import json
 import os
-import shutil
+import posixpath
+import re
+import time
+import uuid
+import zipfile
+from functools import partial, wraps
 
 # Import our custom modules
 import file_processor
 import prompt_builder
 import llm_service
+import generation_cache
+import parallel_generator
+import job_queue
+import code_chunker
+import import_index
+import incremental_store
+import timing
+import script_validator
+import metrics
+import ollama_pool
+import admission
+import source_selector
 
 app = Flask(__name__)
+app.request_class = file_processor.SpooledUploadRequest  # Zip uploads stay in memory up to ZIP_SPOOL_MAX_BYTES
 
-# --- Configuration Change for UPLOAD_FOLDER ---
-# Get the project root directory (which is one level up from 'backend')
-project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-# Define UPLOAD_FOLDER to be at the project root level, e.g., Test-Generator/temp_user_uploads/
-UPLOAD_FOLDER = os.path.join(project_root, 'temp_user_uploads')
-
-os.makedirs(UPLOAD_FOLDER, exist_ok=True)  # Ensure this new directory exists
-app.config['UPLOAD_FOLDER'] = UPLOAD_FOLDER
+# Uploads are read in memory (see file_processor), never saved under a shared path
 app.config['MAX_CONTENT_LENGTH'] = 16 * 1024 * 1024  # 16MB upload limit
 ALLOWED_EXTENSIONS = {'txt', 'py', 'js', 'java', 'cs', 'go', 'rb', 'ts', 'zip', 'jsx', 'tsx'}
 
+# Preload the model on every Ollama endpoint when the server starts
+OLLAMA_WARM_UP = os.environ.get('OLLAMA_WARM_UP', 'true').strip().lower() in ('true', '1', 'yes', 'on')
+
+# Reverse proxies in front of the app. Each appends the address it got the request from to
+# X-Forwarded-For, so the client is the entry this many hops from the right; entries further
+# left are set by the client itself and are never trusted.
+TRUSTED_PROXY_COUNT = int(os.environ.get('TRUSTED_PROXY_COUNT', '0'))
+if TRUSTED_PROXY_COUNT > 0:
+    app.wsgi_app = ProxyFix(app.wsgi_app, x_for=TRUSTED_PROXY_COUNT)
+
+# Client-supplied X-Request-ID values are reused only if they look like an id
+REQUEST_ID_PATTERN = re.compile(r"^[A-Za-z0-9._:-]{1,128}$")
+
+# Limits of one /api/batch-generate request
+BATCH_MAX_TARGETS = int(os.environ.get('BATCH_MAX_TARGETS', '8'))  # (language, framework) pairs
+BATCH_MAX_UNITS = int(os.environ.get('BATCH_MAX_UNITS', '2000'))  # Generation units over all files and targets
+# Units of one batch on the shared LLM worker pool at a time, so other requests keep getting through
+BATCH_MAX_IN_FLIGHT = int(os.environ.get('BATCH_MAX_IN_FLIGHT') or parallel_generator.LLM_REQUEST_MAX_IN_FLIGHT)
+
+# The language of a source file, by extension; batch targets only apply to files of their language
+SOURCE_LANGUAGES = {'.py': 'python', '.js': 'javascript', '.jsx': 'javascript', '.ts': 'typescript',
+                    '.tsx': 'typescript', '.java': 'java', '.cs': 'csharp', '.go': 'go', '.rb': 'ruby'}
+LANGUAGE_ALIASES = {'py': 'python', 'js': 'javascript', 'ts': 'typescript', 'c#': 'csharp', 'cs': 'csharp',
+                    'golang': 'go', 'rb': 'ruby'}
+
+# File extension of generated test files in batch bundles; other languages keep the source's extension
+TEST_FILE_EXTENSIONS = {'python': '.py', 'javascript': '.js', 'typescript': '.ts', 'java': '.java',
+                        'csharp': '.cs', 'go': '.go', 'ruby': '.rb'}
+
+
+# --- Metrics read at scrape time ---
+def _generation_cache_lookups():
+    stats = generation_cache.default_cache.stats()
+    return {("memory_hit",): stats["hits"] - stats["disk_hits"], ("disk_hit",): stats["disk_hits"],
+            ("miss",): stats["misses"]}
+
+
+def _generation_cache_evictions():
+    stats = generation_cache.default_cache.stats()
+    return {("memory",): stats["evictions"], ("disk",): stats["disk_evictions"]}
+
+
+metrics.CallbackMetric('testgen_generation_cache_lookups_total', "Generation cache lookups by result.",
+                       _generation_cache_lookups, ('result',), type_name='counter')
+metrics.CallbackMetric('testgen_generation_cache_evictions_total', "Generation cache entries evicted, by tier.",
+                       _generation_cache_evictions, ('tier',), type_name='counter')
+metrics.CallbackMetric('testgen_generation_cache_entries', "Entries in the in-memory generation cache.",
+                       lambda: generation_cache.default_cache.stats()["entries"])
+metrics.CallbackMetric('testgen_job_queue_depth', "Jobs waiting for a worker.", job_queue.default_queue.depth)
+metrics.CallbackMetric('testgen_jobs_running', "Jobs currently being generated.", job_queue.default_queue.running)
+metrics.CallbackMetric('testgen_inference_in_flight', "Generation requests holding an inference slot.",
+                       lambda: admission.inference_limiter.stats()["in_flight"])
+metrics.CallbackMetric('testgen_inference_limit', "Inference slots of this worker.",
+                       lambda: admission.inference_limiter.limit)
+metrics.CallbackMetric('testgen_ollama_endpoint_in_flight', "Calls in flight per Ollama endpoint.",
+                       lambda: {(e["host"],): e["in_flight"] for e in ollama_pool.default_pool.stats()}, ('endpoint',))
+metrics.CallbackMetric('testgen_ollama_endpoint_healthy', "1 if the Ollama endpoint is in rotation.",
+                       lambda: {(e["host"],): int(e["healthy"]) for e in ollama_pool.default_pool.stats()}, ('endpoint',))
+
 
 def allowed_file(filename):
     return '.' in filename and \
         filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
 
 
+def use_generation_cache():
+    """
+    Returns False if the client asked to bypass the generation cache, either with
+    the form field useCache=false or the header 'Cache-Control: no-cache'.
+    """
+    if request.form.get('useCache', 'true').strip().lower() in ('false', '0', 'no', 'off'):
+        return False
+    return 'no-cache' not in request.headers.get('Cache-Control', '').lower()
+
+
+def client_key():
+    """Identifies the client for per-client rate limiting (behind TRUSTED_PROXY_COUNT proxies, see ProxyFix)."""
+    return request.remote_addr or 'unknown'
+
+
+def admission_controlled(inference=True):
+    """
+    Route decorator: applies the per-client rate limit and, for routes that run
+    inference in the request, holds a slot of the global inference limiter until the
+    response (including a streamed one) is closed. Rejections are answered at once with
+    429 (rate limit) or 503 (capacity) and a Retry-After header.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            try:
+                admission.rate_limiter.check(client_key())
+                slot = admission.inference_limiter.try_acquire() if inference else None
+            except admission.AdmissionRejected as rejected:
+                metrics.ADMISSION_REJECTIONS.inc(reason='rate_limit' if rejected.status_code == 429 else 'capacity')
+                print(f"Rejected {request.path} with {rejected.status_code}: {rejected}", flush=True)
+                return jsonify({"error": str(rejected)}), rejected.status_code, {"Retry-After": str(rejected.retry_after)}
+            if slot is None:
+                return view(*args, **kwargs)
+            try:
+                response = make_response(view(*args, **kwargs))
+            except Exception:
+                slot.release()
+                raise
+            response.call_on_close(slot.release)
+            return response
+        return wrapper
+    return decorator
+
+
+def build_module_units(code, source_filename, module_name, language, framework, user_instructions, group=None,
+                       context_stubs=None, full_context_tokens=None):
+    """
+    Turns one module into generation units. Modules over code_chunker.CHUNK_TOKEN_BUDGET
+    are split into chunks of functions/classes, one unit (prompt messages) per chunk.
+    All units of the module share the same 'group' so their tests can be stitched together.
+
+    When full_context_tokens is given (modules of a zip), the prompts carry only the
+    context_stubs of what the module imports and each unit records the token savings.
+    """
+    group = group or module_name
+    chunks = code_chunker.chunk_source(code, source_filename)
+    units = []
+    for index, chunk in enumerate(chunks, start=1):
+        prompt_kwargs = {
+            "language": language,
+            "test_framework": framework,
+            "user_instructions": user_instructions,
+            "focus_symbols": chunk["symbols"],
+        }
+        unit = {
+            "name": group if len(chunks) == 1 else f"{group} [chunk {index}/{len(chunks)}]",
+            "group": group,
+            "module_name": module_name,
+            "symbols": chunk["symbols"],
+            "source_path": source_filename,
+        }
+        if full_context_tokens is None:
+            unit["messages"] = prompt_builder.construct_llm_messages(chunk["code"], module_name, **prompt_kwargs)
+        else:
+            unit["messages"], unit["context"] = prompt_builder.construct_llm_messages_with_context(
+                chunk["code"], module_name, context_stubs, full_context_tokens, **prompt_kwargs)
+        units.append(unit)
+    return units
+
+
+def build_per_file_units(code_files, language, framework, user_instructions, index=None):
+    """
+    Turns each (relative_path, content) of a zip into its own generation unit(s).
+    An import_index.UploadIndex over the whole zip supplies each module with stubs of
+    the uploaded symbols it imports, instead of the full source of every other file;
+    pass `index` to reuse one built for the same files.
+    """
+    index = index or import_index.UploadIndex(code_files)
+    file_tokens = {relative_path: code_chunker.estimate_tokens(content) for relative_path, content in code_files}
+    total_tokens = sum(file_tokens.values())
+
+    units = []
+    for relative_path, content in code_files:
+        file_module_name, _ = os.path.splitext(os.path.basename(relative_path))
+        units.extend(build_module_units(content, relative_path, file_module_name, language, framework,
+                                        user_instructions, group=relative_path,
+                                        context_stubs=index.context_stubs(relative_path),
+                                        full_context_tokens=total_tokens - file_tokens[relative_path]))
+    return units
+
+
+def run_grouped_generation(units, language, use_cache, on_unit_done=None, should_cancel=None, validation=None):
+    """
+    Generates all units in parallel, then stitches the results of each group (module)
+    into one test script with code_chunker.merge_test_scripts.
+
+    With validation ({"framework", "sources"}, see validation_options), the unit scripts
+    are checked and run first, and failing ones are repaired by script_validator.
+
+    Returns a list of per-group dicts, in first-seen order, with 'name', 'module_name',
+    'generated_script', 'error', 'cache', 'chunks', 'context', 'validation' and 'elapsed_seconds'.
+    """
+    with timing.stage('llm'):
+        results = parallel_generator.generate_for_units(units, use_cache=use_cache, on_unit_done=on_unit_done,
+                                                        should_cancel=should_cancel)
+
+    if validation is not None:
+        with timing.stage('validate'):
+            script_validator.validate_and_repair(
+                units, results, language, validation["framework"], validation["sources"],
+                regenerate=lambda repair_units: parallel_generator.generate_for_units(
+                    repair_units, use_cache=use_cache, should_cancel=should_cancel),
+                should_cancel=should_cancel)
+
+    with timing.stage('post_process'):
+        return _stitch_groups(units, results, language)
+
+
+def _stitch_groups(units, results, language):
+    grouped = {}
+    for unit, result in zip(units, results):
+        grouped.setdefault(unit["group"], []).append((unit, result))
+
+    group_results = []
+    for group, members in grouped.items():
+        scripts = [result["generated_script"] for _, result in members if result["generated_script"]]
+        errors = [f"{unit['name']}: {result['error']}" if len(members) > 1 else result["error"]
+                  for unit, result in members if result["error"]]
+        cache_statuses = {result["cache"] for _, result in members if result["cache"]}
+        group_results.append({
+            "name": group,
+            "module_name": members[0][0]["module_name"],
+            "generated_script": code_chunker.merge_test_scripts(scripts, language) if scripts else None,
+            "error": "; ".join(errors) if errors else None,
+            "cache": cache_statuses.pop() if len(cache_statuses) == 1 else ("mixed" if cache_statuses else None),
+            "chunks": len(members),
+            "context": members[0][0].get("context"),
+            "validation": script_validator.merge_validations([result.get("validation") for _, result in members]),
+            "elapsed_seconds": max(result["elapsed_seconds"] for _, result in members),
+        })
+    return group_results
+
+
+def run_per_file_generation(units, filename, language, use_cache, on_unit_done=None, should_cancel=None,
+                            validation=None):
+    """
+    Generates tests for every file of a zip in parallel and merges the per-file results.
+
+    Returns the response data dict; its 'succeeded' field counts the files that got a script.
+    """
+    started = time.perf_counter()
+    print(f"Sending {len(units)} per-file prompts to LLM service...", flush=True)
+    group_results = run_grouped_generation(units, language, use_cache, on_unit_done, should_cancel, validation)
+
+    files = [
+        {
+            "path": group["name"],
+            "module_name": group["module_name"],
+            "generated_script": group["generated_script"],
+            "error": group["error"],
+            "cache": group["cache"],
+            "chunks": group["chunks"],
+            "context": group["context"],
+            "validation": group["validation"],
+            "elapsed_seconds": group["elapsed_seconds"],
+        }
+        for group in group_results
+    ]
+
+    succeeded = sum(1 for f in files if f["generated_script"])
+    print(f"Per-file generation finished: {succeeded}/{len(files)} files succeeded.", flush=True)
+    data = {
+        "generated_script": parallel_generator.merge_unit_scripts(group_results, language),
+        "original_filename": filename,
+        "upload_type": "zip",
+        "zip_mode": "per_file",
+        "files": files,
+        "succeeded": succeeded,
+        "context_tokens_saved": sum(f["context"]["tokens_saved"] for f in files if f["context"]),
+        "total_elapsed_seconds": round(time.perf_counter() - started, 3)
+    }
+    if validation is not None:
+        data["validation_summary"] = script_validator.summarize(files)
+    return data
+
+
+def run_single_generation(units, form, use_cache, on_unit_done=None, should_cancel=None, validation=None):
+    """
+    Generates tests for one module (possibly split into several chunks).
+    Returns the response data dict, or None if the LLM failed for every chunk.
+    """
+    print(f"Sending {len(units)} prompt(s) to LLM service...", flush=True)
+    module_result = run_grouped_generation(units, form["language"], use_cache, on_unit_done, should_cancel,
+                                           validation)[0]
+    if not module_result["generated_script"]:
+        return None
+    print("LLM script generation successful.", flush=True)
+    data = {
+        "generated_script": module_result["generated_script"],
+        "original_filename": form["filename"],
+        "upload_type": form["upload_type"],
+        "cache": module_result["cache"]
+    }
+    if module_result["chunks"] > 1:
+        data["chunks"] = module_result["chunks"]
+        data["chunk_errors"] = module_result["error"]
+    if module_result["validation"] is not None:
+        data["validation"] = module_result["validation"]
+    return data
+
+
+def prepare_incremental_generation(form, code_to_process):
+    """
+    Fingerprints the module's units against the previous upload of the same module and
+    builds one unit (prompt) per function/class that was added or changed.
+    Returns None if the module has no functions or classes to track.
+    """
+    fingerprinted = incremental_store.fingerprint_module(code_to_process, form["filename"])
+    if not fingerprinted["units"]:
+        return None
+
+    module_key = incremental_store.make_module_key(form["incremental_key"], form["language"], form["framework"],
+                                                   form["instructions"], llm_service.DEEPSEEK_MODEL_TAG)
+    regeneration = incremental_store.plan_regeneration(fingerprinted, incremental_store.default_store.load(module_key))
+    print(f"Incremental: reusing {len(regeneration['reuse'])} unit(s), regenerating {len(regeneration['regenerate'])}.",
+          flush=True)
+
+    units_by_name = {unit["name"]: unit for unit in fingerprinted["units"]}
+    preamble = fingerprinted["preamble"].rstrip()
+    units = []
+    for name in regeneration["regenerate"]:
+        unit_code = units_by_name[name]["code"]
+        units.append({
+            "name": name,
+            "group": name,
+            "module_name": form["module_name"],
+            "symbols": [name],
+            "source_path": form["filename"],
+            "messages": prompt_builder.construct_llm_messages(
+                code_snippet=f"{preamble}\n\n\n{unit_code}" if preamble else unit_code,
+                module_name_to_test=form["module_name"],
+                language=form["language"],
+                test_framework=form["framework"],
+                user_instructions=form["instructions"],
+                focus_symbols=[name]
+            ),
+        })
+    return {
+        "mode": "incremental",
+        "units": units,
+        "module_key": module_key,
+        "fingerprinted": fingerprinted,
+        "regeneration": regeneration,
+    }
+
+
+def run_incremental_generation(plan, form, use_cache, on_unit_done=None, should_cancel=None, validation=None):
+    """
+    Generates tests only for the changed units, reuses the stored test blocks of the
+    unchanged ones and stitches everything (in source order) into one test module.
+    Returns the response data dict, or None if no test block is available at all.
+    """
+    regeneration = plan["regeneration"]
+    test_blocks = dict(regeneration["reuse"])
+    failed = []
+    validations = {}
+    if plan["units"]:
+        print(f"Sending {len(plan['units'])} changed unit(s) to LLM service...", flush=True)
+        for result in run_grouped_generation(plan["units"], form["language"], use_cache, on_unit_done, should_cancel,
+                                             validation):
+            if result["validation"] is not None:
+                validations[result["name"]] = result["validation"]
+            if result["generated_script"]:
+                test_blocks[result["name"]] = result["generated_script"]
+            else:
+                failed.append(result["name"])
+    elif on_unit_done is not None:
+        on_unit_done(1, 1)
+
+    if not (should_cancel and should_cancel()):
+        incremental_store.default_store.save(plan["module_key"], plan["fingerprinted"], test_blocks)
+
+    ordered_blocks = [test_blocks[unit["name"]] for unit in plan["fingerprinted"]["units"] if unit["name"] in test_blocks]
+    if not ordered_blocks:
+        return None
+    data = {
+        "generated_script": code_chunker.merge_test_scripts(ordered_blocks, form["language"]),
+        "original_filename": form["filename"],
+        "upload_type": form["upload_type"],
+        "incremental": {
+            "reused": sorted(regeneration["reuse"]),
+            "regenerated": [name for name in regeneration["regenerate"] if name not in failed],
+            "failed": failed,
+            "removed": regeneration["removed"],
+        }
+    }
+    if validation is not None:
+        data["validation"] = validations  # Only the regenerated units are validated
+    return data
+
+
+@app.before_request
+def start_request_timer():
+    request_id = request.headers.get('X-Request-ID', '')
+    if not REQUEST_ID_PATTERN.match(request_id):
+        request_id = uuid.uuid4().hex
+    timing.start_request(request_id)
+
+
+@app.after_request
+def record_request_timing(response):
+    """
+    Adds the X-Request-ID and Server-Timing headers, records metrics and logs the request's
+    spans. A streamed body (SSE, ndjson) is generated after this hook, so for those the
+    timer stays bound while the body is iterated and the request is recorded when the
+    response is closed; their Server-Timing header only covers the work before the body.
+    """
+    timer = timing.end_request()
+    if timer is None:
+        return response
+    response.headers['X-Request-ID'] = timer.request_id
+    response.headers['Server-Timing'] = timer.server_timing_header()
+
+    endpoint = request.url_rule.rule if request.url_rule else 'unmatched'
+    finish = partial(finish_request_timing, timer, endpoint, request.method, request.path, response.status_code)
+    if response.is_streamed:
+        response.response = timing.bind_iterable(response.response, timer)
+        response.call_on_close(finish)
+    else:
+        finish()
+    return response
+
+
+def finish_request_timing(timer, endpoint, method, path, status):
+    """Records the request's duration and stage metrics and logs its spans."""
+    metrics.REQUESTS.inc(endpoint=endpoint, method=method, status=status)
+    metrics.REQUEST_DURATION.observe(timer.total_seconds(), endpoint=endpoint)
+    for stage_name, seconds in timer.stages.items():
+        metrics.STAGE_DURATION.observe(seconds, stage=stage_name)
+
+    if endpoint.startswith('/api/'):  # Keep health checks and scrapes out of the log
+        log_line = {"event": "request", "method": method, "path": path, "status": status, **timer.to_log_dict()}
+        print(json.dumps(log_line), flush=True)
+
+
 @app.route('/', methods=['GET'])
 def index():
     print("--- Root / route HIT ---", flush=True)
     return "Flask backend is running (ready for API calls)!"
 
 
-@app.route('/api/upload-and-generate', methods=['POST'])
-def upload_and_generate_tests_route():
-    print("--- Request received at /api/upload-and-generate endpoint ---", flush=True)
-    original_file_path_for_cleanup = None
+def parse_upload_form():
+    """
+    Validates the multipart form shared by the generation endpoints.
 
-    try:
-        if 'file' not in request.files:
-            return jsonify({"error": "No file part in the request"}), 400
+    Returns:
+        A dict with the uploaded file, its sanitized filename and module name, and the
+        generation options (language, framework, instructions, zip_mode, source_selector).
 
-        uploaded_file = request.files['file']
-        upload_type = request.form.get('uploadType')
+    Raises:
+        ValueError: With a client-facing message if the form is invalid.
+    """
+    if 'file' not in request.files:
+        raise ValueError("No file part in the request")
 
-        if uploaded_file.filename == '':
-            return jsonify({"error": "No file selected for upload"}), 400
+    uploaded_file = request.files['file']
+    upload_type = request.form.get('uploadType')
 
-        if not upload_type:
-            return jsonify({"error": "Missing 'uploadType' in form data"}), 400
+    if uploaded_file.filename == '':
+        raise ValueError("No file selected for upload")
 
-        if not (uploaded_file and allowed_file(uploaded_file.filename)):
-            return jsonify({"error": "File type not allowed"}), 400
+    if not upload_type:
+        raise ValueError("Missing 'uploadType' in form data")
 
-        filename = secure_filename(uploaded_file.filename)
-        # Extract module name (filename without extension)
-        module_name, _ = os.path.splitext(filename)  # Gets 'name of file' from 'name of file.py'
-        print(f"Processing file: {filename}, type: {upload_type}, module_name: {module_name}", flush=True)
+    if not (uploaded_file and allowed_file(uploaded_file.filename)):
+        raise ValueError("File type not allowed")
 
+    filename = secure_filename(uploaded_file.filename)
+    # Extract module name (filename without extension)
+    module_name, _ = os.path.splitext(filename)  # Gets 'name of file' from 'name of file.py'
+    print(f"Processing file: {filename}, type: {upload_type}, module_name: {module_name}", flush=True)
 
-        # file_processor will now use the updated app.config['UPLOAD_FOLDER']
-        code_to_process, original_file_path_for_cleanup = file_processor.handle_and_extract_code(
-            uploaded_file,
-            upload_type,
-            app.config['UPLOAD_FOLDER'],  # This is now the new path
-            filename
-        )
+    form = {
+        "uploaded_file": uploaded_file,
+        "upload_type": upload_type,
+        "filename": filename,
+        "module_name": module_name,
+        "language": request.form.get("language", "python").strip().lower(), # Get from form, default, sanitize
+        "framework": request.form.get("framework", "unittest").strip().lower(), # Get from form, default, sanitize
+        "instructions": request.form.get("instructions", None), #Optional
+        "zip_mode": request.form.get("zipMode", "combined").strip().lower(), # 'combined' or 'per_file'
+        # Single-file uploads only; zips with incremental=true are rejected
+        "incremental": request.form.get("incremental", "false").strip().lower() in ('true', '1', 'yes', 'on'),
+        "incremental_key": request.form.get("incrementalKey") or filename, # Identifies the module across uploads
+        "validate": request.form.get("validate", "false").strip().lower() in ('true', '1', 'yes', 'on'),
+        "source_selector": make_source_selector(),
+    }
+    print(f"Language: {form['language']}, Framework: {form['framework']}", flush=True) # For debugging
+    return form
 
-        language_preference = request.form.get("language", "python").strip().lower() # Get from form, default, sanitize
-        framework_preference = request.form.get("framework", "unittest").strip().lower() # Get from form, default, sanitize
-        user_specific_instructions = request.form.get("instructions", None) #Optional
 
-        print(f"Language: {language_preference}, Framework: {framework_preference}", flush=True) # For debugging
+def make_source_selector():
+    """Which files of a zip are used, from the includePatterns / excludePatterns / useGitignore form fields."""
+    return source_selector.SourceSelector(
+        include=source_selector.split_patterns(request.form.get("includePatterns")),  # One per line or comma-separated
+        exclude=source_selector.split_patterns(request.form.get("excludePatterns")),
+        use_gitignore=request.form.get("useGitignore", "true").strip().lower() in ('true', '1', 'yes', 'on'),
+    )
 
-        prompt = prompt_builder.construct_llm_prompt(
-            code_snippet=code_to_process,
-            module_name_to_test=module_name,  # Pass the extracted module name
-            language=language_preference,
-            test_framework=framework_preference,
-            user_instructions=user_specific_instructions
-        )
 
-        if code_to_process is None:
-            return jsonify({
-                               "error": "Failed to process or extract code from file. Check file_processor.py logs or file content."}), 500
+def read_upload_code(form):
+    """
+    Reads the code of a single-file upload, or of a zip joined into one string.
 
-        if not code_to_process.strip() and upload_type == 'zip':
-            print(f"No recognized code files found in zip: {filename}")
-            if original_file_path_for_cleanup and os.path.exists(original_file_path_for_cleanup) and os.path.isdir(
-                    original_file_path_for_cleanup):
-                shutil.rmtree(original_file_path_for_cleanup)
-            return jsonify({
-                               "error": f"No recognized code files were found inside '{filename}'. Please ensure your zip contains supported file types."}), 400
+    Raises ValueError if a zip holds no code.
+    """
+    code_to_process = file_processor.handle_and_extract_code(
+        form["uploaded_file"],
+        form["upload_type"],
+        form["filename"],
+        form["source_selector"]
+    )
 
-        print(f"Code extracted successfully. Length: {len(code_to_process)} chars.", flush=True)
+    if not code_to_process.strip() and form["upload_type"] == 'zip':
+        print(f"No recognized code files found in zip: {form['filename']}")
+        raise no_code_in_zip_error(form)
 
-        language_preference = request.form.get("language", "python")
-        framework_preference = request.form.get("framework", "unittest")
-        user_specific_instructions = request.form.get("instructions", None)
+    return code_to_process
 
-        prompt = prompt_builder.construct_llm_prompt(
-            code_snippet=code_to_process,
-            module_name_to_test=module_name,  # Pass the extracted module name
-            language=language_preference,
-            test_framework=framework_preference,
-            user_instructions=user_specific_instructions
-        )
 
-        print("Sending prompt to LLM service...", flush=True)
-        generated_script = llm_service.get_tests_from_deepseek(prompt)
+class NoCodeInUploadError(ValueError):
+    """No code is left in an upload; `skipped_files` says what the source selection left out."""
 
-        if original_file_path_for_cleanup and os.path.exists(original_file_path_for_cleanup):
-            try:
-                if os.path.isdir(original_file_path_for_cleanup):
-                    shutil.rmtree(original_file_path_for_cleanup)
-                    print(f"Cleaned up directory: {original_file_path_for_cleanup}", flush=True)
-                else:
-                    os.remove(original_file_path_for_cleanup)
-                    print(f"Cleaned up file: {original_file_path_for_cleanup}", flush=True)
-            except Exception as cleanup_err:
-                app.logger.error(f"Error during cleanup of '{original_file_path_for_cleanup}': {cleanup_err}",
-                                 exc_info=True)
-
-        if not generated_script:
+    def __init__(self, message, skipped_files):
+        super().__init__(message)
+        self.skipped_files = skipped_files
+
+
+def no_code_in_zip_error(form):
+    skipped = form["source_selector"].skipped
+    message = f"No recognized code files were found inside '{form['filename']}'. Please ensure your zip contains supported file types."
+    if skipped:
+        message += f" {len(skipped)} code file(s) were skipped by the source selection rules."
+    return NoCodeInUploadError(message, skipped)
+
+
+def bad_request_response(ve):
+    """The 400 response for a ValueError, with the skipped_files of an upload that had no code left."""
+    app.logger.error(f"ValueError: {str(ve)}", exc_info=True)
+    body = {"error": str(ve)}
+    if isinstance(ve, NoCodeInUploadError):
+        body["skipped_files"] = ve.skipped_files
+    return jsonify(body), 400
+
+
+def attach_skipped_files(data, form):
+    """Adds the zip's skipped_files ([{path, reason, detail}], see source_selector) to response data."""
+    if data is not None and form["upload_type"] == 'zip':
+        data["skipped_files"] = form["source_selector"].skipped
+    return data
+
+
+def build_messages(form, code_to_process):
+    return prompt_builder.construct_llm_messages(
+        code_snippet=code_to_process,
+        module_name_to_test=form["module_name"],  # Pass the extracted module name
+        language=form["language"],
+        test_framework=form["framework"],
+        user_instructions=form["instructions"]
+    )
+
+
+def prepare_generation(form):
+    """
+    Reads the upload and builds what has to be generated.
+
+    Returns:
+        {"mode": "per_file" or "single", "units": [...], "sources": {path: code}}, where
+        per_file is used for zips in per-file mode and single for everything else (one
+        module, maybe chunked). Incremental single-file uploads get {"mode": "incremental", ...}.
+        "sources" holds the uploaded files the generated tests can be run against.
+
+    Raises:
+        ValueError: If no code could be extracted from the upload, or incremental mode is
+            asked for with a zip (either zipMode); it is only supported for single files.
+    """
+    if form["incremental"] and form["upload_type"] != 'single':
+        raise ValueError("Incremental mode is only supported for single-file uploads.")
+
+    if form["upload_type"] == 'zip' and form["zip_mode"] == 'per_file':
+        with timing.stage('extract'):
+            code_files = file_processor.extract_zip_code_files(form["uploaded_file"], form["source_selector"])
+        if not code_files:
+            raise no_code_in_zip_error(form)
+        with timing.stage('prompt_build'):
+            return {
+                "mode": "per_file",
+                "units": build_per_file_units(code_files, form["language"], form["framework"], form["instructions"]),
+                "sources": dict(code_files),
+            }
+
+    with timing.stage('extract'):
+        code_to_process = read_upload_code(form)
+
+    print(f"Code extracted successfully. Length: {len(code_to_process)} chars.", flush=True)
+    # A combined zip is one joined string, not a module that can be imported
+    sources = {form["filename"]: code_to_process} if form["upload_type"] == 'single' else {}
+    with timing.stage('prompt_build'):
+        if form["incremental"]:
+            plan = prepare_incremental_generation(form, code_to_process)
+            if plan is not None:
+                plan["sources"] = sources
+                return plan
+        return {
+            "mode": "single",
+            "units": build_module_units(code_to_process, form["filename"], form["module_name"], form["language"],
+                                        form["framework"], form["instructions"]),
+            "sources": sources,
+        }
+
+
+def validation_options(form, plan):
+    """
+    The validation settings for run_grouped_generation, or None unless the form asked for validate=true.
+
+    Raises:
+        ValueError: If validation was asked for but script_validator.VALIDATION_ENABLED is off.
+    """
+    if not form["validate"]:
+        return None
+    if not script_validator.VALIDATION_ENABLED:
+        raise ValueError("Test validation is not enabled on this server.")
+    return {"framework": form["framework"], "sources": plan["sources"]}
+
+
+@app.route('/api/upload-and-generate', methods=['POST'])
+@admission_controlled()
+def upload_and_generate_tests_route():
+    print("--- Request received at /api/upload-and-generate endpoint ---", flush=True)
+
+    try:
+        with timing.stage('save'):
+            form = parse_upload_form()
+        filename = form["filename"]
+        plan = prepare_generation(form)
+
+        validation = validation_options(form, plan)
+        if plan["mode"] == 'per_file':
+            data = attach_skipped_files(run_per_file_generation(plan["units"], filename, form["language"],
+                                                                use_generation_cache(), validation=validation), form)
+            if not data["succeeded"]:
+                return jsonify({
+                    "error": "LLM failed to generate a script for every file in the zip. Check llm_service.py logs.",
+                    "data": {"files": data["files"]}
+                }), 500
+
+            return jsonify({
+                "message": f"Successfully processed '{filename}' and generated tests for {data['succeeded']} of {len(plan['units'])} files.",
+                "data": data
+            }), 200
+
+        if plan["mode"] == 'incremental':
+            data = run_incremental_generation(plan, form, use_generation_cache(), validation=validation)
+        else:
+            data = run_single_generation(plan["units"], form, use_generation_cache(), validation=validation)
+        attach_skipped_files(data, form)
+
+        if data is None:
             return jsonify(
                 {"error": "LLM failed to generate script or returned empty. Check llm_service.py logs."}), 500
 
-        print("LLM script generation successful.", flush=True)
         return jsonify({
             "message": f"Successfully processed '{filename}' and generated tests.",
-            "data": {
-                "generated_script": generated_script,
-                "original_filename": filename,
-                "upload_type": upload_type
-            }
+            "data": data
         }), 200
 
     except ValueError as ve:
-        app.logger.error(f"ValueError: {str(ve)}", exc_info=True)
-        if original_file_path_for_cleanup and os.path.exists(original_file_path_for_cleanup):
-            try:
-                if os.path.isdir(original_file_path_for_cleanup):
-                    shutil.rmtree(original_file_path_for_cleanup)
-                else:
-                    os.remove(original_file_path_for_cleanup)
-            except Exception as cleanup_err:
-                app.logger.error(f"Error during cleanup after ValueError: {cleanup_err}", exc_info=True)
-        return jsonify({"error": str(ve)}), 400
+        return bad_request_response(ve)
+
+    except Exception as e:
+        app.logger.error(f"An unexpected internal server error occurred: {e}", exc_info=True)
+        return jsonify({"error": "An unexpected internal server error occurred. Please check backend logs."}), 500
+
+
+@app.route('/api/jobs', methods=['POST'])
+@admission_controlled(inference=False)  # Bounded by the job queue instead
+def submit_generation_job_route():
+    """
+    Queues a generation and returns immediately with a job id (202). Takes the same form
+    as /api/upload-and-generate. Identical submissions attach to the in-flight job.
+    """
+    print("--- Request received at /api/jobs endpoint ---", flush=True)
+
+    try:
+        with timing.stage('save'):
+            form = parse_upload_form()
+        plan = prepare_generation(form)
+        use_cache = use_generation_cache()
+        validation = validation_options(form, plan)
+
+        units = plan["units"]
+        # A cache-bypassing submission must not attach to a job that may answer from the cache
+        job_key = generation_cache.make_cache_key(
+            json.dumps([plan.get("module_key"), validation is not None, use_cache]
+                       + [unit["messages"] for unit in units]),
+            llm_service.DEEPSEEK_MODEL_TAG)
+
+        def work(job):
+            if plan["mode"] == 'per_file':
+                data = run_per_file_generation(units, form["filename"], form["language"], use_cache,
+                                               on_unit_done=job.report_progress,
+                                               should_cancel=lambda: job.cancel_requested, validation=validation)
+                if not data["succeeded"] and not job.cancel_requested:
+                    raise RuntimeError("LLM failed to generate a script for every file in the zip.")
+                return attach_skipped_files(data, form)
+
+            if plan["mode"] == 'incremental':
+                data = run_incremental_generation(plan, form, use_cache, on_unit_done=job.report_progress,
+                                                  should_cancel=lambda: job.cancel_requested, validation=validation)
+            else:
+                data = run_single_generation(units, form, use_cache, on_unit_done=job.report_progress,
+                                             should_cancel=lambda: job.cancel_requested, validation=validation)
+            if data is None and not job.cancel_requested:
+                raise RuntimeError("LLM failed to generate script or returned empty.")
+            return attach_skipped_files(data, form)
+
+        job, attached = job_queue.default_queue.submit(job_key, work)
+
+    except job_queue.QueueFullError as qfe:
+        app.logger.warning(str(qfe))
+        return jsonify({"error": str(qfe)}), 503, {"Retry-After": "30"}
+
+    except ValueError as ve:
+        return bad_request_response(ve)
+
+    except Exception as e:
+        app.logger.error(f"An unexpected internal server error occurred: {e}", exc_info=True)
+        return jsonify({"error": "An unexpected internal server error occurred. Please check backend logs."}), 500
+
+    print(f"Job {job.id} {'attached to in-flight job' if attached else 'queued'}.", flush=True)
+    job_dict = job.to_dict()
+    job_dict["attached"] = attached
+    job_dict["status_url"] = f"/api/jobs/{job.id}"
+    return jsonify(job_dict), 202, {"Location": job_dict["status_url"]}
+
+
+@app.route('/api/jobs/<job_id>', methods=['GET'])
+def get_generation_job_route(job_id):
+    job = job_queue.default_queue.get(job_id)
+    if job is None:
+        return jsonify({"error": f"Unknown job '{job_id}'"}), 404
+    return jsonify(job.to_dict()), 200
+
+
+@app.route('/api/jobs/<job_id>', methods=['DELETE'])
+def cancel_generation_job_route(job_id):
+    job = job_queue.default_queue.cancel(job_id)
+    if job is None:
+        return jsonify({"error": f"Unknown job '{job_id}'"}), 404
+    return jsonify(job.to_dict()), 200
+
+
+def format_sse(event: str, payload: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(payload)}\n\n"
+
+
+@app.route('/api/upload-and-generate/stream', methods=['POST'])
+@admission_controlled()
+def upload_and_generate_tests_stream_route():
+    """
+    Same form as /api/upload-and-generate, but answers with Server-Sent Events:
+    'token' events carry cleaned code as it is generated, then a final 'done'
+    (with the full script) or 'error' event. The source is sent as one prompt, so zips
+    are combined and large files are not chunked here.
+    """
+    print("--- Request received at /api/upload-and-generate/stream endpoint ---", flush=True)
+
+    try:
+        with timing.stage('save'):
+            form = parse_upload_form()
+        with timing.stage('extract'):
+            code_to_process = read_upload_code(form)
+        with timing.stage('prompt_build'):
+            messages = build_messages(form, code_to_process)
+        use_cache = use_generation_cache()
+
+    except ValueError as ve:
+        return bad_request_response(ve)
+
+    except Exception as e:
+        app.logger.error(f"An unexpected internal server error occurred: {e}", exc_info=True)
+        return jsonify({"error": "An unexpected internal server error occurred. Please check backend logs."}), 500
+
+    def event_stream():
+        with timing.stage('llm'):  # Timed until the stream ends or the client goes away
+            for event in llm_service.stream_tests_with_cache(messages, use_cache=use_cache):
+                event_type = event.pop("type")
+                if event_type == "done":
+                    event["original_filename"] = form["filename"]
+                    event["upload_type"] = form["upload_type"]
+                    attach_skipped_files(event, form)
+                yield format_sse(event_type, event)
+
+    print("Streaming prompt to LLM service...", flush=True)
+    return Response(stream_with_context(event_stream()), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+
+# --- Batch generation ---
+def parse_batch_targets(raw_targets, default_language, default_framework):
+    """
+    Parses the 'targets' form field: a JSON list of {"language", "framework"} objects or
+    [language, framework] pairs. Without it, the single language/framework fields are used.
+
+    Raises:
+        ValueError: If the field is malformed or lists more than BATCH_MAX_TARGETS targets.
+    """
+    if not raw_targets or not raw_targets.strip():
+        return [{"language": LANGUAGE_ALIASES.get(default_language, default_language), "framework": default_framework}]
+    try:
+        parsed = json.loads(raw_targets)
+    except json.JSONDecodeError as e:
+        raise ValueError(f"'targets' is not valid JSON: {e}")
+    if not isinstance(parsed, list) or not parsed:
+        raise ValueError("'targets' must be a non-empty JSON list.")
+
+    targets = []
+    for entry in parsed:
+        if isinstance(entry, dict):
+            language, framework = entry.get("language"), entry.get("framework")
+        elif isinstance(entry, list) and len(entry) == 2:
+            language, framework = entry
+        else:
+            raise ValueError("Each target must be {\"language\": ..., \"framework\": ...} or [language, framework].")
+        if not isinstance(language, str) or not isinstance(framework, str) or not language.strip() or not framework.strip():
+            raise ValueError("Each target needs a non-empty language and framework.")
+        language = language.strip().lower()
+        target = {"language": LANGUAGE_ALIASES.get(language, language), "framework": framework.strip().lower()}
+        if target not in targets:
+            targets.append(target)
+    if len(targets) > BATCH_MAX_TARGETS:
+        raise ValueError(f"{len(targets)} targets requested; the limit is {BATCH_MAX_TARGETS}.")
+    return targets
+
+
+def read_batch_inputs():
+    """
+    Reads every uploaded file of a batch ('files', or a single 'file') once: zips are
+    extracted through the source selection rules, other files are used as-is. With
+    several uploads, the paths of each zip's files are prefixed with the zip's name.
+
+    Returns:
+        (code_files, skipped_files): [(relative_path, content)] and the files the
+        source selection left out.
+
+    Raises:
+        ValueError: If there is no usable upload or no code in any of them.
+    """
+    uploads = [upload for upload in request.files.getlist('files') + request.files.getlist('file') if upload.filename]
+    if not uploads:
+        raise ValueError("No files in the request. Send them in the 'files' field.")
+
+    code_files = {}
+    skipped_files = []
+    for upload in uploads:
+        if not allowed_file(upload.filename):
+            raise ValueError(f"File type not allowed: '{upload.filename}'")
+        filename = secure_filename(upload.filename)
+        if filename.lower().endswith('.zip'):
+            selector = make_source_selector()
+            prefix = f"{os.path.splitext(filename)[0]}/" if len(uploads) > 1 else ""
+            files = [(prefix + path, content) for path, content in
+                     file_processor.extract_zip_code_files(upload, selector)]
+            skipped_files.extend({**entry, "path": prefix + entry["path"]} for entry in selector.skipped)
+        else:
+            files = [(filename, upload.read().decode('utf-8', errors='ignore'))]
+        for path, content in files:
+            if path in code_files:
+                raise ValueError(f"'{path}' is uploaded more than once.")
+            code_files[path] = content
+
+    if not code_files:
+        raise NoCodeInUploadError("No recognized code files were found in the upload.", skipped_files)
+    return sorted(code_files.items()), skipped_files
+
+
+def source_language(path):
+    return SOURCE_LANGUAGES.get(os.path.splitext(path)[1].lower())
+
+
+def build_batch_units(code_files, targets, user_instructions):
+    """
+    Builds the generation units of each file for every target of the file's language
+    (see SOURCE_LANGUAGES). The import index is built once for all targets; unit names
+    and groups are prefixed with the target.
+
+    Raises:
+        ValueError: If a target matches none of the files, or the batch exceeds BATCH_MAX_UNITS.
+    """
+    index = import_index.UploadIndex(code_files)
+    units = []
+    for target in targets:
+        label = f"{target['language']}/{target['framework']}"
+        target_files = [(path, content) for path, content in code_files if source_language(path) == target["language"]]
+        if not target_files:
+            raise ValueError(f"The target {label} matches none of the uploaded files; targets apply to files of "
+                             f"their language ({', '.join(sorted(set(SOURCE_LANGUAGES.values())))}).")
+        for unit in build_per_file_units(target_files, target["language"], target["framework"], user_instructions,
+                                         index=index):
+            unit["target"] = target
+            unit["name"] = f"{label}:{unit['name']}"
+            unit["group"] = f"{label}:{unit['group']}"
+            units.append(unit)
+    if len(units) > BATCH_MAX_UNITS:
+        raise ValueError(f"The batch needs {len(units)} generation units; the limit is {BATCH_MAX_UNITS}. "
+                         f"Send fewer files or targets per request.")
+    return units
+
+
+def iter_batch_results(units, use_cache, validation=None):
+    """
+    Sends the units of a batch to the shared worker pool, at most BATCH_MAX_IN_FLIGHT at a
+    time so other requests are not queued behind the whole batch, and yields one result
+    per (target, file) as soon as all of that file's units are done. Validation, when asked for
+    ({"sources"}), runs per file with the target's framework.
+    """
+    members = {}
+    for index, unit in enumerate(units):
+        members.setdefault(unit["group"], []).append(index)
+    remaining = {group: len(indexes) for group, indexes in members.items()}
+    results = [None] * len(units)
+
+    completed = parallel_generator.generate_as_completed(units, use_cache=use_cache, max_in_flight=BATCH_MAX_IN_FLIGHT)
+    try:
+        while True:
+            with timing.stage('llm'):
+                item = next(completed, None)
+            if item is None:
+                return
+            index, result = item
+            results[index] = result
+            group = units[index]["group"]
+            remaining[group] -= 1
+            if remaining[group]:
+                continue
+
+            group_units = [units[i] for i in members[group]]
+            group_results = [results[i] for i in members[group]]
+            target = group_units[0]["target"]
+            if validation is not None:
+                with timing.stage('validate'):
+                    script_validator.validate_and_repair(
+                        group_units, group_results, target["language"], target["framework"], validation["sources"],
+                        regenerate=lambda repair_units: parallel_generator.generate_for_units(
+                            repair_units, use_cache=use_cache))
+            with timing.stage('post_process'):
+                stitched = _stitch_groups(group_units, group_results, target["language"])[0]
+            yield {
+                "language": target["language"],
+                "framework": target["framework"],
+                "path": group_units[0]["source_path"],
+                "module_name": stitched["module_name"],
+                "generated_script": stitched["generated_script"],
+                "error": stitched["error"],
+                "cache": stitched["cache"],
+                "chunks": stitched["chunks"],
+                "context": stitched["context"],
+                "validation": stitched["validation"],
+                "elapsed_seconds": stitched["elapsed_seconds"],
+            }
+    finally:
+        completed.close()
+
+
+def bundle_test_path(result):
+    """
+    Where a result's script goes in a batch bundle: <language>-<framework>/<dir>/<test file>.
+    Every part is reduced to safe segments (no '..', no absolute paths), so unpacking the
+    bundle never writes outside its folder.
+    """
+    segments = [part.replace(':', '_') for part in re.split(r"[/\\]", result["path"]) if part not in ('', '.', '..')]
+    directory = "/".join(segments[:-1])
+    stem, source_extension = os.path.splitext(segments[-1] if segments else "source")
+    extension = TEST_FILE_EXTENSIONS.get(result["language"], source_extension)
+    if result["language"] == 'go':
+        test_name = f"{stem}_test{extension}"
+    elif result["language"] in ('java', 'csharp', 'c#'):
+        test_name = f"{stem}Test{extension}"
+    elif result["language"] in ('javascript', 'typescript'):
+        test_name = f"{stem}.test{extension}"
+    else:
+        test_name = f"test_{stem}{extension}"
+    target_folder = secure_filename(f"{result['language']}-{result['framework']}") or "tests"
+    return posixpath.join(target_folder, directory, test_name)
+
+
+def build_batch_bundle(results, summary):
+    """A zip of every generated test file plus manifest.json (the summary and each result without its script)."""
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, 'w', zipfile.ZIP_DEFLATED) as bundle:
+        manifest_results = []
+        for result in results:
+            entry = {key: value for key, value in result.items() if key != "generated_script"}
+            if result["generated_script"]:
+                entry["test_file"] = bundle_test_path(result)
+                bundle.writestr(entry["test_file"], result["generated_script"])
+            manifest_results.append(entry)
+        bundle.writestr("manifest.json", json.dumps({**summary, "results": manifest_results}, indent=2))
+    buffer.seek(0)
+    return buffer
+
+
+@app.route('/api/batch-generate', methods=['POST'])
+@admission_controlled()
+def batch_generate_route():
+    """
+    Generates tests for many files and several (language, framework) targets in one call.
+
+    Form fields: 'files' (code files and/or zips, each read once), 'targets' (JSON list,
+    see parse_batch_targets; each applies to the files of its language), 'format' (json,
+    ndjson or zip), plus the optional instructions, validate, useCache and source
+    selection fields of /api/upload-and-generate.
+    'ndjson' streams a 'start' line, one 'result' line per (target, file) as it finishes
+    and a final 'done' line; 'zip' answers with a bundle of test files and a manifest.
+    """
+    print("--- Request received at /api/batch-generate endpoint ---", flush=True)
+    started = time.perf_counter()
+
+    try:
+        output_format = request.form.get("format", "json").strip().lower()
+        if output_format not in ('json', 'ndjson', 'zip'):
+            raise ValueError("'format' must be 'json', 'ndjson' or 'zip'.")
+        targets = parse_batch_targets(request.form.get("targets"),
+                                      request.form.get("language", "python").strip().lower(),
+                                      request.form.get("framework", "unittest").strip().lower())
+        with timing.stage('extract'):
+            code_files, skipped_files = read_batch_inputs()
+        with timing.stage('prompt_build'):
+            units = build_batch_units(code_files, targets, request.form.get("instructions", None))
+        target_languages = {target["language"] for target in targets}
+        skipped_files += [{"path": path, "reason": "no_matching_target", "detail": source_language(path)}
+                          for path, _ in code_files if source_language(path) not in target_languages]
+        validate = request.form.get("validate", "false").strip().lower() in ('true', '1', 'yes', 'on')
+        if validate and not script_validator.VALIDATION_ENABLED:
+            raise ValueError("Test validation is not enabled on this server.")
+        validation = {"sources": dict(code_files)} if validate else None
+        use_cache = use_generation_cache()
+
+    except ValueError as ve:
+        return bad_request_response(ve)
 
     except Exception as e:
         app.logger.error(f"An unexpected internal server error occurred: {e}", exc_info=True)
-        if original_file_path_for_cleanup and os.path.exists(original_file_path_for_cleanup):
+        return jsonify({"error": "An unexpected internal server error occurred. Please check backend logs."}), 500
+
+    print(f"Batch: {len(code_files)} file(s) x {len(targets)} target(s) = {len(units)} unit(s).", flush=True)
+    summary = {"targets": targets, "files": [path for path, _ in code_files], "units": len(units),
+               "skipped_files": skipped_files}
+
+    def finish(succeeded, total):
+        print(f"Batch generation finished: {succeeded}/{total} scripts generated.", flush=True)
+        return {"succeeded": succeeded, "failed": total - succeeded,
+                "total_elapsed_seconds": round(time.perf_counter() - started, 3)}
+
+    if output_format == 'ndjson':
+        def result_lines():
+            yield json.dumps({"type": "start", **summary}) + "\n"
+            outcomes = []
             try:
-                if os.path.isdir(original_file_path_for_cleanup):
-                    shutil.rmtree(original_file_path_for_cleanup)
-                else:
-                    os.remove(original_file_path_for_cleanup)
-            except Exception as cleanup_err:
-                app.logger.error(f"Error during cleanup after unhandled exception: {cleanup_err}", exc_info=True)
+                for result in iter_batch_results(units, use_cache, validation):
+                    outcomes.append({"generated_script": bool(result["generated_script"]),
+                                     "validation": result["validation"]})
+                    yield json.dumps({"type": "result", **result}) + "\n"
+            except Exception as e:
+                app.logger.error(f"Batch generation failed: {e}", exc_info=True)
+                yield json.dumps({"type": "error", "error": "Batch generation failed. Please check backend logs."}) + "\n"
+                return
+            done = finish(sum(1 for o in outcomes if o["generated_script"]), len(outcomes))
+            if validation is not None:
+                done["validation_summary"] = script_validator.summarize(outcomes)
+            yield json.dumps({"type": "done", **done}) + "\n"
+
+        return Response(stream_with_context(result_lines()), mimetype='application/x-ndjson',
+                        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+    try:
+        results = list(iter_batch_results(units, use_cache, validation))
+    except Exception as e:
+        app.logger.error(f"An unexpected internal server error occurred: {e}", exc_info=True)
         return jsonify({"error": "An unexpected internal server error occurred. Please check backend logs."}), 500
 
+    # Report in a stable order (target, then path), not completion order
+    order = {(t["language"], t["framework"]): i for i, t in enumerate(targets)}
+    results.sort(key=lambda r: (order[(r["language"], r["framework"])], r["path"]))
+    summary.update(finish(sum(1 for r in results if r["generated_script"]), len(results)))
+    if validation is not None:
+        summary["validation_summary"] = script_validator.summarize(results)
+
+    if output_format == 'zip':
+        with timing.stage('post_process'):
+            bundle = build_batch_bundle(results, summary)
+        return send_file(bundle, mimetype='application/zip', as_attachment=True, download_name="generated_tests.zip")
+
+    if not summary["succeeded"]:
+        return jsonify({
+            "error": "LLM failed to generate a script for every file and target. Check llm_service.py logs.",
+            "data": {**summary, "results": results}
+        }), 500
+
+    return jsonify({
+        "message": f"Generated {summary['succeeded']} of {len(results)} test scripts "
+                   f"({len(code_files)} file(s), {len(targets)} target(s)).",
+        "data": {**summary, "results": results}
+    }), 200
+
+
+@app.route('/api/cache/stats', methods=['GET'])
+def generation_cache_stats_route():
+    return jsonify(generation_cache.default_cache.stats()), 200
+
+
+@app.route('/healthz', methods=['GET'])
+def healthz_route():
+    """Liveness: the process is up and serving requests."""
+    return jsonify({"status": "ok"}), 200
+
+
+@app.route('/readyz', methods=['GET'])
+def readyz_route():
+    """
+    Readiness and current load. Answers 503 while every inference slot of this worker is
+    taken or no Ollama endpoint is healthy, so a load balancer can send traffic elsewhere.
+    """
+    inference = admission.inference_limiter.stats()
+    endpoints = ollama_pool.default_pool.stats()
+    healthy_endpoints = sum(1 for endpoint in endpoints if endpoint["healthy"])
+    ready = healthy_endpoints > 0 and not inference["saturated"]
+    return jsonify({
+        "ready": ready,
+        "inference": inference,
+        "job_queue": {"depth": job_queue.default_queue.depth(), "running": job_queue.default_queue.running()},
+        "ollama_endpoints": endpoints,
+    }), 200 if ready else 503
+
+
+@app.route('/metrics', methods=['GET'])
+def metrics_route():
+    return Response(metrics.render(), mimetype='text/plain; version=0.0.4; charset=utf-8')
+
 
 if __name__ == '__main__':
+    # Development server only; in production run: gunicorn -c gunicorn.conf.py app:app
+    # The reloader runs this block in a watcher process too; only the serving child preloads the model
+    if os.environ.get('WERKZEUG_RUN_MAIN') == 'true' and OLLAMA_WARM_UP:
+        ollama_pool.default_pool.warm_up(llm_service.DEEPSEEK_MODEL_TAG)
     print("--- Starting Flask App on port 5001 (Reloader ENABLED) ---")
     # Re-enable the default reloader by simply using debug=True
     # Flask will use 'stat' or 'watchdog' if available.
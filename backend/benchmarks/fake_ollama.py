@@ -0,0 +1,289 @@
+# backend/benchmarks/fake_ollama.py
+"""
+Local stand-in for the Ollama HTTP API, for benchmarks and load tests.
+
+It answers /api/chat (streaming and non-streaming), /api/generate, /api/tags,
+/api/ps and /api/version with a canned test script. Latency is configurable:
+time to first token, per-token delay and a failure rate. With a prompt evaluation
+cost per token, it also emulates Ollama's prompt (KV) cache: the prefix a prompt
+shares with one of the last `cache_slots` prompts is not evaluated again.
+
+Run standalone:
+    python -m benchmarks.fake_ollama --port 11435 --ttft 0.3 --token-delay 0.01
+then point the backend at it with OLLAMA_HOST=http://127.0.0.1:11435.
+"""
+import argparse
+import json
+import random
+import re
+import threading
+import time
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+DEFAULT_CONFIG = {
+    "ttft": 0.2,            # Seconds before the first token, on top of prompt evaluation
+    "prompt_eval_per_token": 0.0,  # Seconds per prompt token that is not in the prompt cache
+    "cache_slots": 4,       # Recent prompts whose prefix is cached (like OLLAMA_NUM_PARALLEL)
+    "token_delay": 0.005,   # Seconds per generated token
+    "failure_rate": 0.0,    # Probability of answering HTTP 500
+    "response_tokens": 200, # Approximate length of the generated answer
+    "model": "deepseek-coder:6.7b-instruct",
+    "seed": None,
+}
+
+_TOKEN = re.compile(r"\s*\S{1,4}|\s+")
+
+
+def _chars_to_tokens(text: str) -> int:
+    return max(len(text) // 4, 1)
+
+
+def _common_prefix_length(a: str, b: str) -> int:
+    length = min(len(a), len(b))
+    for index in range(length):
+        if a[index] != b[index]:
+            return index
+    return length
+
+
+def build_answer(prompt: str, response_tokens: int) -> str:
+    """A plausible model answer: intro line, a fenced test module, then an explanation."""
+    # The last mention is the user message's; the system prompt may name an example module
+    module_names = re.findall(r"module named '([\w.-]+)'", prompt)
+    module = module_names[-1] if module_names else "module_under_test"
+    tests = []
+    index = 0
+    while _chars_to_tokens("\n".join(tests)) < response_tokens:
+        tests.append(f"    def test_case_{index}(self):\n        self.assertIsNotNone({module})\n")
+        index += 1
+    return (
+        "Here are the tests:\n"
+        "```python\n"
+        f"import unittest\nimport {module}\n\n\n"
+        f"class Test{module.title().replace('_', '')}(unittest.TestCase):\n"
+        + "\n".join(tests) +
+        "\n\nif __name__ == '__main__':\n    unittest.main()\n"
+        "```\n"
+        "These tests cover the main functionality and edge cases of the module. "
+        "Each test checks one behaviour so that failures are easy to locate.\n"
+    )
+
+
+class FakeOllamaHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    server_version = "FakeOllama/1.0"
+
+    def log_message(self, format, *args):  # Keep benchmark output clean
+        pass
+
+    # --- Helpers ---
+    @property
+    def config(self) -> dict:
+        return self.server.config
+
+    def _read_json(self) -> dict:
+        length = int(self.headers.get('Content-Length') or 0)
+        body = self.rfile.read(length) if length else b"{}"
+        try:
+            return json.loads(body or b"{}")
+        except ValueError:
+            return {}
+
+    def _send_json(self, status: int, payload: dict) -> None:
+        body = json.dumps(payload).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _should_fail(self) -> bool:
+        with self.server.random_lock:
+            return self.server.random.random() < self.config["failure_rate"]
+
+    def _prompt_text(self, request_body: dict) -> str:
+        # Rendered roughly like a chat template, so the system message is the prompt's prefix
+        if "messages" in request_body:
+            return "".join(f"<|{m.get('role', 'user')}|>\n{m.get('content', '')}\n"
+                           for m in request_body.get("messages", []))
+        return request_body.get("system", "") + request_body.get("prompt", "")
+
+    def _evaluate_prompt(self, prompt: str) -> int:
+        """Sleeps for the prompt evaluation and returns the number of tokens evaluated (not cached)."""
+        with self.server.stats_lock:
+            slots = self.server.prompt_cache
+            best = max(slots, key=lambda cached: _common_prefix_length(prompt, cached), default=None)
+            reused = _common_prefix_length(prompt, best) if best is not None else 0
+            if self.config["cache_slots"] > 0:
+                if best is not None and reused:
+                    slots.remove(best)  # The slot is reused for this prompt
+                slots.append(prompt)
+                del slots[:-self.config["cache_slots"]]
+        evaluated = _chars_to_tokens(prompt[reused:])
+        time.sleep(self.config["ttft"] + evaluated * self.config["prompt_eval_per_token"])
+        return evaluated
+
+    def _stats(self, prompt_eval_count: int, eval_count: int, prompt_eval_seconds: float, eval_seconds: float,
+               total_seconds: float) -> dict:
+        return {
+            "total_duration": int(total_seconds * 1e9),
+            "load_duration": 0,
+            "prompt_eval_count": prompt_eval_count,
+            "prompt_eval_duration": int(prompt_eval_seconds * 1e9),
+            "eval_count": eval_count,
+            "eval_duration": int(eval_seconds * 1e9),
+        }
+
+    # --- Routes ---
+    def do_GET(self):
+        if self.path == '/':
+            body = b"Ollama is running"
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/plain')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+        elif self.path == '/api/version':
+            self._send_json(200, {"version": "0.0.0-fake"})
+        elif self.path in ('/api/tags', '/api/ps'):
+            self._send_json(200, {"models": [{"name": self.config["model"], "model": self.config["model"]}]})
+        else:
+            self._send_json(404, {"error": "not found"})
+
+    def do_POST(self):
+        request_body = self._read_json()
+        if self.path not in ('/api/chat', '/api/generate'):
+            self._send_json(404, {"error": "not found"})
+            return
+
+        with self.server.stats_lock:
+            self.server.request_count += 1
+        if self._should_fail():
+            self._send_json(500, {"error": "fake ollama: injected failure"})
+            return
+
+        prompt = self._prompt_text(request_body)
+        if self.path == '/api/generate' and not prompt:
+            # An empty generate request only loads the model (used for warm-up)
+            self._send_json(200, {"model": request_body.get("model", self.config["model"]), "response": "",
+                                  "done": True, "done_reason": "load"})
+            return
+
+        answer = build_answer(prompt, self.config["response_tokens"])
+        tokens = _TOKEN.findall(answer)
+        if request_body.get("stream", True):
+            self._stream(request_body, prompt, tokens)
+        else:
+            self._respond_once(request_body, prompt, tokens)
+
+    def _message_fields(self, request_body: dict, text: str) -> dict:
+        if self.path == '/api/chat':
+            return {"message": {"role": "assistant", "content": text}}
+        return {"response": text}
+
+    def _respond_once(self, request_body: dict, prompt: str, tokens: list[str]) -> None:
+        started = time.perf_counter()
+        prompt_eval_count = self._evaluate_prompt(prompt)
+        prompt_eval_seconds = time.perf_counter() - started
+        time.sleep(self.config["token_delay"] * len(tokens))
+        total = time.perf_counter() - started
+        payload = {
+            "model": request_body.get("model", self.config["model"]),
+            "created_at": datetime.now(timezone.utc).isoformat(),
+            **self._message_fields(request_body, "".join(tokens)),
+            "done": True,
+            "done_reason": "stop",
+            **self._stats(prompt_eval_count, len(tokens), prompt_eval_seconds, total - prompt_eval_seconds, total),
+        }
+        self._send_json(200, payload)
+
+    def _stream(self, request_body: dict, prompt: str, tokens: list[str]) -> None:
+        started = time.perf_counter()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/x-ndjson')
+        self.send_header('Transfer-Encoding', 'chunked')
+        self.end_headers()
+
+        def write_line(payload: dict) -> None:
+            line = json.dumps(payload).encode('utf-8') + b"\n"
+            self.wfile.write(f"{len(line):X}\r\n".encode('ascii') + line + b"\r\n")
+            self.wfile.flush()
+
+        model = request_body.get("model", self.config["model"])
+        prompt_eval_count = self._evaluate_prompt(prompt)
+        prompt_eval_seconds = time.perf_counter() - started
+        sent = 0
+        try:
+            for token in tokens:
+                write_line({"model": model, "created_at": datetime.now(timezone.utc).isoformat(),
+                            **self._message_fields(request_body, token), "done": False})
+                sent += 1
+                time.sleep(self.config["token_delay"])
+            total = time.perf_counter() - started
+            write_line({"model": model, "created_at": datetime.now(timezone.utc).isoformat(),
+                        **self._message_fields(request_body, ""), "done": True, "done_reason": "stop",
+                        **self._stats(prompt_eval_count, sent, prompt_eval_seconds, total - prompt_eval_seconds, total)})
+            self.wfile.write(b"0\r\n\r\n")
+        except (BrokenPipeError, ConnectionResetError):
+            # The client closed the stream early (e.g. after the closing code fence)
+            with self.server.stats_lock:
+                self.server.cancelled_streams += 1
+            self.close_connection = True
+
+
+class FakeOllamaServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, config: dict):
+        super().__init__(address, FakeOllamaHandler)
+        self.config = {**DEFAULT_CONFIG, **config}
+        self.random = random.Random(self.config["seed"])
+        self.random_lock = threading.Lock()
+        self.stats_lock = threading.Lock()
+        self.request_count = 0
+        self.cancelled_streams = 0
+        self.prompt_cache = []  # Most recently used last
+
+    @property
+    def url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+
+def start_fake_ollama(host: str = '127.0.0.1', port: int = 0, **config) -> FakeOllamaServer:
+    """Starts the fake server on a background thread; port 0 picks a free port."""
+    server = FakeOllamaServer((host, port), config)
+    threading.Thread(target=server.serve_forever, name="fake-ollama", daemon=True).start()
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fake Ollama server for benchmarks.")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=11435)
+    parser.add_argument('--ttft', type=float, default=DEFAULT_CONFIG["ttft"], help="Seconds to first token")
+    parser.add_argument('--token-delay', type=float, default=DEFAULT_CONFIG["token_delay"], help="Seconds per token")
+    parser.add_argument('--failure-rate', type=float, default=DEFAULT_CONFIG["failure_rate"])
+    parser.add_argument('--response-tokens', type=int, default=DEFAULT_CONFIG["response_tokens"])
+    parser.add_argument('--prompt-eval-per-token', type=float, default=DEFAULT_CONFIG["prompt_eval_per_token"],
+                        help="Seconds per uncached prompt token")
+    parser.add_argument('--cache-slots', type=int, default=DEFAULT_CONFIG["cache_slots"],
+                        help="Recent prompts kept in the prompt cache (0 disables it)")
+    parser.add_argument('--seed', type=int, default=None)
+    args = parser.parse_args()
+
+    server = FakeOllamaServer((args.host, args.port), {
+        "ttft": args.ttft, "token_delay": args.token_delay, "failure_rate": args.failure_rate,
+        "response_tokens": args.response_tokens, "prompt_eval_per_token": args.prompt_eval_per_token,
+        "cache_slots": args.cache_slots, "seed": args.seed,
+    })
+    print(f"Fake Ollama listening on {server.url}", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
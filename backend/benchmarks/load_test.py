@@ -0,0 +1,323 @@
+# backend/benchmarks/load_test.py
+"""
+Reproducible load test for the Flask backend.
+
+Starts a fake Ollama server (benchmarks/fake_ollama.py) and the Flask app in-process,
+replays a corpus of single-file and zip uploads at a fixed concurrency, and reports
+p50/p95/p99 latency, requests per second and a per-stage breakdown taken from the
+Server-Timing header (save, extract, prompt_build, llm, validate, post_process).
+
+Run from the backend directory:
+    python -m benchmarks.load_test --requests 200 --concurrency 8 --output bench_results/run.json
+    python -m benchmarks.load_test --compare bench_results/baseline.json
+
+Pass --target http://host:port to benchmark an already running backend instead
+(it must be pointed at an Ollama, real or fake, by the operator).
+"""
+import argparse
+import contextlib
+import io
+import json
+import logging
+import os
+import random
+import subprocess
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+import uuid
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+
+from benchmarks.fake_ollama import DEFAULT_CONFIG, start_fake_ollama
+
+ENDPOINT = '/api/upload-and-generate'
+
+
+# --- Corpus ---
+def _python_module(name: str, functions: int) -> str:
+    body = [f'"""Synthetic module {name} for benchmarking."""', "import math", ""]
+    for index in range(functions):
+        body.append(
+            f"def {name}_func_{index}(values, factor={index + 1}):\n"
+            f"    \"\"\"Scales and sums the values.\"\"\"\n"
+            f"    if not values:\n"
+            f"        raise ValueError('values must not be empty')\n"
+            f"    return sum(math.floor(v * factor) for v in values)\n"
+        )
+    return "\n\n".join(body) + "\n"
+
+
+def _js_module(name: str, functions: int) -> str:
+    return "\n\n".join(
+        f"export function {name}Func{index}(items) {{\n"
+        f"  if (!items.length) throw new Error('empty');\n"
+        f"  return items.map(x => x * {index + 1}).reduce((a, b) => a + b, 0);\n"
+        f"}}"
+        for index in range(functions)
+    ) + "\n"
+
+
+def _zip_bytes(files: dict[str, str]) -> bytes:
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, 'w', zipfile.ZIP_DEFLATED) as archive:
+        for path, content in files.items():
+            archive.writestr(path, content)
+    return buffer.getvalue()
+
+
+def build_synthetic_corpus() -> list[dict]:
+    """A fixed mix of request scenarios; each is a dict with name, filename, content and form fields."""
+    project = {f"pkg/module_{i}.py": _python_module(f"module_{i}", 4 + i) for i in range(6)}
+    project["web/app.js"] = _js_module("app", 5)
+    project["README.md"] = "# not code\n"
+    archive = _zip_bytes(project)
+    return [
+        {"name": "single_small_py", "filename": "small_utils.py",
+         "content": _python_module("small_utils", 3).encode(), "form": {"uploadType": "single"}},
+        {"name": "single_large_py", "filename": "large_utils.py",
+         "content": _python_module("large_utils", 60).encode(), "form": {"uploadType": "single"}},
+        {"name": "single_js", "filename": "helpers.js",
+         "content": _js_module("helpers", 6).encode(), "form": {"uploadType": "single", "language": "javascript",
+                                                                 "framework": "jest"}},
+        {"name": "zip_combined", "filename": "project.zip", "content": archive,
+         "form": {"uploadType": "zip", "zipMode": "combined"}},
+        {"name": "zip_per_file", "filename": "project.zip", "content": archive,
+         "form": {"uploadType": "zip", "zipMode": "per_file"}},
+    ]
+
+
+def load_corpus_dir(corpus_dir: str) -> list[dict]:
+    """Every file in corpus_dir becomes a scenario: .zip files as per-file zip uploads, others as single uploads."""
+    scenarios = []
+    for filename in sorted(os.listdir(corpus_dir)):
+        path = os.path.join(corpus_dir, filename)
+        if not os.path.isfile(path):
+            continue
+        with open(path, 'rb') as f:
+            content = f.read()
+        form = {"uploadType": "zip", "zipMode": "per_file"} if filename.endswith('.zip') else {"uploadType": "single"}
+        scenarios.append({"name": filename, "filename": filename, "content": content, "form": form})
+    return scenarios
+
+
+# --- HTTP ---
+def _multipart(fields: dict, filename: str, content: bytes) -> tuple[bytes, str]:
+    boundary = uuid.uuid4().hex
+    parts = []
+    for key, value in fields.items():
+        parts.append(f"--{boundary}\r\nContent-Disposition: form-data; name=\"{key}\"\r\n\r\n{value}\r\n".encode())
+    parts.append(
+        f"--{boundary}\r\nContent-Disposition: form-data; name=\"file\"; filename=\"{filename}\"\r\n"
+        f"Content-Type: application/octet-stream\r\n\r\n".encode() + content + b"\r\n"
+    )
+    parts.append(f"--{boundary}--\r\n".encode())
+    return b"".join(parts), f"multipart/form-data; boundary={boundary}"
+
+
+def parse_server_timing(header: str | None) -> dict[str, float]:
+    """'llm;dur=12.3, total;dur=15' -> {'llm': 12.3, 'total': 15.0} (milliseconds)."""
+    stages = {}
+    for entry in (header or "").split(","):
+        name, _, params = entry.strip().partition(";")
+        for param in params.split(";"):
+            key, _, value = param.strip().partition("=")
+            if key == "dur" and name:
+                try:
+                    stages[name] = float(value)
+                except ValueError:
+                    pass
+    return stages
+
+
+def send_request(base_url: str, scenario: dict, use_cache: bool, timeout: float) -> dict:
+    fields = dict(scenario["form"])
+    if not use_cache:
+        fields["useCache"] = "false"
+    body, content_type = _multipart(fields, scenario["filename"], scenario["content"])
+    request = urllib.request.Request(base_url + ENDPOINT, data=body, method='POST',
+                                     headers={"Content-Type": content_type})
+    started = time.perf_counter()
+    status, server_timing = None, None
+    try:
+        with urllib.request.urlopen(request, timeout=timeout) as response:
+            response.read()
+            status, server_timing = response.status, response.headers.get('Server-Timing')
+    except urllib.error.HTTPError as e:
+        e.read()
+        status, server_timing = e.code, e.headers.get('Server-Timing')
+    except Exception as e:
+        return {"scenario": scenario["name"], "status": None, "error": str(e),
+                "latency": time.perf_counter() - started, "stages": {}}
+    return {"scenario": scenario["name"], "status": status, "error": None,
+            "latency": time.perf_counter() - started, "stages": parse_server_timing(server_timing)}
+
+
+# --- Statistics ---
+def percentile(values: list[float], pct: float) -> float | None:
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = (len(ordered) - 1) * pct / 100
+    low = int(rank)
+    high = min(low + 1, len(ordered) - 1)
+    return ordered[low] + (ordered[high] - ordered[low]) * (rank - low)
+
+
+def summarize(samples: list[dict], wall_seconds: float) -> dict:
+    def latency_stats(group: list[dict]) -> dict:
+        latencies_ms = [s["latency"] * 1000 for s in group]
+        ok = [s for s in group if s["status"] == 200]
+        return {
+            "requests": len(group),
+            "ok": len(ok),
+            "errors": len(group) - len(ok),
+            "mean_ms": round(sum(latencies_ms) / len(latencies_ms), 2) if latencies_ms else None,
+            "p50_ms": round(percentile(latencies_ms, 50), 2) if latencies_ms else None,
+            "p95_ms": round(percentile(latencies_ms, 95), 2) if latencies_ms else None,
+            "p99_ms": round(percentile(latencies_ms, 99), 2) if latencies_ms else None,
+        }
+
+    stage_names = sorted({name for s in samples for name in s["stages"]})
+    stages = {}
+    for name in stage_names:
+        values = [s["stages"][name] for s in samples if name in s["stages"]]
+        stages[name] = {
+            "mean_ms": round(sum(values) / len(values), 2),
+            "p95_ms": round(percentile(values, 95), 2),
+        }
+
+    scenarios = sorted({s["scenario"] for s in samples})
+    return {
+        "overall": {**latency_stats(samples), "requests_per_second": round(len(samples) / wall_seconds, 2),
+                    "wall_seconds": round(wall_seconds, 3)},
+        "stages": stages,
+        "scenarios": {name: latency_stats([s for s in samples if s["scenario"] == name]) for name in scenarios},
+        "status_codes": {str(code): sum(1 for s in samples if s["status"] == code)
+                         for code in sorted({s["status"] for s in samples}, key=str)},
+    }
+
+
+def compare(current: dict, baseline: dict) -> list[str]:
+    """Human-readable deltas of the headline numbers against a previous results file."""
+    lines = []
+    for key in ("p50_ms", "p95_ms", "p99_ms", "requests_per_second"):
+        old, new = baseline["summary"]["overall"].get(key), current["summary"]["overall"].get(key)
+        if old and new is not None:
+            lines.append(f"  {key:>20}: {old:>10} -> {new:>10} ({(new - old) / old * 100:+.1f}%)")
+    for stage, stats in current["summary"]["stages"].items():
+        old = baseline["summary"]["stages"].get(stage, {}).get("mean_ms")
+        if old:
+            lines.append(f"  {stage + ' mean_ms':>20}: {old:>10} -> {stats['mean_ms']:>10} "
+                         f"({(stats['mean_ms'] - old) / old * 100:+.1f}%)")
+    return lines
+
+
+def _git_commit() -> str | None:
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except Exception:
+        return None
+
+
+# --- Runner ---
+def start_backend(ollama_url: str):
+    """Imports the Flask app against the given Ollama and serves it on a free local port."""
+    os.environ['OLLAMA_HOST'] = ollama_url  # Read by the ollama client at import time
+    os.environ.setdefault('RATE_LIMIT_PER_MINUTE', '0')  # Every benchmark request comes from one client
+    from werkzeug.serving import make_server
+    import app as backend_app
+
+    logging.getLogger('werkzeug').setLevel(logging.WARNING)  # No access log line per request
+
+    server = make_server('127.0.0.1', 0, backend_app.app, threaded=True)
+    threading.Thread(target=server.serve_forever, name="backend", daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_port}"
+
+
+def run(args) -> dict:
+    scenarios = load_corpus_dir(args.corpus_dir) if args.corpus_dir else build_synthetic_corpus()
+    rng = random.Random(args.seed)
+    schedule = [scenarios[i % len(scenarios)] for i in range(args.requests)]
+    rng.shuffle(schedule)
+
+    fake_ollama = None
+    if args.target:
+        base_url = args.target.rstrip('/')
+    else:
+        fake_ollama = start_fake_ollama(ttft=args.ttft, token_delay=args.token_delay,
+                                        failure_rate=args.failure_rate, response_tokens=args.response_tokens,
+                                        seed=args.seed)
+        _, base_url = start_backend(fake_ollama.url)
+
+    for scenario in scenarios[:args.warmup]:
+        send_request(base_url, scenario, args.use_cache, args.timeout)
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+        samples = list(pool.map(lambda s: send_request(base_url, s, args.use_cache, args.timeout), schedule))
+    wall_seconds = time.perf_counter() - started
+
+    return {
+        "commit": _git_commit(),
+        "timestamp": time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+        "config": {
+            "requests": args.requests, "concurrency": args.concurrency, "seed": args.seed,
+            "use_cache": args.use_cache, "target": args.target, "corpus_dir": args.corpus_dir,
+            "fake_ollama": None if args.target else {
+                "ttft": args.ttft, "token_delay": args.token_delay, "failure_rate": args.failure_rate,
+                "response_tokens": args.response_tokens,
+            },
+            "env": {key: os.environ[key] for key in sorted(os.environ)
+                    if key.startswith(('LLM_', 'CHUNK_', 'JOB_', 'ZIP_', 'GENERATION_CACHE_'))},
+        },
+        "summary": summarize(samples, wall_seconds),
+        "ollama_requests": fake_ollama.request_count if fake_ollama else None,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test the test-generation backend.")
+    parser.add_argument('--requests', type=int, default=100)
+    parser.add_argument('--concurrency', type=int, default=4)
+    parser.add_argument('--seed', type=int, default=1234)
+    parser.add_argument('--warmup', type=int, default=1, help="Scenarios sent once before timing starts")
+    parser.add_argument('--timeout', type=float, default=300)
+    parser.add_argument('--use-cache', action='store_true', help="Allow generation cache hits (off by default)")
+    parser.add_argument('--corpus-dir', default=None, help="Directory of files/zips to replay instead of the synthetic corpus")
+    parser.add_argument('--target', default=None, help="Base URL of a running backend (skips the in-process servers)")
+    parser.add_argument('--ttft', type=float, default=DEFAULT_CONFIG["ttft"])
+    parser.add_argument('--token-delay', type=float, default=DEFAULT_CONFIG["token_delay"])
+    parser.add_argument('--failure-rate', type=float, default=DEFAULT_CONFIG["failure_rate"])
+    parser.add_argument('--response-tokens', type=int, default=DEFAULT_CONFIG["response_tokens"])
+    parser.add_argument('--verbose', action='store_true', help="Show the backend's own log output")
+    parser.add_argument('--output', default=None, help="Write the results JSON here")
+    parser.add_argument('--compare', default=None, help="Results JSON of a previous run to compare against")
+    args = parser.parse_args()
+
+    if args.verbose:
+        results = run(args)
+    else:
+        # The backend logs every request with print(); keep the report readable
+        with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+            results = run(args)
+    print(json.dumps(results["summary"], indent=2))
+
+    if args.output:
+        os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+        print(f"Results written to {args.output}")
+
+    if args.compare:
+        with open(args.compare, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+        print(f"Compared with {args.compare} (commit {baseline.get('commit')}):")
+        print("\n".join(compare(results, baseline)))
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,103 @@
+# backend/benchmarks/prefix_cache_bench.py
+"""
+Measures how much prompt evaluation the stable prompt prefix saves.
+
+Sends prompts for several different modules, one after another, in two layouts:
+  - stable_prefix: prompt_builder.construct_llm_messages (shared system template first)
+  - variable_prefix: the same text, but with the module name in front, as one user message
+and reports Ollama's prompt_eval_count / prompt_eval_duration for the first (cold)
+request and the following (warm) ones of each layout.
+
+Run from the backend directory, against the fake server (default) or a real Ollama:
+    python -m benchmarks.prefix_cache_bench --modules 8
+    python -m benchmarks.prefix_cache_bench --ollama-url http://127.0.0.1:11434 --model deepseek-coder:6.7b-instruct
+"""
+import argparse
+import json
+
+import ollama
+
+import prompt_builder
+from benchmarks.fake_ollama import DEFAULT_CONFIG, start_fake_ollama
+from benchmarks.load_test import _python_module
+
+
+def stable_prefix_messages(code: str, module_name: str, language: str, framework: str) -> list[dict]:
+    return prompt_builder.construct_llm_messages(code, module_name, language=language, test_framework=framework)
+
+
+def variable_prefix_messages(code: str, module_name: str, language: str, framework: str) -> list[dict]:
+    """The same content with the module name first, so no two prompts share a prefix."""
+    system, user = stable_prefix_messages(code, module_name, language, framework)
+    content = f"Tests for the module named '{module_name}'.\n\n{system['content']}\n\n{user['content']}"
+    return [{'role': 'user', 'content': content}]
+
+
+def run_layout(client: ollama.Client, model: str, build_messages, modules: list[tuple[str, str]], args) -> dict:
+    samples = []
+    for module_name, code in modules:
+        response = client.chat(model=model, messages=build_messages(code, module_name, args.language, args.framework),
+                               options={'num_predict': args.num_predict})
+        samples.append({
+            "module": module_name,
+            "prompt_eval_count": response.get('prompt_eval_count') or 0,
+            "prompt_eval_ms": round((response.get('prompt_eval_duration') or 0) / 1e6, 2),
+        })
+
+    cold, warm = samples[0], samples[1:]
+    warm_ms = sum(s["prompt_eval_ms"] for s in warm) / len(warm) if warm else None
+    warm_tokens = sum(s["prompt_eval_count"] for s in warm) / len(warm) if warm else None
+    return {
+        "cold_prompt_eval_ms": cold["prompt_eval_ms"],
+        "cold_prompt_eval_count": cold["prompt_eval_count"],
+        "warm_prompt_eval_ms_mean": round(warm_ms, 2) if warm_ms is not None else None,
+        "warm_prompt_eval_count_mean": round(warm_tokens, 1) if warm_tokens is not None else None,
+        "warm_reduction_pct": round(100 * (1 - warm_ms / cold["prompt_eval_ms"]), 1)
+        if warm_ms is not None and cold["prompt_eval_ms"] else None,
+        "samples": samples,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Cold vs warm prompt evaluation with a stable prompt prefix.")
+    parser.add_argument('--ollama-url', default=None, help="Benchmark this Ollama instead of the fake server")
+    parser.add_argument('--model', default=DEFAULT_CONFIG["model"])
+    parser.add_argument('--modules', type=int, default=6, help="Different modules sent per layout")
+    parser.add_argument('--functions', type=int, default=3, help="Functions per synthetic module")
+    parser.add_argument('--language', default='python')
+    parser.add_argument('--framework', default='unittest')
+    parser.add_argument('--num-predict', type=int, default=16, help="Tokens to generate per request")
+    parser.add_argument('--prompt-eval-per-token', type=float, default=0.002,
+                        help="Fake server: seconds per uncached prompt token")
+    parser.add_argument('--output', default=None, help="Write the results JSON here")
+    args = parser.parse_args()
+
+    fake_server = None
+    url = args.ollama_url
+    if url is None:
+        fake_server = start_fake_ollama(ttft=0.01, token_delay=0.0, response_tokens=args.num_predict,
+                                        prompt_eval_per_token=args.prompt_eval_per_token, cache_slots=1)
+        url = fake_server.url
+    client = ollama.Client(host=url)
+
+    # Each layout gets its own module names, so the second layout can't reuse the first one's prompts
+    results = {"ollama_url": url, "model": args.model, "language": args.language, "framework": args.framework}
+    for layout, build_messages in (("variable_prefix", variable_prefix_messages),
+                                   ("stable_prefix", stable_prefix_messages)):
+        modules = [(f"{layout}_module_{i}", _python_module(f"{layout}_module_{i}", args.functions))
+                   for i in range(args.modules)]
+        results[layout] = run_layout(client, args.model, build_messages, modules, args)
+
+    summary = {layout: {k: v for k, v in results[layout].items() if k != "samples"}
+               for layout in ("variable_prefix", "stable_prefix")}
+    print(json.dumps(summary, indent=2))
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+        print(f"Results written to {args.output}")
+    if fake_server is not None:
+        fake_server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
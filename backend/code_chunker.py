@@ -0,0 +1,677 @@
+# backend/code_chunker.py
+import ast
+import os
+import re
+
+# --- Configuration ---
+# Maximum estimated tokens of source code per prompt. Larger sources are split into
+# top-level units (functions, classes, methods) and packed into several prompts.
+CHUNK_TOKEN_BUDGET = int(os.environ.get('CHUNK_TOKEN_BUDGET', '3000'))
+
+# Rough characters-per-token ratio for code with the DeepSeek tokenizer
+_CHARS_PER_TOKEN = 4
+
+# Declaration lines that start a new top-level unit in the non-Python languages
+_DECLARATION_PATTERNS = {
+    '.js': r"(export\s+)?(default\s+)?(async\s+)?(function\*?|class|const|let|var)\b",
+    '.jsx': r"(export\s+)?(default\s+)?(async\s+)?(function\*?|class|const|let|var)\b",
+    '.ts': r"(export\s+)?(default\s+)?(declare\s+)?(abstract\s+)?(async\s+)?(function\*?|class|interface|enum|type|const|let|var|namespace)\b",
+    '.tsx': r"(export\s+)?(default\s+)?(declare\s+)?(abstract\s+)?(async\s+)?(function\*?|class|interface|enum|type|const|let|var|namespace)\b",
+    '.go': r"(func|type|var|const)\b",
+    '.rb': r"(def|class|module)\b",
+    '.java': r"(@\w+|(public|protected|private|static|final|abstract|synchronized|native|default|sealed)\b|(class|interface|enum|record)\b|[\w<>\[\],.?]+\s+\w+\s*\()",
+    '.cs': r"(\[\w+|(public|protected|private|internal|static|readonly|abstract|sealed|virtual|override|async|partial)\b|(class|interface|enum|record|struct|namespace)\b)",
+}
+_GENERIC_DECLARATION = r"(def|class|function|func|fn|public|private|protected|export)\b"
+
+# Header lines that stay with every chunk in the fallback splitter (imports, package, using...)
+_HEADER_LINE = re.compile(r"^(import\b|from\s+\S+\s+import\b|package\b|using\b|require\b|#include\b|const\s+\w+\s*=\s*require\()")
+
+
+def estimate_tokens(text: str) -> int:
+    """Cheap token estimate used for budgeting; errs on the high side for code."""
+    return (len(text) + _CHARS_PER_TOKEN - 1) // _CHARS_PER_TOKEN
+
+
+# --- Splitting ---
+def _python_units(code: str) -> tuple[str, list[dict]] | None:
+    """Splits Python source with ast. Returns None if the code does not parse."""
+    try:
+        tree = ast.parse(code)
+    except SyntaxError:
+        return None
+
+    lines = code.splitlines(keepends=True)
+    preamble_parts = []
+    units = []
+
+    def node_source(node) -> str:
+        start = min([node.lineno] + [d.lineno for d in getattr(node, 'decorator_list', [])])
+        return "".join(lines[start - 1:node.end_lineno])
+
+    for node in tree.body:
+        if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)):
+            units.append({"name": node.name, "kind": "function", "code": node_source(node)})
+        elif isinstance(node, ast.ClassDef):
+            units.append({"name": node.name, "kind": "class", "code": node_source(node), "node": node})
+        elif not (isinstance(node, ast.If) and _is_main_guard(node)):
+            preamble_parts.append(node_source(node))
+
+    return "".join(preamble_parts), units
+
+
+def _is_main_guard(node: ast.If) -> bool:
+    test = node.test
+    return isinstance(test, ast.Compare) and isinstance(test.left, ast.Name) and test.left.id == '__name__'
+
+
+def _split_python_class(code: str, unit: dict, budget: int) -> list[dict]:
+    """Splits an oversized class into one unit per method, each repeating the class header."""
+    node = unit["node"]
+    lines = code.splitlines(keepends=True)
+    methods = [n for n in node.body if isinstance(n, (ast.FunctionDef, ast.AsyncFunctionDef))]
+    if len(methods) < 2:
+        return [unit]
+
+    def start_line(n) -> int:
+        return min([n.lineno] + [d.lineno for d in getattr(n, 'decorator_list', [])])
+
+    header = "".join(lines[start_line(node) - 1:start_line(node.body[0]) - 1])
+    # Class attributes and other non-method statements travel with every method
+    shared_body = "".join(
+        "".join(lines[n.lineno - 1:n.end_lineno]) for n in node.body
+        if not isinstance(n, (ast.FunctionDef, ast.AsyncFunctionDef))
+        and not (n is node.body[0] and isinstance(n, ast.Expr) and isinstance(getattr(n, 'value', None), ast.Constant))
+    )
+    docstring = ast.get_docstring(node)
+    if docstring:
+        header += f'    """{docstring.splitlines()[0]}"""\n'
+
+    split_units = []
+    for method in methods:
+        method_code = "".join(lines[start_line(method) - 1:method.end_lineno])
+        split_units.append({
+            "name": f"{node.name}.{method.name}",
+            "kind": "method",
+            "code": f"{header}{shared_body}{method_code}",
+        })
+    return split_units
+
+
+def _fallback_units(code: str, extension: str) -> tuple[str, list[dict]]:
+    """
+    Splits non-Python sources at top-level declaration lines (no indentation).
+    Header lines (imports, package, using) go into the preamble shared by every chunk.
+    """
+    declaration = re.compile(_DECLARATION_PATTERNS.get(extension, _GENERIC_DECLARATION))
+    lines = code.splitlines(keepends=True)
+    preamble_parts = []
+    units = []
+    current = []
+
+    def flush_current(carry_over):
+        if current and "".join(current).strip():
+            first = next((l for l in current if l.strip() and not _is_leading_decoration(l)), current[0])
+            units.append({"name": _declaration_name(first), "kind": "block", "code": "".join(current)})
+        current[:] = carry_over
+
+    for line in lines:
+        stripped = line.rstrip("\n")
+        if not units and not current and (not stripped.strip() or _HEADER_LINE.match(stripped)):
+            preamble_parts.append(line)
+            continue
+        if stripped and not stripped[0].isspace() and declaration.match(stripped) and _is_block_start(current):
+            # Leading comments, docblocks and annotations belong to the declaration that follows them
+            split_at = len(current)
+            while split_at > 0 and (not current[split_at - 1].strip() or _is_leading_decoration(current[split_at - 1])):
+                split_at -= 1
+            carry_over = current[split_at:]
+            del current[split_at:]
+            flush_current(carry_over)
+        current.append(line)
+    flush_current([])
+
+    return "".join(preamble_parts), units
+
+
+def _is_comment_line(line: str) -> bool:
+    return line.lstrip().startswith(('//', '#', '/*', '*'))
+
+
+def _is_leading_decoration(line: str) -> bool:
+    return _is_comment_line(line) or line.lstrip().startswith(('@', '['))
+
+
+def _split_block_members(unit: dict, extension: str) -> list[dict]:
+    """
+    Splits an oversized block (e.g. a Java/C# class or a Ruby class) at its member
+    declarations. Every member unit repeats the block's opening and closing lines.
+    """
+    lines = unit["code"].splitlines(keepends=True)
+    if extension == '.rb':
+        header_end = 1
+    else:
+        header_end = next((i for i, l in enumerate(lines) if "{" in l), 0) + 1
+    footer_start = len(lines)
+    while footer_start > header_end and not lines[footer_start - 1].strip():
+        footer_start -= 1
+    if footer_start > header_end and lines[footer_start - 1].strip() in ("}", "};", "end"):
+        footer_start -= 1
+    inner = lines[header_end:footer_start]
+    indents = [len(l) - len(l.lstrip()) for l in inner if l.strip()]
+    if not indents or min(indents) == 0:
+        return [unit]
+
+    indent = min(indents)
+    dedented = "".join(l[indent:] if l[:indent].isspace() else l for l in inner)
+    member_preamble, members = _fallback_units(dedented, extension)
+    if len(members) < 2:
+        return [unit]
+
+    header = "".join(lines[:header_end])
+    footer = "".join(lines[footer_start:])
+    shared = "".join(" " * indent + l if l.strip() else l for l in member_preamble.splitlines(keepends=True))
+    member_units = []
+    for member in members:
+        body = "".join(" " * indent + l if l.strip() else l for l in member["code"].splitlines(keepends=True))
+        member_units.append({
+            "name": f"{unit['name']}.{member['name']}",
+            "kind": "member",
+            "code": f"{header}{shared}{body}{footer}",
+        })
+    return member_units
+
+
+def _is_block_start(current: list[str]) -> bool:
+    """A declaration only starts a new unit once the previous one has closed its braces."""
+    text = "".join(_code_only(line) for line in current)  # Braces in strings and comments don't count
+    return text.count("{") <= text.count("}")
+
+
+_GO_METHOD = re.compile(r"^\s*func\s*\(\s*(?:\w+\s+)?\*?\s*([A-Za-z_]\w*)[^)]*\)\s*([A-Za-z_]\w*)")
+
+
+def _declaration_name(line: str) -> str:
+    go_method = _GO_METHOD.match(line)  # func (r *Repo) Save(...) is 'Repo.Save', not the receiver
+    if go_method:
+        return f"{go_method.group(1)}.{go_method.group(2)}"
+    words = re.findall(r"[A-Za-z_$][\w$]*", line.split("(")[0].split("=")[0].split("{")[0])
+    return words[-1] if words else line.strip()[:40]
+
+
+def _split_by_lines(unit: dict, budget: int) -> list[dict]:
+    """Last resort for a single unit over budget: fixed windows of whole lines."""
+    max_chars = budget * _CHARS_PER_TOKEN
+    parts, current, size = [], [], 0
+    for line in unit["code"].splitlines(keepends=True):
+        if current and size + len(line) > max_chars:
+            parts.append("".join(current))
+            current, size = [], 0
+        current.append(line)
+        size += len(line)
+    if current:
+        parts.append("".join(current))
+    if len(parts) == 1:
+        return [unit]
+    return [
+        {"name": f"{unit['name']} (part {index} of {len(parts)})", "kind": unit["kind"], "code": part}
+        for index, part in enumerate(parts, start=1)
+    ]
+
+
+def _make_names_unique(units: list[dict]) -> None:
+    """Suffixes repeated names (overloads, redefinitions, several init() or var blocks) with '#2', '#3'..."""
+    counts = {}
+    for unit in units:
+        counts[unit["name"]] = counts.get(unit["name"], 0) + 1
+        if counts[unit["name"]] > 1:
+            unit["name"] = f"{unit['name']}#{counts[unit['name']]}"
+
+
+def split_into_units(code: str, filename: str, budget: int = CHUNK_TOKEN_BUDGET) -> tuple[str, list[dict]]:
+    """
+    Splits a source file into a shared preamble and top-level units.
+
+    Python uses `ast` (functions and classes; oversized classes are split per method).
+    Other extensions split at top-level declaration lines, and oversized blocks at their
+    member declarations. Any unit still over the budget is cut into line windows.
+
+    Returns:
+        A tuple (preamble, units) where each unit is a dict with 'name' (unique within
+        the file), 'kind' and 'code'.
+    """
+    extension = os.path.splitext(filename)[1].lower()
+    parsed = _python_units(code) if extension in ('.py', '') else None
+    if parsed is not None:
+        preamble, units = parsed
+        expanded = []
+        for unit in units:
+            if unit["kind"] == "class" and estimate_tokens(unit["code"]) > budget:
+                expanded.extend(_split_python_class(code, unit, budget))
+            else:
+                expanded.append(unit)
+        units = expanded
+    else:
+        preamble, units = _fallback_units(code, extension)
+        expanded = []
+        for unit in units:
+            if estimate_tokens(unit["code"]) > budget:
+                expanded.extend(_split_block_members(unit, extension))
+            else:
+                expanded.append(unit)
+        units = expanded
+
+    _make_names_unique(units)
+    final_units = []
+    for unit in units:
+        unit.pop("node", None)
+        final_units.extend(_split_by_lines(unit, budget) if estimate_tokens(unit["code"]) > budget else [unit])
+    return preamble, final_units
+
+
+# --- Packing ---
+def pack_units(preamble: str, units: list[dict], budget: int = CHUNK_TOKEN_BUDGET) -> list[dict]:
+    """
+    Greedily packs units (in source order) into chunks whose estimated size, preamble
+    included, stays within the budget. A unit that alone exceeds it gets its own chunk.
+
+    Returns:
+        A list of chunks, each a dict with 'symbols' (unit names) and 'code'.
+    """
+    preamble_tokens = estimate_tokens(preamble)
+    chunks, current, current_tokens = [], [], preamble_tokens
+
+    for unit in units:
+        unit_tokens = estimate_tokens(unit["code"]) + 1
+        if current and current_tokens + unit_tokens > budget:
+            chunks.append(current)
+            current, current_tokens = [], preamble_tokens
+        current.append(unit)
+        current_tokens += unit_tokens
+    if current:
+        chunks.append(current)
+
+    return [
+        {
+            "symbols": [unit["name"] for unit in chunk],
+            "code": (preamble.rstrip() + "\n\n\n" if preamble.strip() else "") + "\n\n".join(unit["code"].rstrip() for unit in chunk) + "\n",
+        }
+        for chunk in chunks
+    ]
+
+
+def chunk_source(code: str, filename: str, budget: int = CHUNK_TOKEN_BUDGET) -> list[dict]:
+    """
+    Returns the chunks to generate tests for. Sources within the budget come back as a
+    single chunk with 'symbols' set to None (meaning: the whole module).
+    """
+    if estimate_tokens(code) <= budget:
+        return [{"symbols": None, "code": code}]
+    preamble, units = split_into_units(code, filename, budget)
+    if len(units) <= 1:
+        return [{"symbols": None, "code": code}]
+    return pack_units(preamble, units, budget)
+
+
+# --- Stitching ---
+_PY_IMPORT = re.compile(r"^(import\s+\S|from\s+\S+\s+import\s)")
+_PY_MAIN_GUARD = re.compile(r"^if\s+__name__\s*==\s*['\"]__main__['\"]\s*:")
+_PY_TOP_LEVEL_DEF = re.compile(r"^(class|def|async\s+def)\s+(\w+)", re.MULTILINE)
+_BRACE_IMPORTS = {
+    "java": re.compile(r"^(package\s+[\w.]+|import\s+(static\s+)?[\w.*]+)\s*;\s*$"),
+    "c#": re.compile(r"^using\s+[\w.=\s]+;\s*$"),
+    "csharp": re.compile(r"^using\s+[\w.=\s]+;\s*$"),
+    "ruby": re.compile(r"^require(_relative)?\s.*$"),
+}
+_TEST_CLASS = re.compile(
+    r"^[ \t]*(?:(?:public|private|protected|internal|static|final|abstract|sealed|partial)\s+)*class\s+\w+[^{;]*\{",
+    re.MULTILINE)
+_LITERALS_AND_COMMENTS = re.compile(r'"(?:\\.|[^"\\])*"|\'(?:\\.|[^\'\\])*\'|`[^`]*`|//.*$|/\*.*?\*/')
+_GO_PACKAGE = re.compile(r"^package\s+\w+$")
+_GO_FUNC = re.compile(r"^func\s+(\w+)\s*[(\[]", re.MULTILINE)
+_JS_IMPORT = re.compile(r"^import\s+(?P<type>type\s+)?(?P<clause>.+?)\s+from\s+(?P<spec>'[^']*'|\"[^\"]*\")\s*;?$", re.S)
+_JS_REQUIRE = re.compile(r"^(?P<keyword>const|let|var)\s+(?P<target>.+?)\s*=\s*(?P<init>require\s*\(.*)$", re.S)
+_JS_DECLARATION = re.compile(r"^(?:const|let|var)\s+(?P<name>[\w$]+)\s*[=;]")
+
+
+def _split_python_script(script: str) -> tuple[list[str], str, str | None]:
+    """Separates top-level imports, the body, and the `if __name__ == '__main__'` block."""
+    imports, body, main_block = [], [], None
+    lines = script.splitlines()
+    index = 0
+    while index < len(lines):
+        line = lines[index]
+        if _PY_IMPORT.match(line):
+            statement = [line]
+            if "(" in line and ")" not in line:
+                while index + 1 < len(lines) and ")" not in statement[-1]:
+                    index += 1
+                    statement.append(lines[index])
+            imports.append("\n".join(statement))
+        elif _PY_MAIN_GUARD.match(line):
+            block = [line]
+            while index + 1 < len(lines) and (not lines[index + 1].strip() or lines[index + 1][0].isspace()):
+                index += 1
+                block.append(lines[index])
+            main_block = "\n".join(block).rstrip()
+        else:
+            body.append(line)
+        index += 1
+    return imports, "\n".join(body).strip(), main_block
+
+
+def _rename_duplicate_definitions(body: str, seen: set) -> str:
+    """Suffixes top-level classes/functions already defined by an earlier chunk, so none shadows another."""
+    renames = {}
+    for _, name in _PY_TOP_LEVEL_DEF.findall(body):
+        if name in seen and name not in renames:
+            suffix = 2
+            while f"{name}_{suffix}" in seen:
+                suffix += 1
+            renames[name] = f"{name}_{suffix}"
+        seen.add(renames.get(name, name))
+    for old, new in renames.items():
+        body = re.sub(rf"^(class|def|async\s+def)\s+{re.escape(old)}\b", rf"\1 {new}", body, flags=re.MULTILINE)
+    return body
+
+
+def _code_only(line: str) -> str:
+    return _LITERALS_AND_COMMENTS.sub("", line)
+
+
+def _matching_brace(text: str, open_index: int) -> int | None:
+    """Index of the brace closing the one at open_index, ignoring braces in strings and comments."""
+    depth = 0
+    index = open_index
+    while index < len(text):
+        if text.startswith("//", index):
+            index = text.find("\n", index)
+            if index == -1:
+                return None
+            continue
+        if text.startswith("/*", index):
+            index = text.find("*/", index + 2)
+            if index == -1:
+                return None
+            index += 2
+            continue
+        char = text[index]
+        if char in "\"'`":
+            index += 1
+            while index < len(text) and text[index] != char:
+                index += 2 if text[index] == "\\" else 1
+        elif char == "{":
+            depth += 1
+        elif char == "}":
+            depth -= 1
+            if depth == 0:
+                return index
+        index += 1
+    return None
+
+
+def _split_members(class_body: str) -> list[str]:
+    """Splits a class body into members (fields end with ';', methods and nested types with their closing brace)."""
+    members, current, depth = [], [], 0
+    for line in class_body.splitlines():
+        if not current and not line.strip():
+            continue
+        current.append(line)
+        code = _code_only(line).strip()
+        depth += code.count("{") - code.count("}")
+        if depth <= 0 and code.endswith((";", "}")):
+            members.append("\n".join(current).rstrip())
+            current, depth = [], 0
+    if "\n".join(current).strip():
+        members.append("\n".join(current).rstrip())
+    return members
+
+
+def _rename_duplicate_method(member: str, seen: set) -> str:
+    """Suffixes a method whose name an earlier chunk already used (test methods take no overloads)."""
+    lines = member.splitlines()
+    signature_index = next((i for i, l in enumerate(lines) if l.strip() and not _is_leading_decoration(l)), None)
+    if signature_index is None:
+        return member
+    head = lines[signature_index].split("{")[0]
+    if "(" not in head or "=" in head.split("(")[0]:
+        return member  # A field, not a method
+    name = _declaration_name(head)
+    new_name = name
+    suffix = 2
+    while new_name in seen:
+        new_name = f"{name}_{suffix}"
+        suffix += 1
+    seen.add(new_name)
+    if new_name != name:
+        lines[signature_index] = re.sub(rf"\b{re.escape(name)}(\s*\()", rf"{new_name}\1", lines[signature_index], count=1)
+    return "\n".join(lines)
+
+
+def _merge_class_bodies(bodies: list[str]) -> str | None:
+    """
+    Java/C#: every chunk's script declares the same test class, so the members of all
+    of them are moved into the first script's class. Identical members (shared fields,
+    setup methods) are kept once and clashing method names are suffixed. Returns None if
+    a script has no recognizable class.
+    """
+    spans = []
+    for body in bodies:
+        match = _TEST_CLASS.search(body)
+        close_index = _matching_brace(body, match.end() - 1) if match else None
+        if close_index is None:
+            return None
+        spans.append((match.end() - 1, close_index))
+
+    members, seen_members, seen_methods = [], set(), set()
+    for body, (open_index, close_index) in zip(bodies, spans):
+        for member in _split_members(body[open_index + 1:close_index]):
+            normalized = " ".join(member.split())
+            if normalized in seen_members:
+                continue
+            seen_members.add(normalized)
+            members.append(_rename_duplicate_method(member, seen_methods))
+
+    first, (open_index, close_index) = bodies[0], spans[0]
+    line_start = first.rfind("\n", 0, close_index) + 1
+    closing = first[line_start:] if not first[line_start:close_index].strip() else first[close_index:]
+    return f"{first[:open_index + 1]}\n" + "\n\n".join(members) + f"\n{closing}"
+
+
+def _merge_go_scripts(scripts: list[str]) -> str:
+    """
+    Go: one package clause and one import block for all chunks; identical top-level
+    declarations are kept once and clashing function names are suffixed.
+    """
+    package, import_specs, blocks = None, [], []
+    seen_blocks, seen_funcs = set(), set()
+    for script in scripts:
+        lines = script.splitlines()
+        body = []
+        index = 0
+        while index < len(lines):
+            stripped = lines[index].strip()
+            if _GO_PACKAGE.match(stripped):
+                package = package or stripped
+            elif re.match(r"^import\s*\($", stripped):
+                index += 1
+                while index < len(lines) and lines[index].strip() != ")":
+                    if lines[index].strip():
+                        import_specs.append(lines[index].strip())
+                    index += 1
+            elif re.match(r"^import\s", stripped):
+                import_specs.append(stripped[len("import"):].strip())
+            else:
+                body.append(lines[index])
+            index += 1
+
+        preamble, units = _fallback_units("\n".join(body) + "\n", '.go')
+        for block in ([preamble] if preamble.strip() else []) + [unit["code"] for unit in units]:
+            block = block.strip()
+            normalized = " ".join(block.split())
+            if normalized in seen_blocks:
+                continue
+            seen_blocks.add(normalized)
+            for name in _GO_FUNC.findall(block)[:1]:
+                new_name, suffix = name, 2
+                while new_name in seen_funcs:
+                    new_name, suffix = f"{name}_{suffix}", suffix + 1
+                seen_funcs.add(new_name)
+                if new_name != name:
+                    block = re.sub(rf"^func\s+{re.escape(name)}\b", f"func {new_name}", block, count=1, flags=re.MULTILINE)
+            blocks.append(block)
+
+    sections = [package] if package else []
+    unique_specs = list(dict.fromkeys(import_specs))
+    if unique_specs:
+        sections.append("import (\n" + "\n".join(f"\t{spec}" for spec in unique_specs) + "\n)")
+    sections.extend(blocks)
+    return "\n\n".join(sections) + "\n"
+
+
+def _js_statement_end(lines: list[str], index: int) -> int:
+    """Index of the last line of the statement starting at lines[index], by bracket balance."""
+    depth = 0
+    for end in range(index, len(lines)):
+        code = _code_only(lines[end])
+        depth += sum(code.count(c) for c in "({[") - sum(code.count(c) for c in ")}]")
+        if depth <= 0:
+            return end
+    return len(lines) - 1
+
+
+def _js_bindings(entries: str) -> list[tuple[str, str]]:
+    """(entry, local name) for each entry of an import or destructuring clause `a, b as c, d: e`."""
+    bindings = []
+    for entry in (part.strip() for part in entries.split(",")):
+        if entry:
+            bindings.append((entry, re.split(r"\s+as\s+|\s*:\s*", entry)[-1].strip()))
+    return bindings
+
+
+def _dedupe_js_import(statement: str, seen: set) -> str | None:
+    """
+    The import/require statement without the bindings an earlier chunk already declared,
+    or None if nothing new is left. Unchanged statements keep their original text.
+    """
+    flat = " ".join(statement.split())
+    match = _JS_IMPORT.match(flat)
+    if match:
+        clause = match.group("clause")
+        braced = re.search(r"\{(.*)\}", clause)
+        named = _js_bindings(braced.group(1)) if braced else []
+        plain = [part.strip() for part in (clause[:braced.start()] if braced else clause).split(",") if part.strip()]
+        plain = [(part, part.split()[-1]) for part in plain]  # 'Default' or '* as ns'
+        kept_plain = [entry for entry, name in plain if name not in seen]
+        kept_named = [entry for entry, name in named if name not in seen]
+        seen.update(name for _, name in plain + named)
+        if not kept_plain and not kept_named:
+            return None
+        if len(kept_plain) == len(plain) and len(kept_named) == len(named):
+            return statement
+        parts = kept_plain + (["{ " + ", ".join(kept_named) + " }"] if kept_named else [])
+        return f"import {match.group('type') or ''}{', '.join(parts)} from {match.group('spec')};"
+
+    match = _JS_REQUIRE.match(flat)
+    if match:
+        target = match.group("target")
+        braced = re.fullmatch(r"\{(.*)\}", target)
+        bindings = _js_bindings(braced.group(1)) if braced else [(target, target)]
+        kept = [entry for entry, name in bindings if name not in seen]
+        seen.update(name for _, name in bindings)
+        if not kept:
+            return None
+        if len(kept) == len(bindings):
+            return statement
+        return f"{match.group('keyword')} {{ {', '.join(kept)} }} = {match.group('init').rstrip(';')};"
+
+    # Side-effect import ('import "./setup";'): kept once
+    if flat in seen:
+        return None
+    seen.add(flat)
+    return statement
+
+
+def _merge_js_scripts(scripts: list[str]) -> str:
+    """
+    JavaScript/TypeScript: imports and requires are hoisted, and a binding that an earlier
+    chunk already declared (by import, require or a top-level const/let/var) is not
+    declared again, so the merged module has no redeclaration errors.
+    """
+    imports, bodies = [], []
+    seen = set()
+    for script in scripts:
+        lines = script.splitlines()
+        body = []
+        index = 0
+        while index < len(lines):
+            line = lines[index]
+            end = index
+            if re.match(r"^(import\s|import\{|(const|let|var)\s.*=\s*require\s*\()", line):
+                end = _js_statement_end(lines, index)
+                statement = _dedupe_js_import("\n".join(lines[index:end + 1]), seen)
+                if statement is not None:
+                    imports.append(statement)
+            elif _JS_DECLARATION.match(line):
+                end = _js_statement_end(lines, index)
+                name = _JS_DECLARATION.match(line).group("name")
+                if name not in seen:
+                    seen.add(name)
+                    body.extend(lines[index:end + 1])
+            else:
+                body.append(line)
+            index = end + 1
+        bodies.append("\n".join(body).strip())
+
+    sections = ["\n".join(imports)] if imports else []
+    sections.extend(body for body in bodies if body)
+    return "\n\n\n".join(sections) + "\n"
+
+
+def merge_test_scripts(scripts: list[str], language: str = "python") -> str:
+    """
+    Stitches test scripts generated for separate chunks of one module into a single
+    test module: imports are hoisted and deduplicated, and for Python duplicate
+    top-level test classes/functions are renamed and a single __main__ block is kept.
+    Java/C# test classes are merged into one class, Go gets one package clause
+    and one import block, and JavaScript/TypeScript bindings are declared once.
+    """
+    scripts = [script for script in scripts if script and script.strip()]
+    if len(scripts) <= 1:
+        return scripts[0] if scripts else ""
+
+    language = language.lower()
+    if language in ("go", "golang"):
+        return _merge_go_scripts(scripts)
+    if language in ("javascript", "typescript", "js", "ts"):
+        return _merge_js_scripts(scripts)
+    imports, bodies = [], []
+
+    if language == "python":
+        main_block = None
+        seen_definitions = set()
+        for script in scripts:
+            script_imports, body, script_main = _split_python_script(script)
+            imports.extend(script_imports)
+            bodies.append(_rename_duplicate_definitions(body, seen_definitions))
+            main_block = main_block or script_main
+        if main_block:
+            bodies.append(main_block)
+    else:
+        import_pattern = _BRACE_IMPORTS.get(language)
+        for script in scripts:
+            body = []
+            for line in script.splitlines():
+                if import_pattern and import_pattern.match(line):
+                    imports.append(line.strip())
+                else:
+                    body.append(line)
+            bodies.append("\n".join(body).strip())
+        if language in ("java", "c#", "csharp"):
+            merged = _merge_class_bodies(bodies)
+            bodies = [merged] if merged is not None else bodies
+
+    unique_imports = list(dict.fromkeys(" ".join(i.split()) if "\n" not in i else i for i in imports))
+    sections = ["\n".join(unique_imports)] if unique_imports else []
+    sections.extend(body for body in bodies if body)
+    return "\n\n\n".join(sections) + "\n"
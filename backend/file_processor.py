@@ -1,85 +1,199 @@
 import os
+import posixpath
+import shutil
+import tempfile
 import zipfile
+from flask import Request
 from werkzeug.utils import secure_filename # Already in Flask dependencies
 
-def handle_and_extract_code(uploaded_file_obj, upload_type: str, temp_dir: str, secured_base_filename: str):
+import source_selector
+
+# Extensions treated as source code inside a zip
+CODE_FILE_EXTENSIONS = ('.py', '.js', '.java', '.ts', '.cs', '.go', '.rb', '.jsx', '.tsx')
+
+# --- Zip resource limits (protect workers against zip bombs) ---
+ZIP_SPOOL_MAX_BYTES = int(os.environ.get('ZIP_SPOOL_MAX_BYTES', str(8 * 1024 * 1024)))
+ZIP_MAX_MEMBERS = int(os.environ.get('ZIP_MAX_MEMBERS', '5000'))
+ZIP_MAX_TOTAL_UNCOMPRESSED_BYTES = int(os.environ.get('ZIP_MAX_TOTAL_UNCOMPRESSED_BYTES', str(64 * 1024 * 1024)))
+ZIP_MAX_COMPRESSION_RATIO = float(os.environ.get('ZIP_MAX_COMPRESSION_RATIO', '100'))
+# Members smaller than this are exempt from the ratio check (tiny files compress oddly).
+ZIP_RATIO_CHECK_MIN_BYTES = int(os.environ.get('ZIP_RATIO_CHECK_MIN_BYTES', str(1024 * 1024)))
+GITIGNORE_MAX_BYTES = 64 * 1024  # Larger .gitignore files in an archive are not read
+
+_READ_CHUNK_BYTES = 64 * 1024
+
+
+class SpooledUploadRequest(Request):
+    """
+    Request class (app.request_class) that keeps uploaded files in memory up to
+    ZIP_SPOOL_MAX_BYTES. Werkzeug's default moves every upload over 500KB to a
+    temporary file on disk.
+    """
+
+    def _get_file_stream(self, total_content_length, content_type, filename=None, content_length=None):
+        return tempfile.SpooledTemporaryFile(max_size=ZIP_SPOOL_MAX_BYTES, mode='rb+')
+
+
+def _spool_upload(file_stream):
+    """
+    Returns a seekable file object for the upload stream. Streams that are already
+    seekable (every upload parsed through SpooledUploadRequest) are used as-is; others
+    are copied into a SpooledTemporaryFile that stays in memory up to ZIP_SPOOL_MAX_BYTES.
     """
-    Saves the uploaded file, extracts code content.
-    If it's a zip, it concatenates content of recognized code files.
+    if getattr(file_stream, 'seekable', lambda: False)():
+        file_stream.seek(0)
+        return file_stream
+    spool = tempfile.SpooledTemporaryFile(max_size=ZIP_SPOOL_MAX_BYTES)
+    shutil.copyfileobj(file_stream, spool, _READ_CHUNK_BYTES)
+    spool.seek(0)
+    return spool
+
+
+def _is_safe_member_path(path: str) -> bool:
+    """False for normalized archive paths that would leave the archive's folder ('..', absolute, drive letters)."""
+    first = path.split('/', 1)[0]
+    return path not in ('', '.') and first != '..' and not path.startswith('/') and ':' not in first
+
+
+def _read_member(zip_ref: zipfile.ZipFile, info: zipfile.ZipInfo, budget: int) -> bytes:
+    """
+    Decompresses one member, counting the bytes actually produced rather than trusting
+    the sizes in the zip header, and aborts once `budget` or the declared size is exceeded.
+    """
+    chunks = []
+    read_total = 0
+    with zip_ref.open(info, 'r') as member:
+        while True:
+            chunk = member.read(_READ_CHUNK_BYTES)
+            if not chunk:
+                break
+            read_total += len(chunk)
+            if read_total > budget:
+                raise ValueError("Zip archive exceeds the maximum total uncompressed size.")
+            if read_total > info.file_size:
+                raise ValueError(f"Zip member '{info.filename}' is larger than its declared size.")
+            chunks.append(chunk)
+    return b"".join(chunks)
+
+
+def extract_zip_code_files(uploaded_file_obj, selector: source_selector.SourceSelector | None = None) \
+        -> list[tuple[str, str]]:
+    """
+    Reads a zip straight from the upload stream and decodes only the members whose
+    extensions are in CODE_FILE_EXTENSIONS and that `selector` accepts. Excluded paths
+    (vendored folders, the archive's .gitignore rules, ...) are never decompressed.
+    With SpooledUploadRequest as the app's request class, nothing is written to disk
+    unless the upload is larger than ZIP_SPOOL_MAX_BYTES.
+
+    Args:
+        uploaded_file_obj: The file object from Flask request.files.
+        selector: The source selection rules; its `skipped` list records every code file
+            left out and why. Defaults to a SourceSelector with the default rules.
+
+    Returns:
+        List of (relative_path, content) tuples in archive-path order; empty if the
+        zip holds no selected code.
+
+    Raises:
+        ValueError: If the upload is not a zip or breaks one of the ZIP_* limits.
+    """
+    if selector is None:
+        selector = source_selector.SourceSelector()
+    archive_stream = _spool_upload(uploaded_file_obj.stream)
+
+    if not zipfile.is_zipfile(archive_stream):
+        raise ValueError("Uploaded file was marked as 'zip' but is not a valid zip archive.")
+    archive_stream.seek(0)
+
+    code_files = []
+    with zipfile.ZipFile(archive_stream, 'r') as zip_ref:
+        infos = zip_ref.infolist()
+        if len(infos) > ZIP_MAX_MEMBERS:
+            raise ValueError(f"Zip archive has {len(infos)} entries; the limit is {ZIP_MAX_MEMBERS}.")
+
+        remaining_budget = ZIP_MAX_TOTAL_UNCOMPRESSED_BYTES
+        # Archive paths should use '/'; normalize away '\\', './' and leading slashes
+        files = sorted((posixpath.normpath(info.filename.replace('\\', '/').lstrip('/')), info)
+                       for info in infos if not info.is_dir())
+        for relative_path, info in files:
+            if not _is_safe_member_path(relative_path) and relative_path.lower().endswith(CODE_FILE_EXTENSIONS):
+                selector.skip(info.filename, "unsafe_path", "leaves the archive's folder")
+        files = [(relative_path, info) for relative_path, info in files if _is_safe_member_path(relative_path)]
+        # A zip of a project folder has everything under one top-level folder: that is the project root
+        top_folders = {path.split('/', 1)[0] if '/' in path else None
+                       for path, _ in files if not path.startswith('__MACOSX/')}
+        if len(top_folders) == 1 and None not in top_folders:
+            selector.set_project_root(top_folders.pop())
+
+        for relative_path, info in files:
+            if posixpath.basename(relative_path) == '.gitignore' and info.file_size <= GITIGNORE_MAX_BYTES:
+                raw_bytes = _read_member(zip_ref, info, remaining_budget)
+                remaining_budget -= len(raw_bytes)
+                selector.add_gitignore(relative_path, raw_bytes.decode('utf-8', errors='ignore'))
+
+        code_infos = [
+            (relative_path, info) for relative_path, info in files
+            if relative_path.lower().endswith(CODE_FILE_EXTENSIONS) and selector.accept_path(relative_path, info.file_size)
+        ]
+
+        declared_total = sum(info.file_size for _, info in code_infos)
+        if declared_total > remaining_budget:
+            raise ValueError("Zip archive exceeds the maximum total uncompressed size.")
+
+        for relative_path, info in code_infos:
+            if info.file_size >= ZIP_RATIO_CHECK_MIN_BYTES and \
+                    info.file_size / max(info.compress_size, 1) > ZIP_MAX_COMPRESSION_RATIO:
+                raise ValueError(f"Zip member '{info.filename}' exceeds the maximum compression ratio.")
+
+            try:
+                raw_bytes = _read_member(zip_ref, info, remaining_budget)
+            except ValueError:
+                raise
+            except Exception as e_read:
+                print(f"Warning: Could not read file {info.filename} from zip: {e_read}")
+                continue
+            remaining_budget -= len(raw_bytes)
+            content = raw_bytes.decode('utf-8', errors='ignore')
+            if selector.accept_content(relative_path, content):
+                code_files.append((relative_path, content))
+
+    if selector.skipped:
+        print(f"Source selection: kept {len(code_files)} code file(s), skipped {len(selector.skipped)}.", flush=True)
+    return code_files
+
+
+def handle_and_extract_code(uploaded_file_obj, upload_type: str, secured_base_filename: str,
+                            selector: source_selector.SourceSelector | None = None) -> str:
+    """
+    Extracts code content from an upload, in memory: single files are read from the
+    upload stream; for zips the content of recognized code files is concatenated.
+    Nothing is saved under a shared path, so concurrent uploads of files with the same
+    name cannot see each other's code.
 
     Args:
         uploaded_file_obj: The file object from Flask request.files.
         upload_type: 'single' or 'zip'.
-        temp_dir: The directory to temporarily save uploads.
         secured_base_filename: The sanitized filename.
+        selector: Source selection rules for zips (see extract_zip_code_files).
 
     Returns:
-        A tuple (str_code_content, path_to_cleanup) or (None, None) on error.
-        str_code_content: String containing the code content(s).
-        path_to_cleanup: The path of the initially saved file (or extracted dir) that app.py should clean.
-    """
+        The code content(s); empty if a zip holds no selected code.
 
-    saved_file_path = os.path.join(temp_dir, secured_base_filename)
-    uploaded_file_obj.save(saved_file_path)
-
-    all_code_extracted = []
-    path_to_cleanup_after_use = saved_file_path # This will be the default path to cleanup
-
-    try:
-        if upload_type == 'zip':
-            if zipfile.is_zipfile(saved_file_path):
-                # Create a temporary directory for extracting zip contents
-                extracted_zip_dir = os.path.join(temp_dir, f"extracted_{secured_base_filename.rsplit('.', 1)[0]}")
-                os.makedirs(extracted_zip_dir, exist_ok=True)
-                path_to_cleanup_after_use = extracted_zip_dir # Now we clean up this whole dir
-
-                with zipfile.ZipFile(saved_file_path, 'r') as zip_ref:
-                    zip_ref.extractall(extracted_zip_dir)
-
-                # Walk through extracted files
-                for root, _, files in os.walk(extracted_zip_dir):
-                    for file in files:
-                        if file.endswith(('.py', '.js', '.java', '.ts', '.cs', '.go', '.rb', '.jsx', '.tsx')): # Add more code extensions
-                            try:
-                                with open(os.path.join(root, file), 'r', encoding='utf-8', errors='ignore') as code_f:
-                                    all_code_extracted.append(f"# File: {os.path.join(os.path.relpath(root, extracted_zip_dir), file)}\n\n{code_f.read()}")
-                            except Exception as e_read:
-                                print(f"Warning: Could not read file {file} from zip: {e_read}")
-
-                os.remove(saved_file_path) # Remove the original zip file now
-
-                if not all_code_extracted:
-                    # If no code files found, but it was a zip.
-                    # We might still want to return None or an error for the caller.
-                    # For now, returning empty string, caller (app.py) should check.
-                    print(f"Warning: No recognized code files found in zip {secured_base_filename}")
-                    return "", path_to_cleanup_after_use
-
-            else: # Not a valid zip file
-                os.remove(saved_file_path)
-                raise ValueError("Uploaded file was marked as 'zip' but is not a valid zip archive.")
-
-        elif upload_type == 'single':
-            with open(saved_file_path, 'r', encoding='utf-8', errors='ignore') as f:
-                all_code_extracted.append(f.read())
-            # For single files, app.py will remove 'saved_file_path' after use.
-
-        else: # Unknown upload type
-            os.remove(saved_file_path)
-            raise ValueError(f"Unknown upload type: '{upload_type}'")
+    Raises:
+        ValueError: If upload_type is unknown, or the zip is invalid or breaks a ZIP_* limit.
+    """
 
+    if upload_type == 'zip':
+        code_files = extract_zip_code_files(uploaded_file_obj, selector)
+        if not code_files:
+            # Returning empty string, caller (app.py) should check.
+            print(f"Warning: No recognized code files found in zip {secured_base_filename}")
+            return ""
         # Join all extracted code pieces. Add separators for clarity if multiple files.
-        # This simple join might be too naive for large projects from a zip.
-        # Consider if you want to send one file at a time, or a summary, or let user choose.
-        final_code_content = "\n\n\n\n".join(all_code_extracted)
-        return final_code_content, path_to_cleanup_after_use
-
-    except Exception as e:
-        # Clean up if an error occurred during processing
-        if os.path.exists(saved_file_path):
-            os.remove(saved_file_path)
-        if 'extracted_zip_dir' in locals() and os.path.exists(extracted_zip_dir):
-            import shutil
-            shutil.rmtree(extracted_zip_dir)
-        print(f"Error in handle_and_extract_code: {e}")
-        raise # Re-raise the exception to be caught by app.py for a proper HTTP response
\ No newline at end of file
+        # For large projects prefer zipMode=per_file, which sends one file at a time.
+        return "\n\n\n\n".join(f"# File: {path}\n\n{content}" for path, content in code_files)
+
+    if upload_type != 'single': # Unknown upload type
+        raise ValueError(f"Unknown upload type: '{upload_type}'")
+
+    return uploaded_file_obj.read().decode('utf-8', errors='ignore')
@@ -0,0 +1,231 @@
+# backend/generation_cache.py
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+
+# --- Configuration ---
+GENERATION_CACHE_MAX_ENTRIES = int(os.environ.get('GENERATION_CACHE_MAX_ENTRIES', '256'))
+GENERATION_CACHE_TTL_SECONDS = float(os.environ.get('GENERATION_CACHE_TTL_SECONDS', str(7 * 24 * 3600)))
+# Leave GENERATION_CACHE_DIR unset to keep the cache in memory only.
+GENERATION_CACHE_DIR = os.environ.get('GENERATION_CACHE_DIR') or None
+GENERATION_CACHE_DISK_MAX_BYTES = int(os.environ.get('GENERATION_CACHE_DISK_MAX_BYTES', str(256 * 1024 * 1024)))
+# How often the disk index is rebuilt from the directory, to pick up files written by other workers
+GENERATION_CACHE_DISK_RESCAN_SECONDS = float(os.environ.get('GENERATION_CACHE_DISK_RESCAN_SECONDS', '300'))
+
+
+def make_cache_key(prompt: str | list[dict], model_tag: str) -> str:
+    """
+    Returns a content address for a generation: the SHA-256 of the final prompt (or
+    chat messages) and the model tag. Anything that changes the prompt (code, language,
+    framework, instructions) or the model produces a different key.
+    """
+    payload = json.dumps([model_tag, prompt], ensure_ascii=False)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+class GenerationCache:
+    """
+    Two-tier cache for generated test scripts.
+
+    The memory tier is an LRU bounded by `max_entries`. The optional disk tier stores
+    one JSON file per key under `disk_dir`, so entries survive restarts; it is bounded
+    by `disk_max_bytes` (least recently used files are evicted first). Sizes are tracked
+    in an in-process index, so a write does not walk the directory; the index is rebuilt
+    every `disk_rescan_seconds`. Both tiers honour `ttl_seconds`.
+    """
+
+    def __init__(self, max_entries: int = GENERATION_CACHE_MAX_ENTRIES,
+                 ttl_seconds: float = GENERATION_CACHE_TTL_SECONDS,
+                 disk_dir: str | None = GENERATION_CACHE_DIR,
+                 disk_max_bytes: int = GENERATION_CACHE_DISK_MAX_BYTES,
+                 disk_rescan_seconds: float = GENERATION_CACHE_DISK_RESCAN_SECONDS):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.disk_dir = disk_dir
+        self.disk_max_bytes = disk_max_bytes
+        self.disk_rescan_seconds = disk_rescan_seconds
+
+        self._entries = OrderedDict()  # key -> (value, created_at)
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._disk_hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._disk_evictions = 0
+
+        self._disk_lock = threading.Lock()
+        self._disk_index = OrderedDict()  # path -> size, least recently used first
+        self._disk_bytes = 0
+        self._disk_scanned_at = None
+
+        if self.disk_dir:
+            os.makedirs(self.disk_dir, exist_ok=True)
+
+    # --- Public API ---
+    def get(self, key: str) -> str | None:
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                value, created_at = entry
+                if now - created_at <= self.ttl_seconds:
+                    self._entries.move_to_end(key)
+                    self._hits += 1
+                    return value
+                del self._entries[key]
+
+        disk_entry = self._read_disk(key, now)
+        with self._lock:
+            if disk_entry is None:
+                self._misses += 1
+                return None
+            value, created_at = disk_entry
+            self._hits += 1
+            self._disk_hits += 1
+            self._store_in_memory(key, value, created_at)
+            return value
+
+    def set(self, key: str, value: str) -> None:
+        created_at = time.time()
+        with self._lock:
+            self._store_in_memory(key, value, created_at)
+        self._write_disk(key, value, created_at)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+        if self.disk_dir:
+            with self._disk_lock:
+                for path, _, _ in self._disk_files():
+                    try:
+                        os.remove(path)
+                    except OSError:
+                        pass
+                self._disk_index.clear()
+                self._disk_bytes = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl_seconds,
+                "disk_enabled": bool(self.disk_dir),
+                "hits": self._hits,
+                "disk_hits": self._disk_hits,
+                "misses": self._misses,
+                "evictions": self._evictions,
+                "disk_evictions": self._disk_evictions,
+                "hit_ratio": (self._hits / lookups) if lookups else 0.0,
+            }
+
+    # --- Memory tier (caller holds self._lock) ---
+    def _store_in_memory(self, key: str, value: str, created_at: float) -> None:
+        self._entries[key] = (value, created_at)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self._evictions += 1
+
+    # --- Disk tier ---
+    def _disk_path(self, key: str) -> str:
+        return os.path.join(self.disk_dir, key[:2], f"{key}.json")
+
+    def _disk_files(self):
+        """Yields (path, size, mtime) for every entry file in the disk tier."""
+        for root, _, files in os.walk(self.disk_dir):
+            for name in files:
+                if not name.endswith('.json'):
+                    continue
+                path = os.path.join(root, name)
+                try:
+                    st = os.stat(path)
+                except OSError:
+                    continue
+                yield path, st.st_size, st.st_mtime
+
+    def _read_disk(self, key: str, now: float):
+        if not self.disk_dir:
+            return None
+        path = self._disk_path(key)
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                record = json.load(f)
+        except (OSError, ValueError):
+            return None
+
+        created_at = record.get('created_at', 0)
+        if now - created_at > self.ttl_seconds:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            with self._disk_lock:
+                self._disk_bytes -= self._disk_index.pop(path, 0)
+            return None
+
+        try:
+            os.utime(path)  # Mark as recently used, for the index rebuilt at the next scan
+        except OSError:
+            pass
+        with self._disk_lock:
+            if path in self._disk_index:
+                self._disk_index.move_to_end(path)
+        return record.get('value'), created_at
+
+    def _write_disk(self, key: str, value: str, created_at: float) -> None:
+        if not self.disk_dir:
+            return
+        path = self._disk_path(key)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            data = json.dumps({"created_at": created_at, "value": value}).encode('utf-8')
+            with open(tmp_path, 'wb') as f:
+                f.write(data)
+            os.replace(tmp_path, path)  # Atomic, so concurrent readers never see half a file
+        except OSError as e:
+            print(f"Warning: Could not write generation cache entry {key}: {e}", flush=True)
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+            return
+        with self._disk_lock:
+            self._scan_disk_if_stale()
+            self._disk_bytes += len(data) - self._disk_index.pop(path, 0)
+            self._disk_index[path] = len(data)
+            self._evict_disk()
+
+    def _scan_disk_if_stale(self) -> None:
+        # Caller holds self._disk_lock
+        now = time.time()
+        if self._disk_scanned_at is not None and now - self._disk_scanned_at < self.disk_rescan_seconds:
+            return
+        files = sorted(self._disk_files(), key=lambda f: f[2])  # Oldest first
+        self._disk_index = OrderedDict((path, size) for path, size, _ in files)
+        self._disk_bytes = sum(self._disk_index.values())
+        self._disk_scanned_at = now
+
+    def _evict_disk(self) -> None:
+        # Caller holds self._disk_lock
+        evicted = 0
+        while self._disk_bytes > self.disk_max_bytes and self._disk_index:
+            path, size = self._disk_index.popitem(last=False)
+            self._disk_bytes -= size
+            try:
+                os.remove(path)
+                evicted += 1
+            except OSError:
+                pass
+        if evicted:
+            with self._lock:
+                self._disk_evictions += evicted
+
+
+# Shared instance used by llm_service and app.py
+default_cache = GenerationCache()
@@ -0,0 +1,58 @@
+# backend/gunicorn.conf.py
+"""
+Production serving mode:
+    cd backend && gunicorn -c gunicorn.conf.py app:app
+
+Each worker is a process with a pool of threads (gthread), so slow generations don't
+block other requests. The default is one worker: the job queue (/api/jobs and its
+coalescing of identical submissions), metrics and /readyz live in the worker's memory,
+so with several workers a job is only visible to the worker that queued it and each
+scrape sees one worker. To scale, run more single-worker instances (one per container)
+and scrape each of them.
+
+More than one worker (WEB_CONCURRENCY or -w) is only suitable without /api/jobs, or
+behind sticky routing, and with GENERATION_CACHE_DIR and INCREMENTAL_STORE_DIR on a
+directory every worker shares (otherwise each worker keeps its own cache and previous
+versions). The limits in
+admission.py, ollama_pool.py (OLLAMA_ENDPOINT_CONCURRENCY) and parallel_generator.py
+(LLM_MAX_WORKERS) are deployment-wide and split across the workers.
+"""
+import os
+
+bind = os.environ.get('GUNICORN_BIND', '0.0.0.0:5001')
+workers = int(os.environ.get('WEB_CONCURRENCY', '1'))
+worker_class = 'gthread'
+threads = int(os.environ.get('GUNICORN_THREADS', '16'))
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', '660'))  # Above OLLAMA_REQUEST_TIMEOUT_SECONDS
+graceful_timeout = int(os.environ.get('GUNICORN_GRACEFUL_TIMEOUT', '60'))
+keepalive = 5
+max_requests = int(os.environ.get('GUNICORN_MAX_REQUESTS', '0'))  # Recycle workers after N requests; 0 never
+max_requests_jitter = max_requests // 10
+accesslog = '-'
+errorlog = '-'
+
+
+def on_starting(server):
+    # admission.py, ollama_pool.py and parallel_generator.py divide the deployment-wide limits by
+    # WEB_CONCURRENCY. Export the worker count gunicorn actually uses (-w overrides the setting
+    # above); workers import the app after forking, so they see it (not with preload_app).
+    workers_in_use = server.cfg.workers
+    os.environ['WEB_CONCURRENCY'] = str(workers_in_use)
+    if server.cfg.preload_app and workers_in_use > 1:
+        print("Warning: with preload_app the limits were computed before WEB_CONCURRENCY was set; "
+              "set WEB_CONCURRENCY instead of -w.", flush=True)
+    if workers_in_use > 1:
+        print(f"Warning: {workers_in_use} workers. Jobs, metrics and /readyz are per worker; "
+              f"use sticky routing for /api/jobs or a single worker per instance.", flush=True)
+        for setting in ('GENERATION_CACHE_DIR', 'INCREMENTAL_STORE_DIR'):
+            if not os.environ.get(setting):
+                print(f"Warning: {setting} is not set, so each worker keeps its own copy.", flush=True)
+
+
+def post_worker_init(worker):
+    # Runs in each worker once the app is loaded; loading an already resident model is cheap
+    import app as backend_app
+    import llm_service
+    import ollama_pool
+    if backend_app.OLLAMA_WARM_UP:
+        ollama_pool.default_pool.warm_up(llm_service.DEEPSEEK_MODEL_TAG)
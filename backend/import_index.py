@@ -0,0 +1,270 @@
+# backend/import_index.py
+import ast
+import posixpath
+import re
+
+# Extensions tried, in order, when resolving a relative JS/TS import specifier
+_JS_EXTENSIONS = ('.js', '.jsx', '.ts', '.tsx')
+_JS_IMPORT = re.compile(
+    r"""^\s*import\s+(?:type\s+)?(?P<clause>[\w*{}\s,$]+?)\s+from\s+['"](?P<spec>[^'"]+)['"]""", re.MULTILINE)
+_JS_REQUIRE = re.compile(
+    r"""^\s*(?:const|let|var)\s+(?P<clause>[\w{}\s,:$]+?)\s*=\s*require\(\s*['"](?P<spec>[^'"]+)['"]\s*\)""", re.MULTILINE)
+_JS_EXPORT = re.compile(
+    r"^export\s+(?P<default>default\s+)?(?:declare\s+)?(?:abstract\s+)?(?:async\s+)?"
+    r"(?P<kind>function\*?|class|interface|type|enum|const|let|var)\s+(?P<name>[\w$]+)", re.MULTILINE)
+_JAVA_IMPORT = re.compile(r"^\s*import\s+(?:static\s+)?(?P<name>[\w.]+)\s*;", re.MULTILINE)
+_JAVA_PUBLIC_MEMBER = re.compile(r"^\s*public\s+[^;={\n]*?\)", re.MULTILINE)
+_JAVA_TYPE = re.compile(r"^\s*public\s+(?:final\s+|abstract\s+)*(?:class|interface|enum|record)\s+\w+[^{\n]*", re.MULTILINE)
+
+
+def _language_for(path: str) -> str | None:
+    extension = posixpath.splitext(path)[1].lower()
+    if extension == '.py':
+        return 'python'
+    if extension in _JS_EXTENSIONS:
+        return 'javascript'
+    if extension == '.java':
+        return 'java'
+    return None
+
+
+# --- Python ---
+def _first_doc_paragraph(node) -> str | None:
+    docstring = ast.get_docstring(node)
+    return docstring.split("\n\n")[0].strip() if docstring else None
+
+
+def _python_function_stub(node, indent: str = "") -> str:
+    prefix = "async def" if isinstance(node, ast.AsyncFunctionDef) else "def"
+    returns = f" -> {ast.unparse(node.returns)}" if node.returns else ""
+    decorators = "".join(f"{indent}@{ast.unparse(d)}\n" for d in node.decorator_list)
+    stub = f"{decorators}{indent}{prefix} {node.name}({ast.unparse(node.args)}){returns}:"
+    doc = _first_doc_paragraph(node)
+    if doc:
+        return f'{stub}\n{indent}    """{doc}"""\n{indent}    ...'
+    return f"{stub} ..."
+
+
+def _python_class_stub(node: ast.ClassDef) -> str:
+    bases = ", ".join(ast.unparse(b) for b in node.bases + node.keywords)
+    lines = [f"class {node.name}({bases}):" if bases else f"class {node.name}:"]
+    doc = _first_doc_paragraph(node)
+    if doc:
+        lines.append(f'    """{doc}"""')
+    for item in node.body:
+        if isinstance(item, (ast.FunctionDef, ast.AsyncFunctionDef)) and \
+                (not item.name.startswith('_') or item.name == '__init__'):
+            lines.append(_python_function_stub(item, indent="    "))
+        elif isinstance(item, ast.AnnAssign) and isinstance(item.target, ast.Name):
+            lines.append(f"    {item.target.id}: {ast.unparse(item.annotation)}")
+    if len(lines) == 1:
+        lines.append("    ...")
+    return "\n".join(lines)
+
+
+def _python_symbols(tree: ast.Module) -> dict[str, str]:
+    symbols = {}
+    for node in tree.body:
+        if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)):
+            symbols[node.name] = _python_function_stub(node)
+        elif isinstance(node, ast.ClassDef):
+            symbols[node.name] = _python_class_stub(node)
+        elif isinstance(node, ast.Assign) and len(node.targets) == 1 and isinstance(node.targets[0], ast.Name):
+            name = node.targets[0].id
+            if name.isupper():  # Module constants are part of the importable surface
+                symbols[name] = f"{name} = {ast.unparse(node.value)[:80]}"
+        elif isinstance(node, ast.AnnAssign) and isinstance(node.target, ast.Name):
+            symbols[node.target.id] = f"{node.target.id}: {ast.unparse(node.annotation)}"
+    return symbols
+
+
+def _dotted(node) -> str | None:
+    if isinstance(node, ast.Name):
+        return node.id
+    if isinstance(node, ast.Attribute):
+        base = _dotted(node.value)
+        return f"{base}.{node.attr}" if base else None
+    return None
+
+
+def _python_imports(tree: ast.Module, module_name: str, is_package: bool) -> list[tuple[str, list[str] | None]]:
+    """
+    Returns (imported module name, names used from it) pairs. For `import x` the names
+    are the attributes actually accessed as `x.name` in the module.
+    """
+    attribute_uses = {}
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Attribute):
+            base = _dotted(node.value)
+            if base:
+                attribute_uses.setdefault(base, set()).add(node.attr)
+
+    package = module_name if is_package else module_name.rpartition('.')[0]
+    imports = []
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Import):
+            for alias in node.names:
+                bound_name = alias.asname or alias.name
+                imports.append((alias.name, sorted(attribute_uses.get(bound_name, ()))))
+        elif isinstance(node, ast.ImportFrom):
+            base = node.module or ""
+            if node.level:
+                parts = package.split('.') if package else []
+                parts = parts[:len(parts) - (node.level - 1)] if node.level > 1 else parts
+                base = ".".join(p for p in parts + ([node.module] if node.module else []) if p)
+            names = [alias.name for alias in node.names]
+            if names == ['*']:
+                imports.append((base, None))
+                continue
+            imports.append((base, names))
+            # `from pkg import submodule` imports a whole module
+            for alias in node.names:
+                imports.append((f"{base}.{alias.name}" if base else alias.name,
+                                sorted(attribute_uses.get(alias.asname or alias.name, ()))))
+    return imports
+
+
+# --- JavaScript / TypeScript ---
+def _js_symbols(content: str) -> dict[str, str]:
+    symbols = {}
+    for match in _JS_EXPORT.finditer(content):
+        start = match.start()
+        line_end = content.find("\n", start)
+        declaration = content[start:line_end if line_end != -1 else len(content)]
+        kind = match.group('kind')
+        if kind in ('const', 'let', 'var'):
+            # Keep an arrow function's parameter list, drop its body
+            signature = declaration.split("=>")[0].rstrip() + (" => ..." if "=>" in declaration else "")
+        elif kind == 'type':
+            signature = declaration.rstrip()
+        else:
+            signature = declaration.split("{")[0].rstrip() + " { ... }"
+        doc_match = re.search(r"/\*\*(?:(?!\*/).)*\*/\s*$", content[max(0, start - 2000):start], re.DOTALL)
+        doc = doc_match.group(0).strip() + "\n" if doc_match else ""
+        stub = f"{doc}{signature}"
+        symbols[match.group('name')] = stub
+        if match.group('default'):
+            symbols['default'] = stub
+    return symbols
+
+
+def _js_imports(content: str) -> list[tuple[str, list[str] | None]]:
+    imports = []
+    for match in list(_JS_IMPORT.finditer(content)) + list(_JS_REQUIRE.finditer(content)):
+        clause, spec = match.group('clause').strip(), match.group('spec')
+        if not spec.startswith('.'):
+            continue  # Packages are not part of the upload
+        names = []
+        braces = re.search(r"\{([^}]*)\}", clause)
+        if braces:
+            names.extend(part.split(':')[0].split(' as ')[0].strip() for part in braces.group(1).split(',') if part.strip())
+        outside = re.sub(r"\{[^}]*\}", "", clause).strip(" ,")
+        if outside.startswith('*') or (outside and match.re is _JS_REQUIRE):
+            imports.append((spec, None))  # Namespace import / whole-module require
+            continue
+        if outside:
+            names.append('default')
+        imports.append((spec, names))
+    return imports
+
+
+def _resolve_js_spec(spec: str, importer_path: str, known_paths: set) -> str | None:
+    base = posixpath.normpath(posixpath.join(posixpath.dirname(importer_path), spec))
+    candidates = [base] + [base + ext for ext in _JS_EXTENSIONS] + [f"{base}/index{ext}" for ext in _JS_EXTENSIONS]
+    return next((c for c in candidates if c in known_paths), None)
+
+
+# --- Java ---
+def _java_symbols(content: str, path: str) -> dict[str, str]:
+    class_name = posixpath.splitext(posixpath.basename(path))[0]
+    type_match = _JAVA_TYPE.search(content)
+    header = type_match.group(0).strip() if type_match else f"class {class_name}"
+    members = [m.group(0).strip() + ";" for m in _JAVA_PUBLIC_MEMBER.finditer(content)
+               if not _JAVA_TYPE.match(m.group(0))]
+    return {class_name: header + " {\n" + "".join(f"    {member}\n" for member in members) + "}"}
+
+
+class UploadIndex:
+    """
+    Per-upload symbol and import-graph index over the extracted code files.
+
+    For each module it records its top-level symbols as stubs (signatures and first
+    docstring paragraph, no bodies) and the uploaded modules/symbols it imports.
+    Python is parsed with ast; JavaScript/TypeScript and Java use regexes.
+    """
+
+    def __init__(self, code_files: list[tuple[str, str]]):
+        self.paths = [path for path, _ in code_files]
+        self._symbols = {}   # path -> {name: stub}
+        self._imports = {}   # path -> [(target path, names or None)]
+        self._python_modules = {}  # dotted-name suffix -> path
+
+        parsed = {}
+        for path, content in code_files:
+            language = _language_for(path)
+            if language == 'python':
+                try:
+                    tree = ast.parse(content)
+                except SyntaxError:
+                    continue
+                parsed[path] = tree
+                self._symbols[path] = _python_symbols(tree)
+                self._register_python_module(path)
+            elif language == 'javascript':
+                self._symbols[path] = _js_symbols(content)
+            elif language == 'java':
+                self._symbols[path] = _java_symbols(content, path)
+
+        known_paths = set(self.paths)
+        for path, content in code_files:
+            language = _language_for(path)
+            if language == 'python' and path in parsed:
+                module_name = self._dotted_module_name(path)
+                is_package = posixpath.basename(path) == '__init__.py'
+                resolved = [(self._python_modules.get(name), names)
+                            for name, names in _python_imports(parsed[path], module_name, is_package)]
+            elif language == 'javascript':
+                resolved = [(_resolve_js_spec(spec, path, known_paths), names) for spec, names in _js_imports(content)]
+            elif language == 'java':
+                resolved = []
+                for match in _JAVA_IMPORT.finditer(content):
+                    suffix = match.group('name').replace('.', '/') + '.java'
+                    target = next((p for p in self.paths if p == suffix or p.endswith('/' + suffix)), None)
+                    resolved.append((target, None))
+            else:
+                resolved = []
+            self._imports[path] = [(target, names) for target, names in resolved if target and target != path]
+
+    # --- Python module naming ---
+    @staticmethod
+    def _dotted_module_name(path: str) -> str:
+        without_extension = posixpath.splitext(path)[0]
+        if posixpath.basename(without_extension) == '__init__':
+            without_extension = posixpath.dirname(without_extension)
+        return without_extension.replace('/', '.')
+
+    def _register_python_module(self, path: str) -> None:
+        # Register every suffix, so 'pkg.mod' resolves even if the zip has a top-level folder
+        parts = self._dotted_module_name(path).split('.')
+        for start in range(len(parts)):
+            self._python_modules.setdefault(".".join(parts[start:]), path)
+
+    # --- Queries ---
+    def imported_symbols(self, path: str) -> dict[str, list[str]]:
+        """Returns {imported file path: [symbol names]} for the uploaded code `path` depends on."""
+        selected = {}
+        for target, names in self._imports.get(path, []):
+            available = self._symbols.get(target, {})
+            wanted = available.keys() if not names else [name for name in names if name in available]
+            bucket = selected.setdefault(target, [])
+            bucket.extend(name for name in wanted if name not in bucket)
+        return {target: names for target, names in selected.items() if names}
+
+    def context_stubs(self, path: str) -> str:
+        """Stubs of every symbol `path` imports from other uploaded files, grouped by file."""
+        sections = []
+        for target, names in self.imported_symbols(path).items():
+            # A default export may be the same declaration as a named one
+            stubs = "\n\n".join(dict.fromkeys(self._symbols[target][name] for name in names))
+            sections.append(f"# From {target}\n{stubs}")
+        return "\n\n\n".join(sections)
@@ -0,0 +1,201 @@
+# backend/incremental_store.py
+import ast
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+
+import code_chunker
+
+# --- Configuration ---
+# Leave INCREMENTAL_STORE_DIR unset to keep previous versions in memory only.
+INCREMENTAL_STORE_DIR = os.environ.get('INCREMENTAL_STORE_DIR') or None
+INCREMENTAL_STORE_MAX_MODULES = int(os.environ.get('INCREMENTAL_STORE_MAX_MODULES', '1000'))
+
+# Units are fingerprinted whole (functions and classes), never split by the chunk budget
+_UNSPLIT_BUDGET = 10 ** 9
+# Records are keyed by unit name. Version 1 records could hold several units under one name
+# (every Go method was 'func', Python overloads shared theirs) and are not reused.
+_RECORD_VERSION = 2
+
+
+def make_module_key(module_id: str, language: str, framework: str, user_instructions: str | None, model_tag: str) -> str:
+    """Identifies 'the same module' across uploads; any generation setting change starts over."""
+    payload = json.dumps([module_id, language, framework, user_instructions or "", model_tag])
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+# --- Fingerprinting ---
+def _fingerprint(text: str) -> str:
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()[:16]
+
+
+def _normalized_python(code: str) -> str | None:
+    """AST dump without positions, so comments, blank lines and formatting don't count as changes."""
+    try:
+        return ast.dump(ast.parse(code), annotate_fields=False, include_attributes=False)
+    except SyntaxError:
+        return None
+
+
+def _normalized_text(code: str) -> str:
+    without_comments = re.sub(r"/\*.*?\*/|//[^\n]*|^\s*#[^\n]*", "", code, flags=re.DOTALL | re.MULTILINE)
+    return " ".join(without_comments.split())
+
+
+def fingerprint_unit(code: str, is_python: bool) -> str:
+    normalized = _normalized_python(code) if is_python else None
+    return _fingerprint(normalized if normalized is not None else _normalized_text(code))
+
+
+def _python_preamble_bindings(preamble: str) -> dict[str, str] | None:
+    """Maps each name bound at module level outside functions/classes to a fingerprint of its statement."""
+    try:
+        tree = ast.parse(preamble)
+    except SyntaxError:
+        return None
+    bindings = {}
+    for node in tree.body:
+        statement = _fingerprint(ast.dump(node, annotate_fields=False, include_attributes=False))
+        names = []
+        if isinstance(node, (ast.Import, ast.ImportFrom)):
+            names = [(alias.asname or alias.name).split('.')[0] for alias in node.names]
+        else:
+            names = [n.id for n in ast.walk(node) if isinstance(n, ast.Name) and isinstance(n.ctx, ast.Store)]
+        for name in names:
+            bindings[name] = statement
+    return bindings
+
+
+def fingerprint_module(code: str, filename: str) -> dict:
+    """
+    Splits a module into top-level units and fingerprints each of them. Unit names are
+    unique within the module (code_chunker qualifies methods and numbers repeats, e.g.
+    'Server.Start', 'f#2'), so they key the stored test blocks.
+
+    Returns:
+        {"preamble": str, "preamble_bindings": {name: fp} or None, "preamble_fingerprint": fp,
+         "units": [{"name", "code", "fingerprint"}, ...] in source order}
+    """
+    is_python = filename.lower().endswith('.py')
+    preamble, units = code_chunker.split_into_units(code, filename, budget=_UNSPLIT_BUDGET)
+    return {
+        "preamble": preamble,
+        "preamble_bindings": _python_preamble_bindings(preamble) if is_python else None,
+        "preamble_fingerprint": fingerprint_unit(preamble, is_python),
+        "units": [
+            {"name": unit["name"], "code": unit["code"], "fingerprint": fingerprint_unit(unit["code"], is_python)}
+            for unit in units
+        ],
+    }
+
+
+def plan_regeneration(current: dict, previous: dict | None) -> dict:
+    """
+    Compares the fingerprinted current module with the stored previous version.
+
+    A unit is reused when its fingerprint is unchanged and it does not mention a
+    module-level name whose definition changed. Without Python bindings, any preamble
+    change invalidates every unit.
+
+    Returns:
+        {"reuse": {name: test_block}, "regenerate": [unit names], "removed": [unit names]}
+    """
+    previous_units = (previous or {}).get("units", {})
+    dirty_names = set()
+    preamble_changed_everything = False
+    if previous is not None:
+        current_bindings = current["preamble_bindings"]
+        previous_bindings = previous.get("preamble_bindings")
+        if current_bindings is not None and previous_bindings is not None:
+            dirty_names = {name for name in set(current_bindings) | set(previous_bindings)
+                           if current_bindings.get(name) != previous_bindings.get(name)}
+        elif current["preamble_fingerprint"] != previous.get("preamble_fingerprint"):
+            preamble_changed_everything = True
+
+    reuse, regenerate = {}, []
+    for unit in current["units"]:
+        stored = previous_units.get(unit["name"])
+        uses_dirty_name = any(re.search(rf"\b{re.escape(name)}\b", unit["code"]) for name in dirty_names)
+        if stored and stored["fingerprint"] == unit["fingerprint"] and not uses_dirty_name \
+                and not preamble_changed_everything:
+            reuse[unit["name"]] = stored["test_block"]
+        else:
+            regenerate.append(unit["name"])
+
+    current_names = {unit["name"] for unit in current["units"]}
+    removed = [name for name in previous_units if name not in current_names]
+    return {"reuse": reuse, "regenerate": regenerate, "removed": removed}
+
+
+class IncrementalStore:
+    """
+    Remembers, per module key, the fingerprint and generated test block of every unit
+    of the last upload. Kept in memory (bounded LRU) and, with INCREMENTAL_STORE_DIR,
+    as one JSON file per module so it survives restarts.
+    """
+
+    def __init__(self, store_dir: str | None = INCREMENTAL_STORE_DIR, max_modules: int = INCREMENTAL_STORE_MAX_MODULES):
+        self.store_dir = store_dir
+        self.max_modules = max_modules
+        self._records = {}
+        self._lock = threading.Lock()
+        if self.store_dir:
+            os.makedirs(self.store_dir, exist_ok=True)
+
+    def load(self, module_key: str) -> dict | None:
+        with self._lock:
+            record = self._records.get(module_key)
+            if record is not None:
+                self._records[module_key] = self._records.pop(module_key)  # Most recently used last
+                return record
+        if not self.store_dir:
+            return None
+        try:
+            with open(os.path.join(self.store_dir, f"{module_key}.json"), 'r', encoding='utf-8') as f:
+                record = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if record.get("version") != _RECORD_VERSION:
+            return None
+        with self._lock:
+            self._remember(module_key, record)
+        return record
+
+    def save(self, module_key: str, fingerprinted: dict, test_blocks: dict[str, str]) -> None:
+        """Stores the units that have a test block; units without one are regenerated next time."""
+        record = {
+            "version": _RECORD_VERSION,
+            "updated_at": time.time(),
+            "preamble_fingerprint": fingerprinted["preamble_fingerprint"],
+            "preamble_bindings": fingerprinted["preamble_bindings"],
+            "units": {
+                unit["name"]: {"fingerprint": unit["fingerprint"], "test_block": test_blocks[unit["name"]]}
+                for unit in fingerprinted["units"] if test_blocks.get(unit["name"])
+            },
+        }
+        with self._lock:
+            self._remember(module_key, record)
+        if not self.store_dir:
+            return
+        path = os.path.join(self.store_dir, f"{module_key}.json")
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(record, f)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            print(f"Warning: Could not write incremental record {module_key}: {e}", flush=True)
+
+    def _remember(self, module_key: str, record: dict) -> None:
+        # Caller holds self._lock
+        self._records.pop(module_key, None)
+        self._records[module_key] = record
+        while len(self._records) > self.max_modules:
+            self._records.pop(next(iter(self._records)))
+
+
+# Shared instance used by app.py
+default_store = IncrementalStore()
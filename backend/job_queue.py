@@ -0,0 +1,198 @@
+# backend/job_queue.py
+import os
+import queue
+import threading
+import time
+import uuid
+
+# --- Configuration ---
+JOB_QUEUE_WORKERS = int(os.environ.get('JOB_QUEUE_WORKERS', '2'))
+JOB_QUEUE_MAX_SIZE = int(os.environ.get('JOB_QUEUE_MAX_SIZE', '32'))
+JOB_RETENTION_SECONDS = float(os.environ.get('JOB_RETENTION_SECONDS', '3600'))
+
+QUEUED, RUNNING, SUCCEEDED, FAILED, CANCELLED = 'queued', 'running', 'succeeded', 'failed', 'cancelled'
+_FINISHED_STATES = (SUCCEEDED, FAILED, CANCELLED)
+
+
+class QueueFullError(Exception):
+    """Raised when a job is submitted while the bounded queue is full."""
+
+
+class Job:
+    """
+    One asynchronous generation. `work_fn(job)` returns the result payload and may call
+    job.report_progress(done, total) and check job.cancel_requested between steps.
+    """
+
+    def __init__(self, key: str, work_fn):
+        self.id = uuid.uuid4().hex
+        self.key = key
+        self.work_fn = work_fn
+        self.status = QUEUED
+        self.progress = 0.0
+        self.attached_requests = 1
+        self.cancel_requested = False
+        self.result = None
+        self.error = None
+        self.submitted_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+
+    @property
+    def finished(self) -> bool:
+        return self.status in _FINISHED_STATES
+
+    def report_progress(self, done: int, total: int) -> None:
+        self.progress = round(done / total, 3) if total else 1.0
+
+    def to_dict(self) -> dict:
+        now = time.time()
+        queue_wait = (self.started_at or (self.finished_at if self.finished else now)) - self.submitted_at
+        job_dict = {
+            "job_id": self.id,
+            "status": self.status,
+            "progress": self.progress,
+            "attached_requests": self.attached_requests,
+            "queue_wait_seconds": round(queue_wait, 3),
+            "run_seconds": round((self.finished_at or now) - self.started_at, 3) if self.started_at else None,
+        }
+        if self.status == SUCCEEDED:
+            job_dict["result"] = self.result
+        if self.error:
+            job_dict["error"] = self.error
+        return job_dict
+
+
+class JobQueue:
+    """
+    Bounded queue of generation jobs served by a fixed set of worker threads.
+
+    Jobs submitted with the key of a job that is still queued or running attach to
+    that job instead of creating a new one, so identical concurrent submissions
+    cost a single generation.
+    """
+
+    def __init__(self, workers: int = JOB_QUEUE_WORKERS, max_size: int = JOB_QUEUE_MAX_SIZE,
+                 retention_seconds: float = JOB_RETENTION_SECONDS):
+        self.workers = workers
+        self.max_size = max_size
+        self.retention_seconds = retention_seconds
+        # Unbounded: cancelled jobs stay in it until a worker skips them, so capacity is
+        # counted from the jobs still QUEUED instead
+        self._queue = queue.Queue()
+        self._jobs = {}       # job id -> Job
+        self._in_flight = {}  # key -> Job (queued or running)
+        self._lock = threading.Lock()
+        self._threads = []
+
+    # --- Public API ---
+    def submit(self, key: str, work_fn) -> tuple[Job, bool]:
+        """
+        Queues a job, or attaches to the in-flight job with the same key.
+
+        Returns:
+            A tuple (job, attached) where attached is True if an existing job was reused.
+
+        Raises:
+            QueueFullError: If max_size jobs are already waiting for a worker.
+        """
+        with self._lock:
+            self._prune()
+            existing = self._in_flight.get(key)
+            if existing is not None and not existing.finished:
+                existing.attached_requests += 1
+                return existing, True
+
+            if self._queued_count() >= self.max_size:
+                raise QueueFullError(f"Job queue is full ({self.max_size} jobs waiting).")
+            job = Job(key, work_fn)
+            self._queue.put_nowait(job)
+            self._jobs[job.id] = job
+            self._in_flight[key] = job
+            self._ensure_workers()
+            return job, False
+
+    def get(self, job_id: str) -> Job | None:
+        with self._lock:
+            self._prune()
+            return self._jobs.get(job_id)
+
+    def cancel(self, job_id: str) -> Job | None:
+        """
+        Detaches one requester from the job. When no requester is left, a queued job is
+        cancelled immediately and a running job is asked to stop at its next check.
+        """
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None or job.finished:
+                return job
+            job.attached_requests = max(job.attached_requests - 1, 0)
+            if job.attached_requests == 0:
+                job.cancel_requested = True
+                if job.status == QUEUED:
+                    self._finish(job, CANCELLED)
+            return job
+
+    def depth(self) -> int:
+        """Number of jobs waiting for a worker."""
+        with self._lock:
+            return self._queued_count()
+
+    def running(self) -> int:
+        with self._lock:
+            return sum(1 for job in self._in_flight.values() if job.status == RUNNING)
+
+    # --- Internals ---
+    def _queued_count(self) -> int:
+        # Caller holds self._lock
+        return sum(1 for job in self._in_flight.values() if job.status == QUEUED)
+
+    def _ensure_workers(self) -> None:
+        # Started lazily so that importing the module never spawns threads.
+        if self._threads:
+            return
+        for index in range(self.workers):
+            thread = threading.Thread(target=self._worker_loop, name=f"job-worker-{index}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def _worker_loop(self) -> None:
+        while True:
+            job = self._queue.get()
+            with self._lock:
+                if job.finished:  # Cancelled while waiting
+                    continue
+                job.status = RUNNING
+                job.started_at = time.time()
+
+            try:
+                result = job.work_fn(job)
+                status, error = (CANCELLED, None) if job.cancel_requested else (SUCCEEDED, None)
+            except Exception as e:
+                print(f"Error in job {job.id}: {e}", flush=True)
+                result, status, error = None, FAILED, str(e)
+
+            with self._lock:
+                job.result = result if status == SUCCEEDED else None
+                job.error = error
+                job.progress = 1.0 if status == SUCCEEDED else job.progress
+                self._finish(job, status)
+
+    def _finish(self, job: Job, status: str) -> None:
+        # Caller holds self._lock
+        job.status = status
+        job.finished_at = time.time()
+        job.work_fn = None  # Release the captured prompts/code
+        if self._in_flight.get(job.key) is job:
+            del self._in_flight[job.key]
+
+    def _prune(self) -> None:
+        # Caller holds self._lock
+        cutoff = time.time() - self.retention_seconds
+        expired = [job_id for job_id, job in self._jobs.items() if job.finished and job.finished_at < cutoff]
+        for job_id in expired:
+            del self._jobs[job_id]
+
+
+# Shared instance used by app.py
+default_queue = JobQueue()
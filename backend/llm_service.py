@@ -1,7 +1,11 @@
-import ollama
 import os
 import re # For more robust response parsing
 
+import generation_cache
+import metrics
+import ollama_pool
+import timing
+
 # --- Configuration ---
 DEEPSEEK_MODEL_TAG = os.environ.get('DEEPSEEK_MODEL_TAG', 'deepseek-coder:6.7b-instruct')
 
@@ -29,34 +33,72 @@ def _clean_llm_artifacts(text: str) -> str:
     # cleaned_text = cleaned_text.replace("SOME_OTHER_UNWANTED_BOILERPLATE", "")
     return cleaned_text.strip() # Remove leading/trailing whitespace from the final result
 
+# --- Ollama response statistics ---
+def ollama_response_stats(response) -> dict:
+    """
+    Reads Ollama's statistics from a chat response (or the final chunk of a stream).
+    Durations are converted from nanoseconds to seconds; missing values are None.
+    """
+    def seconds(field):
+        value = response.get(field)
+        return value / 1e9 if value is not None else None
+
+    stats = {
+        "prompt_eval_count": response.get('prompt_eval_count'),
+        "eval_count": response.get('eval_count'),
+        "prompt_eval_seconds": seconds('prompt_eval_duration'),
+        "eval_seconds": seconds('eval_duration'),
+        "load_seconds": seconds('load_duration'),
+        "total_seconds": seconds('total_duration'),
+    }
+    stats["tokens_per_second"] = (stats["eval_count"] / stats["eval_seconds"]
+                                  if stats["eval_count"] and stats["eval_seconds"] else None)
+    return stats
+
+
+def _record_llm_call(mode: str, outcome: str, stats: dict | None = None) -> None:
+    """Counts an Ollama call in the metrics and attaches its statistics to the current request."""
+    metrics.LLM_REQUESTS.inc(mode=mode, outcome=outcome)
+    if stats is None:
+        return
+    metrics.observe_llm_stats(stats)
+    timer = timing.current()
+    if timer is not None:
+        timer.add_llm_call({"mode": mode, "outcome": outcome, **stats})
+
+
+def _as_messages(prompt: str | list[dict]) -> list[dict]:
+    """Chat messages as built by prompt_builder.construct_llm_messages; a plain string becomes one user message."""
+    if isinstance(prompt, str):
+        return [{'role': 'user', 'content': prompt}]
+    return prompt
+
+
 # --- Main Service Function ---
-def get_tests_from_deepseek(prompt_text: str) -> str | None:
+def get_tests_from_deepseek(prompt: str | list[dict]) -> str | None:
     """
-    Sends a prompt to the configured DeepSeek Coder model via Ollama
-    and attempts to return the cleaned-up code generation.
+    Sends a prompt (or list of chat messages) to the configured DeepSeek Coder model
+    via Ollama and attempts to return the cleaned-up code generation.
     """
     print(f"Sending prompt to DeepSeek Coder (Model: {DEEPSEEK_MODEL_TAG})...")
     # For debugging the prompt sent to the LLM:
-    # print(f"--- PROMPT SENT TO LLM --- \n{prompt_text}\n--- END PROMPT ---")
+    # print(f"--- PROMPT SENT TO LLM --- \n{prompt}\n--- END PROMPT ---")
 
     try:
-        response = ollama.chat(
+        response = ollama_pool.default_pool.chat(
             model=DEEPSEEK_MODEL_TAG,
-            messages=[
-                {
-                    'role': 'user',
-                    'content': prompt_text,
-                }
-            ]
+            messages=_as_messages(prompt)
             # options={ 'temperature': 0.3 } # Example: Lower temperature for more deterministic code
         )
 
+        stats = ollama_response_stats(response)
         raw_response_content = response.get('message', {}).get('content', '')
         # For debugging the raw response from LLM:
         # print(f"--- RAW LLM RESPONSE --- \n{raw_response_content}\n--- END RAW RESPONSE ---")
 
         if not raw_response_content.strip():
             print("LLM returned an empty response.")
+            _record_llm_call('chat', 'empty', stats)
             return None
 
         # Step 1: Extract content from markdown code blocks if present
@@ -76,14 +118,203 @@ def get_tests_from_deepseek(prompt_text: str) -> str | None:
         final_cleaned_code = _clean_llm_artifacts(content_to_clean)
 
         # print(f"--- CLEANED LLM RESPONSE (to be returned) --- \n{final_cleaned_code}\n--- END CLEANED RESPONSE ---")
+        _record_llm_call('chat', 'ok' if final_cleaned_code else 'empty', stats)
 
         return final_cleaned_code if final_cleaned_code else None # Avoid returning empty string if all was cleaned
 
     except Exception as e:
         print(f"Error communicating with Ollama or processing DeepSeek Coder response: {e}")
+        _record_llm_call('chat', 'error')
         # Consider logging the full traceback here in a real app: app.logger.error(..., exc_info=True)
         return None
 
+
+def get_tests_with_cache(prompt: str | list[dict], use_cache: bool = True) -> tuple[str | None, str]:
+    """
+    Cache-aware wrapper around get_tests_from_deepseek.
+
+    Returns a tuple (script, cache_status) where cache_status is 'hit', 'miss' or 'bypass'.
+    With use_cache=False the cache is neither read nor written.
+    """
+    if not use_cache:
+        return get_tests_from_deepseek(prompt), 'bypass'
+
+    cache_key = generation_cache.make_cache_key(prompt, DEEPSEEK_MODEL_TAG)
+    cached_script = generation_cache.default_cache.get(cache_key)
+    if cached_script is not None:
+        print(f"Generation cache hit ({cache_key[:12]}).", flush=True)
+        return cached_script, 'hit'
+
+    generated_script = get_tests_from_deepseek(prompt)
+    if generated_script:  # Never cache failures or empty output
+        generation_cache.default_cache.set(cache_key, generated_script)
+    return generated_script, 'miss'
+
+class _StreamingCodeExtractor:
+    """
+    Incremental version of the code-block extraction done in get_tests_from_deepseek.
+
+    Text before the opening fence is buffered (and only used if no fence ever appears).
+    Inside the code block, text is released as soon as it can no longer be part of the
+    closing fence or of a partial <｜...｜> artifact, cleaned with _clean_llm_artifacts'
+    pattern. `finished` turns True once the closing fence has been seen.
+    """
+
+    _OPENING_FENCE = re.compile(r"```(?:[a-zA-Z0-9_]+)?\n")
+    _CLOSING_FENCE = "\n```"
+    _ARTIFACT_TAG = re.compile(re.escape("<｜") + r"[^｜]*?" + re.escape("｜>"))
+
+    def __init__(self):
+        self.finished = False
+        self.in_code_block = False
+        self._started = False
+        self._pending = ""
+        self._code_parts = []
+
+    def feed(self, text: str) -> str:
+        """Consumes a chunk of model output and returns the cleaned text that is safe to emit."""
+        if self.finished or not text:
+            return ""
+        self._pending += text
+
+        if not self.in_code_block:
+            match = self._OPENING_FENCE.search(self._pending)
+            if not match:
+                return ""
+            self.in_code_block = True
+            self._pending = self._pending[match.end():]
+
+        fence_index = self._pending.find(self._CLOSING_FENCE)
+        if fence_index != -1:
+            self.finished = True
+            return self._release(fence_index)
+
+        return self._release(len(self._pending) - self._held_back_length())
+
+    def flush(self) -> str:
+        """Releases whatever is still buffered once the model stops producing text."""
+        if self.finished:
+            return ""
+        self.finished = True
+        if not self.in_code_block:
+            # No code block at all: same fallback as the non-streaming path
+            text, self._pending = self._pending, ""
+            cleaned = _clean_llm_artifacts(text)
+            self._code_parts.append(cleaned)
+            return cleaned
+        return self._release(len(self._pending))
+
+    def script(self) -> str:
+        """The full cleaned script emitted so far, stripped like get_tests_from_deepseek's result."""
+        return _clean_llm_artifacts("".join(self._code_parts))
+
+    def _held_back_length(self) -> int:
+        pending = self._pending
+        # A suffix that could still grow into the closing fence
+        held = 0
+        for size in range(len(self._CLOSING_FENCE) - 1, 0, -1):
+            if pending.endswith(self._CLOSING_FENCE[:size]):
+                held = size
+                break
+        # An artifact tag that has been opened but not closed yet
+        tag_start = pending.rfind("<｜")
+        if tag_start != -1 and pending.find("｜>", tag_start) == -1:
+            held = max(held, len(pending) - tag_start)
+        elif pending.endswith("<"):
+            held = max(held, 1)
+        return held
+
+    def _release(self, end: int) -> str:
+        released, self._pending = self._pending[:end], self._pending[end:]
+        cleaned = self._ARTIFACT_TAG.sub("", released)
+        if not self._started:
+            cleaned = cleaned.lstrip()  # Match the .strip() of the non-streaming path
+        if cleaned:
+            self._started = True
+            self._code_parts.append(cleaned)
+        return cleaned
+
+
+def stream_tests_from_deepseek(prompt: str | list[dict]):
+    """
+    Streaming variant of get_tests_from_deepseek.
+
+    Yields events as dicts:
+        {"type": "token", "text": ...} for each chunk of cleaned code,
+        then {"type": "done", "generated_script": ..., "stopped_early": bool}
+        or {"type": "error", "error": ...}.
+    The Ollama stream is closed as soon as the closing code fence arrives, which
+    stops the generation instead of paying for the explanation that follows it.
+    """
+    print(f"Streaming prompt to DeepSeek Coder (Model: {DEEPSEEK_MODEL_TAG})...")
+    extractor = _StreamingCodeExtractor()
+    stream = None
+    stopped_early = False
+    stats = None
+
+    try:
+        stream = ollama_pool.default_pool.chat_stream(
+            model=DEEPSEEK_MODEL_TAG,
+            messages=_as_messages(prompt)
+        )
+
+        for part in stream:
+            text = extractor.feed(part.get('message', {}).get('content', ''))
+            if text:
+                yield {"type": "token", "text": text}
+            if part.get('done'):
+                stats = ollama_response_stats(part)  # Only the final chunk carries statistics
+            if extractor.finished:
+                stopped_early = not part.get('done', False)
+                break
+
+        text = extractor.flush()
+        if text:
+            yield {"type": "token", "text": text}
+
+    except Exception as e:
+        print(f"Error streaming from Ollama or processing DeepSeek Coder response: {e}")
+        _record_llm_call('stream', 'error')
+        yield {"type": "error", "error": "LLM streaming failed. Check llm_service.py logs."}
+        return
+
+    finally:
+        if stream is not None:
+            stream.close()  # Closes the HTTP response, which makes Ollama abort the generation
+
+    final_script = extractor.script()
+    _record_llm_call('stream', 'stopped_early' if stopped_early else ('ok' if final_script else 'empty'), stats)
+    if not final_script:
+        print("LLM returned an empty response.")
+        yield {"type": "error", "error": "LLM failed to generate script or returned empty."}
+        return
+
+    if stopped_early:
+        print("Closing code fence seen, stopped generation early.")
+    yield {"type": "done", "generated_script": final_script, "stopped_early": stopped_early}
+
+
+def stream_tests_with_cache(prompt: str | list[dict], use_cache: bool = True):
+    """
+    Cache-aware wrapper around stream_tests_from_deepseek. A cache hit is replayed as a
+    single token event. Every 'done' event carries a 'cache' field ('hit', 'miss' or 'bypass').
+    """
+    cache_key = generation_cache.make_cache_key(prompt, DEEPSEEK_MODEL_TAG)
+    if use_cache:
+        cached_script = generation_cache.default_cache.get(cache_key)
+        if cached_script is not None:
+            print(f"Generation cache hit ({cache_key[:12]}).", flush=True)
+            yield {"type": "token", "text": cached_script}
+            yield {"type": "done", "generated_script": cached_script, "stopped_early": False, "cache": "hit"}
+            return
+
+    for event in stream_tests_from_deepseek(prompt):
+        if event["type"] == "done":
+            if use_cache:
+                generation_cache.default_cache.set(cache_key, event["generated_script"])
+            event["cache"] = "miss" if use_cache else "bypass"
+        yield event
+
     # --- Simple Test Block ---
 if __name__ == '__main__':
     print("Testing llm_service.py's _clean_llm_artifacts function...")
@@ -0,0 +1,179 @@
+# backend/metrics.py
+"""
+Minimal in-process metrics, rendered in the Prometheus text exposition format
+(version 0.0.4) by the /metrics endpoint. Counters and histograms are updated
+as requests run; gauges read their value from a callback at scrape time.
+"""
+import math
+import threading
+
+# Buckets in seconds, from fast cache hits to slow CPU-only generations
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+TOKENS_PER_SECOND_BUCKETS = (1, 2, 5, 10, 15, 20, 30, 50, 75, 100, 200)
+
+_registry = []
+_registry_lock = threading.Lock()
+
+
+def _format_value(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+def _escape_label_value(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: tuple, values: tuple, extra: dict | None = None) -> str:
+    pairs = list(zip(names, values)) + list((extra or {}).items())
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape_label_value(value)}"' for name, value in pairs) + "}"
+
+
+class _Metric:
+    type_name = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        with _registry_lock:
+            _registry.append(self)
+
+    def _label_values(self, labels: dict) -> tuple:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.type_name}"]
+        lines.extend(self._samples())
+        return lines
+
+    def _samples(self) -> list[str]:
+        raise NotImplementedError
+
+
+class Counter(_Metric):
+    """A monotonically increasing value per label set."""
+    type_name = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values = {}
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        key = self._label_values(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def _samples(self) -> list[str]:
+        with self._lock:
+            items = sorted(self._values.items())
+        return [f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}" for key, value in items]
+
+
+class Histogram(_Metric):
+    """Cumulative bucket counts, sum and count per label set."""
+    type_name = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple = (), buckets: tuple = DURATION_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (math.inf,)
+        self._values = {}  # label values -> [bucket counts..., sum, count]
+
+    def observe(self, value: float, **labels) -> None:
+        key = self._label_values(labels)
+        with self._lock:
+            state = self._values.setdefault(key, [0] * len(self.buckets) + [0.0, 0])
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    state[index] += 1
+            state[-2] += value
+            state[-1] += 1
+
+    def _samples(self) -> list[str]:
+        with self._lock:
+            items = sorted((key, list(state)) for key, state in self._values.items())
+        lines = []
+        for key, state in items:
+            for bound, count in zip(self.buckets, state):
+                labels = _format_labels(self.labelnames, key, {"le": _format_value(bound)})
+                lines.append(f"{self.name}_bucket{labels} {count}")
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(state[-2])}")
+            lines.append(f"{self.name}_count{labels} {state[-1]}")
+        return lines
+
+
+class CallbackMetric(_Metric):
+    """
+    A value read at scrape time from `callback`, which returns a number, or a dict
+    mapping label-value tuples to numbers when the metric has labels.
+    """
+
+    def __init__(self, name: str, documentation: str, callback, labelnames: tuple = (), type_name: str = "gauge"):
+        super().__init__(name, documentation, labelnames)
+        self.callback = callback
+        self.type_name = type_name
+
+    def _samples(self) -> list[str]:
+        try:
+            values = self.callback()
+        except Exception as e:
+            print(f"Warning: Could not collect metric {self.name}: {e}", flush=True)
+            return []
+        if not self.labelnames:
+            values = {(): values}
+        return [f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}"
+                for key, value in sorted(values.items())]
+
+
+def render() -> str:
+    """All registered metrics in the Prometheus text format."""
+    with _registry_lock:
+        metrics = list(_registry)
+    lines = []
+    for metric in metrics:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+# --- Request metrics (recorded by app.py) ---
+REQUESTS = Counter('testgen_http_requests_total', "HTTP requests handled.", ('endpoint', 'method', 'status'))
+REQUEST_DURATION = Histogram('testgen_http_request_duration_seconds', "Time to produce the HTTP response.",
+                             ('endpoint',))
+STAGE_DURATION = Histogram('testgen_stage_duration_seconds',
+                           "Time spent per request stage (save, extract, prompt_build, llm, validate, post_process).",
+                           ('stage',))
+ADMISSION_REJECTIONS = Counter('testgen_admission_rejections_total',
+                               "Requests turned away by admission control (rate_limit: 429, capacity: 503).",
+                               ('reason',))
+
+# --- LLM metrics (recorded by llm_service.py from Ollama's response statistics) ---
+LLM_REQUESTS = Counter('testgen_llm_requests_total', "Calls made to Ollama.", ('mode', 'outcome'))
+LLM_PROMPT_TOKENS = Counter('testgen_llm_prompt_tokens_total', "Prompt tokens evaluated by Ollama (prompt_eval_count).")
+LLM_COMPLETION_TOKENS = Counter('testgen_llm_completion_tokens_total', "Tokens generated by Ollama (eval_count).")
+LLM_PROMPT_EVAL_DURATION = Histogram('testgen_llm_prompt_eval_duration_seconds',
+                                     "Ollama prompt evaluation time (prompt_eval_duration).")
+LLM_EVAL_DURATION = Histogram('testgen_llm_eval_duration_seconds', "Ollama generation time (eval_duration).")
+LLM_LOAD_DURATION = Histogram('testgen_llm_load_duration_seconds', "Ollama model load time (load_duration).")
+LLM_TOKENS_PER_SECOND = Histogram('testgen_llm_tokens_per_second', "Generation speed (eval_count / eval_duration).",
+                                  buckets=TOKENS_PER_SECOND_BUCKETS)
+
+
+def observe_llm_stats(stats: dict) -> None:
+    """Records the statistics returned by llm_service.ollama_response_stats."""
+    LLM_PROMPT_TOKENS.inc(stats.get("prompt_eval_count") or 0)
+    LLM_COMPLETION_TOKENS.inc(stats.get("eval_count") or 0)
+    for key, histogram in (("prompt_eval_seconds", LLM_PROMPT_EVAL_DURATION), ("eval_seconds", LLM_EVAL_DURATION),
+                           ("load_seconds", LLM_LOAD_DURATION)):
+        if stats.get(key) is not None:
+            histogram.observe(stats[key])
+    if stats.get("tokens_per_second") is not None:
+        LLM_TOKENS_PER_SECOND.observe(stats["tokens_per_second"])
@@ -0,0 +1,257 @@
+# backend/ollama_pool.py
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+import ollama
+
+# --- Configuration ---
+# Comma-separated Ollama endpoints, e.g. "http://gpu-1:11434,http://gpu-2:11434".
+# Without it the single OLLAMA_HOST (or the ollama client's default) is used.
+OLLAMA_HOSTS = [host.strip() for host in
+                (os.environ.get('OLLAMA_HOSTS') or os.environ.get('OLLAMA_HOST') or '').split(',') if host.strip()]
+# In-flight calls per endpoint over the whole deployment; each of the WEB_CONCURRENCY worker processes gets its share
+OLLAMA_ENDPOINT_CONCURRENCY = int(os.environ.get('OLLAMA_ENDPOINT_CONCURRENCY', '4'))
+WEB_CONCURRENCY = max(int(os.environ.get('WEB_CONCURRENCY', '1')), 1)
+OLLAMA_KEEP_ALIVE = os.environ.get('OLLAMA_KEEP_ALIVE', '30m')  # How long Ollama keeps the model loaded
+OLLAMA_REQUEST_TIMEOUT_SECONDS = float(os.environ.get('OLLAMA_REQUEST_TIMEOUT_SECONDS', '600'))
+OLLAMA_ACQUIRE_TIMEOUT_SECONDS = float(os.environ.get('OLLAMA_ACQUIRE_TIMEOUT_SECONDS', '600'))
+OLLAMA_FAILURE_THRESHOLD = int(os.environ.get('OLLAMA_FAILURE_THRESHOLD', '3'))  # Consecutive failures before removal
+OLLAMA_HEALTH_CHECK_INTERVAL_SECONDS = float(os.environ.get('OLLAMA_HEALTH_CHECK_INTERVAL_SECONDS', '10'))
+# Timeout of the cheap reachability probe of an endpoint out of rotation (the model load that follows uses the full one)
+OLLAMA_HEALTH_PROBE_TIMEOUT_SECONDS = float(os.environ.get('OLLAMA_HEALTH_PROBE_TIMEOUT_SECONDS', '5'))
+
+
+class NoEndpointAvailableError(RuntimeError):
+    """Raised when no healthy Ollama endpoint has a free slot in time."""
+
+
+def _is_endpoint_failure(error: Exception) -> bool:
+    # Client errors (unknown model, bad request) say nothing about the endpoint's health
+    if isinstance(error, ollama.ResponseError):
+        return error.status_code >= 500
+    return True
+
+
+def _is_model_loaded(running, model: str) -> bool:
+    # ps() reports full names ("llama3:latest"); requests may leave the tag out
+    names = {model, model if ':' in model else f"{model}:latest"}
+    return any(loaded.model in names or loaded.name in names for loaded in running.models)
+
+
+class Endpoint:
+    """One Ollama server with a persistent client and a cap on concurrent calls."""
+
+    def __init__(self, host: str | None, max_concurrency: int):
+        self.host = host or 'default'
+        self.client = ollama.Client(host=host, timeout=OLLAMA_REQUEST_TIMEOUT_SECONDS)
+        self.probe_client = ollama.Client(host=host, timeout=OLLAMA_HEALTH_PROBE_TIMEOUT_SECONDS)
+        self.max_concurrency = max_concurrency
+        self.in_flight = 0
+        self.dispatched = 0
+        self.healthy = True
+        self.rejoining = False  # Reachable again, model being loaded before it returns to rotation
+        self.consecutive_failures = 0
+        self.last_error = None
+
+    def to_dict(self) -> dict:
+        return {
+            "host": self.host,
+            "healthy": self.healthy,
+            "in_flight": self.in_flight,
+            "max_concurrency": self.max_concurrency,
+            "dispatched": self.dispatched,
+            "consecutive_failures": self.consecutive_failures,
+            "last_error": self.last_error,
+        }
+
+
+class OllamaPool:
+    """
+    Routes Ollama calls across several endpoints.
+
+    Each call goes to the healthy endpoint with the lowest share of its concurrency limit
+    in use, waiting for a free slot if all of them are busy. An endpoint that fails
+    OLLAMA_FAILURE_THRESHOLD times in a row leaves the rotation until the background
+    health checker (started on the first removal) can reach it again with a short probe
+    and has loaded the model on it.
+    """
+
+    def __init__(self, hosts: list[str] = None, max_concurrency: int = OLLAMA_ENDPOINT_CONCURRENCY,
+                 keep_alive: str = OLLAMA_KEEP_ALIVE):
+        self.endpoints = [Endpoint(host, max_concurrency) for host in (hosts if hosts is not None else OLLAMA_HOSTS)]
+        if not self.endpoints:
+            self.endpoints = [Endpoint(None, max_concurrency)]  # The ollama client's own default host
+        self.keep_alive = keep_alive
+        self.model = None  # Last model used; the health check loads it before an endpoint rejoins
+        self._condition = threading.Condition()
+        self._health_thread = None
+
+    # --- Routing ---
+    def capacity(self) -> int:
+        return sum(endpoint.max_concurrency for endpoint in self.endpoints)
+
+    def _pick(self, exclude: set) -> Endpoint | None:
+        # Caller holds self._condition
+        candidates = [e for e in self.endpoints
+                      if e.healthy and e.in_flight < e.max_concurrency and e.host not in exclude]
+        if not candidates:
+            return None
+        return min(candidates, key=lambda e: (e.in_flight / e.max_concurrency, e.dispatched))
+
+    @contextmanager
+    def acquire(self, exclude: set = frozenset(), timeout: float = OLLAMA_ACQUIRE_TIMEOUT_SECONDS):
+        """Reserves a slot on the least-loaded healthy endpoint; yields the Endpoint."""
+        deadline = time.monotonic() + timeout
+        with self._condition:
+            while True:
+                endpoint = self._pick(exclude)
+                if endpoint is not None:
+                    break
+                if not any(e.healthy and e.host not in exclude for e in self.endpoints):
+                    raise NoEndpointAvailableError("No healthy Ollama endpoint is available.")
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise NoEndpointAvailableError("Timed out waiting for a free Ollama endpoint.")
+                self._condition.wait(remaining)
+            endpoint.in_flight += 1
+            endpoint.dispatched += 1
+        try:
+            yield endpoint
+        finally:
+            with self._condition:
+                endpoint.in_flight -= 1
+                self._condition.notify()
+
+    def _record_success(self, endpoint: Endpoint) -> None:
+        with self._condition:
+            endpoint.consecutive_failures = 0
+
+    def _record_failure(self, endpoint: Endpoint, error: Exception) -> None:
+        if not _is_endpoint_failure(error):
+            return
+        with self._condition:
+            endpoint.consecutive_failures += 1
+            endpoint.last_error = str(error)
+            if endpoint.healthy and endpoint.consecutive_failures >= OLLAMA_FAILURE_THRESHOLD:
+                endpoint.healthy = False
+                print(f"Ollama endpoint {endpoint.host} taken out of rotation: {error}", flush=True)
+                self._ensure_health_checker()
+            self._condition.notify_all()  # Waiters may now have no healthy endpoint left
+
+    # --- Calls ---
+    def chat(self, **kwargs):
+        """
+        ollama.chat on the least-loaded healthy endpoint. A call that fails because of the
+        endpoint is retried once on another endpoint, if there is one.
+        """
+        kwargs.setdefault('keep_alive', self.keep_alive)
+        self.model = kwargs.get('model') or self.model
+        tried = set()
+        while True:
+            with self.acquire(exclude=tried) as endpoint:
+                try:
+                    response = endpoint.client.chat(**kwargs)
+                except Exception as e:
+                    self._record_failure(endpoint, e)
+                    tried.add(endpoint.host)
+                    if not _is_endpoint_failure(e) or len(tried) > 1 or len(tried) == len(self.endpoints):
+                        raise
+                    print(f"Ollama endpoint {endpoint.host} failed ({e}), retrying on another endpoint.", flush=True)
+                    continue
+            self._record_success(endpoint)
+            return response
+
+    def chat_stream(self, **kwargs):
+        """
+        Streaming ollama.chat. The endpoint slot is held until the stream is exhausted or
+        closed; closing it also closes the HTTP response, which stops the generation.
+        """
+        kwargs.setdefault('keep_alive', self.keep_alive)
+        self.model = kwargs.get('model') or self.model
+        with self.acquire() as endpoint:
+            stream = None
+            try:
+                stream = endpoint.client.chat(stream=True, **kwargs)
+                yield from stream
+            except Exception as e:
+                self._record_failure(endpoint, e)
+                raise
+            else:
+                self._record_success(endpoint)
+            finally:
+                if stream is not None:
+                    stream.close()
+
+    # --- Warm-up and health ---
+    def warm_up(self, model: str) -> None:
+        """
+        Loads `model` on every endpoint (an empty generate request) and keeps it resident
+        for keep_alive, so the first user request does not pay for the model load.
+        Runs in background threads; failures only count against the endpoint's health.
+        """
+        self.model = model
+        def load(endpoint):
+            started = time.perf_counter()
+            try:
+                endpoint.client.generate(model=model, keep_alive=self.keep_alive)
+                print(f"Model {model} loaded on {endpoint.host} in {time.perf_counter() - started:.1f}s.", flush=True)
+            except Exception as e:
+                print(f"Warning: Could not preload {model} on {endpoint.host}: {e}", flush=True)
+                self._record_failure(endpoint, e)
+
+        for endpoint in self.endpoints:
+            threading.Thread(target=load, args=(endpoint,), name=f"ollama-warmup-{endpoint.host}", daemon=True).start()
+
+    def _ensure_health_checker(self) -> None:
+        # Caller holds self._condition. Started lazily so that importing the module never spawns threads.
+        if self._health_thread is None:
+            self._health_thread = threading.Thread(target=self._health_loop, name="ollama-health", daemon=True)
+            self._health_thread.start()
+
+    def _health_loop(self) -> None:
+        while True:
+            time.sleep(OLLAMA_HEALTH_CHECK_INTERVAL_SECONDS)
+            with self._condition:
+                unhealthy = [e for e in self.endpoints if not e.healthy and not e.rejoining]
+            for endpoint in unhealthy:
+                try:
+                    # Cheap and short: an unreachable endpoint holds up the loop for the probe timeout at most
+                    running = endpoint.probe_client.ps()
+                except Exception:
+                    continue
+                with self._condition:
+                    endpoint.rejoining = True
+                threading.Thread(target=self._rejoin, args=(endpoint, running), name=f"ollama-rejoin-{endpoint.host}",
+                                 daemon=True).start()
+
+    def _rejoin(self, endpoint: Endpoint, running) -> None:
+        """
+        Puts an endpoint that answered the probe back in rotation, after loading the last
+        used model on it if it is not loaded yet (`running` is the probe's ps() response).
+        """
+        model = self.model
+        try:
+            if model and not _is_model_loaded(running, model):
+                endpoint.client.generate(model=model, keep_alive=self.keep_alive)
+        except Exception as e:
+            print(f"Warning: Ollama endpoint {endpoint.host} is reachable but could not load {model}: {e}", flush=True)
+            with self._condition:
+                endpoint.rejoining = False
+                endpoint.last_error = str(e)
+            return
+        with self._condition:
+            endpoint.rejoining = False
+            endpoint.healthy = True
+            endpoint.consecutive_failures = 0
+            self._condition.notify_all()
+        print(f"Ollama endpoint {endpoint.host} is reachable again, back in rotation.", flush=True)
+
+    def stats(self) -> list[dict]:
+        with self._condition:
+            return [endpoint.to_dict() for endpoint in self.endpoints]
+
+
+# Shared instance used by llm_service.py, sized to this worker's share of the endpoint limit
+default_pool = OllamaPool(max_concurrency=max(OLLAMA_ENDPOINT_CONCURRENCY // WEB_CONCURRENCY, 1))
@@ -0,0 +1,126 @@
+# backend/parallel_generator.py
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+import llm_service
+import ollama_pool
+import timing
+
+# --- Configuration ---
+# Upper bound on concurrent generations sent to Ollama, shared by all requests. A set value is
+# for the whole deployment and split across the worker processes; the default is this
+# worker's share of the Ollama endpoints' concurrency limit.
+LLM_MAX_WORKERS = max(int(os.environ['LLM_MAX_WORKERS']) // ollama_pool.WEB_CONCURRENCY, 1) \
+    if os.environ.get('LLM_MAX_WORKERS') else ollama_pool.default_pool.capacity()
+
+# Units of one request on the shared pool at a time; the rest are submitted as those finish,
+# so a large upload does not queue ahead of everyone else's requests
+LLM_REQUEST_MAX_IN_FLIGHT = int(os.environ.get('LLM_REQUEST_MAX_IN_FLIGHT') or max(LLM_MAX_WORKERS // 2, 1))
+
+_executor = ThreadPoolExecutor(max_workers=LLM_MAX_WORKERS, thread_name_prefix='llm-worker')
+
+
+def _generate_unit(unit: dict, use_cache: bool, should_cancel=None, timer=None) -> dict:
+    """Runs one generation unit and never raises; failures are reported in the result."""
+    with timing.bind(timer):  # LLM statistics are reported to the submitting request
+        return _run_unit(unit, use_cache, should_cancel)
+
+
+def _run_unit(unit: dict, use_cache: bool, should_cancel=None) -> dict:
+    started = time.perf_counter()
+    result = {
+        "name": unit["name"],
+        "generated_script": None,
+        "error": None,
+        "cache": None,
+    }
+    if should_cancel is not None and should_cancel():
+        result["error"] = "Cancelled before generation started."
+        result["elapsed_seconds"] = 0.0
+        return result
+    try:
+        script, cache_status = llm_service.get_tests_with_cache(unit["messages"], use_cache=use_cache)
+        result["cache"] = cache_status
+        if script:
+            result["generated_script"] = script
+        else:
+            result["error"] = "LLM failed to generate script or returned empty."
+    except Exception as e:
+        print(f"Error generating tests for unit '{unit['name']}': {e}", flush=True)
+        result["error"] = str(e)
+    result["elapsed_seconds"] = round(time.perf_counter() - started, 3)
+    return result
+
+
+def generate_for_units(units: list[dict], use_cache: bool = True, on_unit_done=None, should_cancel=None,
+                       max_in_flight: int = LLM_REQUEST_MAX_IN_FLIGHT) -> list[dict]:
+    """
+    Generates tests for several independent units through the shared worker pool, with at
+    most `max_in_flight` of them submitted at a time (see generate_as_completed).
+
+    Args:
+        units: List of dicts, each with a unique 'name' and the final chat 'messages' for that unit.
+        use_cache: Whether the generation cache may be used.
+        on_unit_done: Optional callback(done_count, total) called as units finish.
+        should_cancel: Optional callable; units not yet started are skipped once it returns True.
+        max_in_flight: Units of this call on the shared pool at a time.
+
+    Returns:
+        A list of result dicts in the same order as `units`, each with 'name',
+        'generated_script', 'error', 'cache' and 'elapsed_seconds'.
+    """
+    results = [None] * len(units)
+    for done, (index, result) in enumerate(
+            generate_as_completed(units, use_cache, should_cancel, max_in_flight=max_in_flight), start=1):
+        results[index] = result
+        if on_unit_done is not None:
+            on_unit_done(done, len(units))
+    return results
+
+
+def generate_as_completed(units: list[dict], use_cache: bool = True, should_cancel=None,
+                          max_in_flight: int = LLM_REQUEST_MAX_IN_FLIGHT):
+    """
+    Like generate_for_units, but yields (index, result) pairs in completion order, so a
+    caller can use each result as soon as it is ready. At most `max_in_flight` units
+    (LLM_REQUEST_MAX_IN_FLIGHT by default) are on the shared worker pool at a time; the
+    next one is submitted as each finishes, so a large request cannot queue ahead of
+    everyone else. Units not finished yet are cancelled when the caller stops iterating.
+    """
+    timer = timing.current()
+    remaining = iter(enumerate(units))
+    in_flight = {}
+
+    def submit_next():
+        item = next(remaining, None)
+        if item is not None:
+            index, unit = item
+            in_flight[_executor.submit(_generate_unit, unit, use_cache, should_cancel, timer)] = index
+
+    for _ in range(max(max_in_flight, 1)):
+        submit_next()
+    try:
+        while in_flight:
+            done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+            for future in done:
+                index = in_flight.pop(future)
+                submit_next()
+                yield index, future.result()
+    finally:
+        for future in in_flight:
+            future.cancel()
+
+
+def line_comment_prefix(language: str) -> str:
+    return "#" if language.lower() in ("python", "ruby") else "//"
+
+
+def merge_unit_scripts(results: list[dict], language: str = "python") -> str:
+    """Concatenates the successful unit scripts into one response, headed by the unit name."""
+    comment_prefix = line_comment_prefix(language)
+    sections = [
+        f"{comment_prefix} --- Tests for {result['name']} ---\n\n{result['generated_script']}"
+        for result in results if result.get("generated_script")
+    ]
+    return "\n\n\n".join(sections)
@@ -1,37 +1,105 @@
 # backend/prompt_builder.py
-def construct_llm_prompt(code_snippet: str, module_name_to_test: str, language: str ="python", test_framework: str ="unittest", user_instructions: str | None = None) -> str:
+from functools import lru_cache
+
+from code_chunker import estimate_tokens
+
+
+@lru_cache(maxsize=64)
+def system_prompt(language: str = "python", test_framework: str = "unittest") -> str:
     """
-    Constructs a detailed prompt for DeepSeek Coder to generate test scripts.
+    The fixed instructions for one (language, framework) pair, built once per pair.
+
+    Nothing request-specific goes in here: every request with the same pair sends an
+    identical system message first, so Ollama can reuse the KV cache of that prefix
+    instead of evaluating the instructions again.
     """
-    instruction = (
+    return (
         f"You are an expert AI programming assistant specialized in software testing. "
-        f"Your task is to generate high-quality, runnable unit tests for the provided {language} code. "
-        f"from the module named '{module_name_to_test}'. " # Use the module name
-        f"Please import and use the module '{module_name_to_test}' in your test script. " # Explicit instruction
-        f"For example, if the module is '{module_name_to_test}', you should use 'import {module_name_to_test}' and then call functions like '{module_name_to_test}.my_function()'. "
-        f"If the code contains a 'main()' function within '{module_name_to_test}', assume it's the primary entry point to test unless specified otherwise. "
+        f"Your task is to generate high-quality, runnable unit tests for the {language} code the user provides. "
+        f"The user names the module the code comes from. Import and use that module in your test script: "
+        f"for a module named 'example', use 'import example' and then call functions like 'example.my_function()'. "
+        f"If the code contains a 'main()' function, assume it's the primary entry point to test unless specified otherwise. "
         f"Please use the {test_framework} framework. "
         f"The generated tests should be comprehensive, covering main functionality, typical use cases (positive tests), "
         f"and important edge cases. Where applicable, also include negative tests to check handling of invalid inputs. "
-        f"Ensure all necessary imports for the {test_framework} framework, the '{module_name_to_test}' module, and any standard libraries used are included. "
+        f"Ensure all necessary imports for the {test_framework} framework, the module under test, and any standard libraries used are included. "
         f"If using mocks (e.g., from 'unittest.mock'), ensure 'MagicMock' or 'Mock' are imported if used (e.g., 'from unittest.mock import MagicMock, patch'). " # Hint for MagicMock
         f"The output should be ONLY the {language} test code itself, formatted correctly and ready to run. "
         f"Do not include any explanatory text, apologies, or introductory/concluding sentences "
         f"outside of the code block."
     )
 
+
+def construct_llm_messages(code_snippet: str, module_name_to_test: str, language: str ="python", test_framework: str ="unittest", user_instructions: str | None = None, focus_symbols: list[str] | None = None, context_stubs: str | None = None) -> list[dict]:
+    """
+    Constructs the chat messages for DeepSeek Coder to generate test scripts.
+
+    Returns:
+        [system message, user message]. The system message is the shared template from
+        system_prompt(); the module name, custom instructions, context and code all
+        follow it in the user message.
+    """
+    sections = [
+        f"The code below is from the module named '{module_name_to_test}'. "
+        f"Please import and use the module '{module_name_to_test}' in your test script "
+        f"(e.g. 'import {module_name_to_test}' and '{module_name_to_test}.my_function()')."
+    ]
+
+    if focus_symbols: # The code is one chunk of a larger module (see code_chunker.py)
+        sections.append(
+            f"It is only part of the module '{module_name_to_test}'. "
+            f"Write tests only for the following: {', '.join(focus_symbols)}. "
+            f"The rest of the module is tested separately."
+        )
+
     if user_instructions: # If the user provides specific instructions via the frontend later
-        instruction += (
-            f"\n\nAdditionally, please consider the following specific user requests for the tests: "
+        sections.append(
+            f"Additionally, please consider the following specific user requests for the tests: "
             f"{user_instructions}"
         )
 
-    prompt = (
-        f"{instruction}\n\n"
+    if context_stubs: # Signatures of project code the module imports (see import_index.py)
+        sections.append(
+            f"For reference, these are the signatures of the project code that '{module_name_to_test}' imports. "
+            f"Do not write tests for them; mock or call them as needed:\n"
+            f"```\n"
+            f"{context_stubs}\n"
+            f"```"
+        )
+
+    sections.append(
         f"Here is the source code (`{language}`) to be tested:\n"
         f"```\n"
         f"{code_snippet}\n"
-        f"```\n\n"
-        f"Generated {test_framework} tests for the code above:"
+        f"```"
     )
-    return prompt
\ No newline at end of file
+    sections.append(f"Generated {test_framework} tests for the code above:")
+
+    return [
+        {'role': 'system', 'content': system_prompt(language, test_framework)},
+        {'role': 'user', 'content': "\n\n".join(sections)},
+    ]
+
+
+def construct_llm_messages_with_context(code_snippet: str, module_name_to_test: str, context_stubs: str, full_context_tokens: int, **prompt_kwargs) -> tuple[list[dict], dict]:
+    """
+    Builds the messages for one module of an upload with only stubs of what it imports,
+    and reports how many tokens that saves compared with sending every file in full.
+
+    Args:
+        full_context_tokens: Estimated tokens of all the other uploaded files, i.e. the
+            context a combined prompt would have sent.
+        prompt_kwargs: Passed through to construct_llm_messages.
+
+    Returns:
+        A tuple (messages, stats) with stats keys 'context_tokens_full', 'context_tokens_sent'
+        and 'tokens_saved'.
+    """
+    messages = construct_llm_messages(code_snippet, module_name_to_test, context_stubs=context_stubs or None, **prompt_kwargs)
+    sent_tokens = estimate_tokens(context_stubs) if context_stubs else 0
+    stats = {
+        "context_tokens_full": full_context_tokens,
+        "context_tokens_sent": sent_tokens,
+        "tokens_saved": max(full_context_tokens - sent_tokens, 0),
+    }
+    return messages, stats
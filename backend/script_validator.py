@@ -0,0 +1,317 @@
+# backend/script_validator.py
+import ast
+import importlib.util
+import os
+import posixpath
+import re
+import shutil
+import signal
+import site
+import subprocess
+import sys
+import sysconfig
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+# --- Configuration ---
+# Running generated tests executes uploaded code, so it is off unless the operator turns it on.
+# Runs happen only inside a bubblewrap sandbox (no network, unprivileged user, read-only system
+# directories, private /tmp); without the bwrap executable every run is reported as skipped.
+VALIDATION_ENABLED = os.environ.get('VALIDATION_ENABLED', 'false').strip().lower() in ('true', '1', 'yes', 'on')
+VALIDATION_SANDBOX = os.environ.get('VALIDATION_SANDBOX', 'bwrap')  # bubblewrap executable
+VALIDATION_SANDBOX_UID = int(os.environ.get('VALIDATION_SANDBOX_UID', '65534'))  # 'nobody' inside the sandbox
+VALIDATION_WORKERS = int(os.environ.get('VALIDATION_WORKERS', '2'))  # Concurrent sandboxed test runs
+VALIDATION_TIMEOUT_SECONDS = float(os.environ.get('VALIDATION_TIMEOUT_SECONDS', '30'))
+VALIDATION_MEMORY_LIMIT_MB = int(os.environ.get('VALIDATION_MEMORY_LIMIT_MB', '512'))
+VALIDATION_MAX_RETRIES = int(os.environ.get('VALIDATION_MAX_RETRIES', '1'))  # Repair rounds per unit
+VALIDATION_RETRY_BUDGET = int(os.environ.get('VALIDATION_RETRY_BUDGET', '8'))  # Repair requests per generation
+VALIDATION_OUTPUT_LIMIT = 3000  # Characters of test output kept (the tail, where the errors are)
+
+PASSED, FAILED, INVALID, TIMEOUT, SKIPPED = 'passed', 'failed', 'invalid', 'timeout', 'skipped'
+
+_ARTIFACTS = ("<｜", "｜>", "```")
+
+_executor = ThreadPoolExecutor(max_workers=VALIDATION_WORKERS, thread_name_prefix='validator')
+
+
+# --- Cheap, in-process checks ---
+def _imports_module_python(tree: ast.Module, module_name: str) -> bool:
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Import) and any(alias.name.split('.')[0] == module_name for alias in node.names):
+            return True
+        if isinstance(node, ast.ImportFrom) and node.module and node.module.split('.')[0] == module_name:
+            return True
+    return False
+
+
+def precheck_script(script: str, module_name: str, language: str) -> str | None:
+    """
+    Checks that need no subprocess: leftover LLM artifacts, Python syntax, and that the
+    script imports the module under test. Returns a description of the problem, or None.
+    """
+    leftovers = [artifact for artifact in _ARTIFACTS if artifact in script]
+    if leftovers:
+        return f"The script still contains LLM output artifacts: {', '.join(leftovers)}"
+
+    if language == 'python':
+        try:
+            tree = ast.parse(script)
+        except SyntaxError as e:
+            return f"SyntaxError on line {e.lineno}: {e.msg}"
+        if not _imports_module_python(tree, module_name):
+            return f"The script never imports the module under test, '{module_name}'."
+        return None
+
+    if not re.search(rf"\b{re.escape(module_name)}\b", script):
+        return f"The script never references the module under test, '{module_name}'."
+    return None
+
+
+# --- Sandboxed run ---
+# Runs first in the sandboxed child: applies the resource limits to itself, then execs the
+# test command, which inherits them. Avoids preexec_fn, which is unsafe in a threaded server.
+_BOOTSTRAP = (
+    "import os, resource, sys\n"
+    "memory, cpu, fsize = (int(value) for value in sys.argv[1:4])\n"
+    "resource.setrlimit(resource.RLIMIT_AS, (memory, memory))\n"
+    "resource.setrlimit(resource.RLIMIT_CPU, (cpu, cpu))\n"
+    "resource.setrlimit(resource.RLIMIT_FSIZE, (fsize, fsize))\n"
+    "os.execv(sys.argv[5], sys.argv[5:])\n"
+)
+
+
+def _test_command(framework: str, test_filename: str) -> list[str] | None:
+    if framework == 'pytest':
+        if importlib.util.find_spec('pytest') is None:
+            return None
+        return [sys.executable, '-s', '-m', 'pytest', '-q', '-p', 'no:cacheprovider', test_filename]
+    if framework == 'unittest':
+        return [sys.executable, '-s', '-m', 'unittest', '-q', posixpath.splitext(test_filename)[0]]
+    return None
+
+
+def _limited_command(command: list[str]) -> list[str]:
+    memory = VALIDATION_MEMORY_LIMIT_MB * 1024 * 1024
+    cpu_seconds = int(VALIDATION_TIMEOUT_SECONDS) + 1
+    return [sys.executable, '-s', '-c', _BOOTSTRAP, str(memory), str(cpu_seconds), str(16 * 1024 * 1024), '--',
+            *command]
+
+
+def _host_paths() -> list[str]:
+    """System and Python installation directories the sandbox sees, read-only."""
+    paths = ['/usr', '/bin', '/sbin', '/lib', '/lib32', '/lib64', '/etc/alternatives', '/etc/ld.so.cache',
+             sys.base_prefix, sys.prefix, sysconfig.get_paths()['stdlib'], sysconfig.get_paths()['purelib'],
+             sysconfig.get_paths()['platlib'], *site.getsitepackages()]
+    return list(dict.fromkeys(os.path.realpath(path) if not os.path.islink(path) else path for path in paths))
+
+
+def _sandbox_command(sandbox: str, work_dir: str, command: list[str], env: dict[str, str]) -> list[str] | None:
+    """Wraps `command` in bubblewrap, or returns None if bwrap is not installed."""
+    bwrap = shutil.which(VALIDATION_SANDBOX)
+    if bwrap is None:
+        return None
+    args = [bwrap, '--unshare-all', '--unshare-user', '--die-with-parent', '--new-session',
+            '--uid', str(VALIDATION_SANDBOX_UID), '--gid', str(VALIDATION_SANDBOX_UID), '--clearenv',
+            '--proc', '/proc', '--dev', '/dev', '--tmpfs', '/tmp']
+    for path in _host_paths():
+        if os.path.islink(path):
+            args += ['--symlink', os.readlink(path), path]
+        else:
+            args += ['--ro-bind-try', path, path]
+    args += ['--bind', sandbox, sandbox, '--chdir', work_dir]  # The only writable host directory
+    for name, value in env.items():
+        args += ['--setenv', name, value]
+    return args + ['--', *_limited_command(command)]
+
+
+def _sandbox_path(sandbox: str, relative_path: str) -> str | None:
+    """The path of an uploaded file inside the sandbox, or None if it would land outside it."""
+    normalized = posixpath.normpath(relative_path.replace('\\', '/')).lstrip('/')
+    if normalized == '..' or normalized.startswith('../'):
+        return None
+    return os.path.join(sandbox, *normalized.split('/'))
+
+
+def _output_tail(output_file) -> bytes:
+    output_file.seek(0, os.SEEK_END)
+    output_file.seek(max(output_file.tell() - 4 * VALIDATION_OUTPUT_LIMIT, 0))
+    return output_file.read()
+
+
+def run_script(script: str, module_name: str, framework: str, sources: dict[str, str], source_path: str) -> dict:
+    """
+    Runs a Python test script against the uploaded sources in a throwaway directory,
+    inside the bubblewrap sandbox, with CPU, memory and file-size limits and a
+    wall-clock timeout. Output goes to a file rather than a pipe, so processes the
+    tests leave behind cannot hold the run open after it is killed.
+
+    Args:
+        sources: {relative path: content} of the uploaded code, written as-is.
+        source_path: Path (a key of `sources`) of the module under test; the test script
+            is written next to it and run from that directory.
+
+    Returns:
+        {"status": passed|failed|timeout|skipped, "output": tail of stdout+stderr, "seconds": float}
+    """
+    test_filename = f"test_{module_name}_generated.py"
+    command = _test_command(framework, test_filename)
+    if command is None:
+        return {"status": SKIPPED, "output": f"No sandbox runner for the '{framework}' framework.", "seconds": 0.0}
+
+    started = time.perf_counter()
+    with tempfile.TemporaryDirectory(prefix='testgen-validate-') as sandbox, tempfile.TemporaryFile() as output_file:
+        for relative_path, content in sources.items():
+            path = _sandbox_path(sandbox, relative_path)
+            if path is None:
+                continue
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, 'w', encoding='utf-8') as f:
+                f.write(content)
+        module_path = _sandbox_path(sandbox, source_path)
+        if module_path is None:
+            return {"status": SKIPPED, "output": "The module path is outside the upload.", "seconds": 0.0}
+        work_dir = os.path.dirname(module_path)
+        with open(os.path.join(work_dir, test_filename), 'w', encoding='utf-8') as f:
+            f.write(script)
+
+        env = {
+            "PATH": "/usr/local/bin:/usr/bin:/bin",
+            "HOME": sandbox,
+            "PYTHONPATH": os.pathsep.join(dict.fromkeys([work_dir, sandbox])),
+            "PYTHONDONTWRITEBYTECODE": "1",
+            "PYTHONHASHSEED": "0",
+        }
+        sandboxed = _sandbox_command(sandbox, work_dir, command, env)
+        if sandboxed is None:
+            return {"status": SKIPPED, "seconds": 0.0,
+                    "output": f"The validation sandbox ('{VALIDATION_SANDBOX}') is not installed on the server."}
+        process = subprocess.Popen(sandboxed, cwd=work_dir, stdin=subprocess.DEVNULL, stdout=output_file,
+                                   stderr=subprocess.STDOUT, close_fds=True,
+                                   start_new_session=True)  # Own process group, killed as a whole
+        try:
+            process.wait(timeout=VALIDATION_TIMEOUT_SECONDS)
+            status = PASSED if process.returncode == 0 else FAILED
+        except subprocess.TimeoutExpired:
+            # bwrap's --die-with-parent takes the sandbox's whole PID namespace down with it
+            os.killpg(process.pid, signal.SIGKILL)
+            process.wait()
+            status = TIMEOUT
+        output = _output_tail(output_file)
+
+    text = output.decode('utf-8', errors='replace').replace(sandbox + os.sep, "")
+    if status == TIMEOUT:
+        text += f"\nTest run killed after {VALIDATION_TIMEOUT_SECONDS:g} seconds."
+    return {"status": status, "output": text[-VALIDATION_OUTPUT_LIMIT:],
+            "seconds": round(time.perf_counter() - started, 3)}
+
+
+def validate_script(script: str, module_name: str, language: str, framework: str, sources: dict[str, str],
+                    source_path: str | None) -> dict:
+    """Cheap checks first; only scripts that pass them are run in the sandbox."""
+    problem = precheck_script(script, module_name, language)
+    if problem:
+        return {"status": INVALID, "output": problem, "seconds": 0.0}
+    if language != 'python' or not (source_path or '').endswith('.py'):
+        return {"status": SKIPPED, "output": "Sandboxed runs are only supported for Python.", "seconds": 0.0}
+    if not source_path or source_path not in sources:
+        return {"status": SKIPPED, "output": "The module source is not available as a file.", "seconds": 0.0}
+    try:
+        return run_script(script, module_name, framework, sources, source_path)
+    except Exception as e:
+        print(f"Error running validation for '{module_name}': {e}", flush=True)
+        return {"status": SKIPPED, "output": f"Could not run the tests: {e}", "seconds": 0.0}
+
+
+def repair_messages(messages: list[dict], script: str, outcome: dict) -> list[dict]:
+    """Continues the unit's conversation with the failing script and its error output."""
+    problem = ("The test script does not pass these checks:" if outcome["status"] == INVALID
+               else "Running the test script against the module produced this output:")
+    return messages + [
+        {'role': 'assistant', 'content': f"```\n{script}\n```"},
+        {'role': 'user', 'content': (
+            f"{problem}\n"
+            f"```\n"
+            f"{outcome['output']}\n"
+            f"```\n"
+            f"Fix the test script and output the complete corrected script only."
+        )},
+    ]
+
+
+def validate_and_repair(units: list[dict], results: list[dict], language: str, framework: str,
+                        sources: dict[str, str], regenerate, should_cancel=None) -> list[dict]:
+    """
+    Validates every generated unit script in parallel and sends only the failing ones
+    back to the model with their error output, for up to VALIDATION_MAX_RETRIES rounds
+    and VALIDATION_RETRY_BUDGET repair requests in total.
+
+    Args:
+        units: The generation units (with 'messages', 'module_name' and 'source_path').
+        results: parallel_generator results for `units`, in the same order; updated in place.
+        regenerate: Callable taking a list of {'name', 'messages'} units and returning
+            parallel_generator-style results in the same order.
+        should_cancel: Optional callable; no further repair round starts once it returns True.
+
+    Returns:
+        `results`, each with a 'validation' dict: status, attempts, output and seconds.
+    """
+    conversations = [unit["messages"] for unit in units]
+    pending = [index for index, result in enumerate(results) if result["generated_script"]]
+    budget = VALIDATION_RETRY_BUDGET
+
+    for attempt in range(1, VALIDATION_MAX_RETRIES + 2):
+        futures = {
+            index: _executor.submit(validate_script, results[index]["generated_script"], units[index]["module_name"],
+                                    language, framework, sources, units[index].get("source_path"))
+            for index in pending
+        }
+        failing = []
+        for index, future in futures.items():
+            outcome = future.result()
+            results[index]["validation"] = {**outcome, "attempts": attempt}
+            if outcome["status"] in (FAILED, INVALID, TIMEOUT):
+                failing.append(index)
+
+        if not failing or attempt > VALIDATION_MAX_RETRIES or budget <= 0 or (should_cancel and should_cancel()):
+            break
+        failing = failing[:budget]
+        budget -= len(failing)
+        print(f"Validation: {len(failing)} unit(s) failed, asking the model to repair them (round {attempt}).",
+              flush=True)
+
+        repair_units = []
+        for index in failing:
+            conversations[index] = repair_messages(conversations[index], results[index]["generated_script"],
+                                                   results[index]["validation"])
+            repair_units.append({"name": units[index]["name"], "messages": conversations[index]})
+        pending = []
+        for index, repaired in zip(failing, regenerate(repair_units)):
+            if repaired["generated_script"]:
+                results[index]["generated_script"] = repaired["generated_script"]
+                pending.append(index)
+    return results
+
+
+def merge_validations(validations: list[dict | None]) -> dict | None:
+    """Combines the validations of a module's chunks: the worst status, and the output of every non-passing chunk."""
+    validations = [v for v in validations if v]
+    if not validations:
+        return None
+    severity = (PASSED, SKIPPED, FAILED, TIMEOUT, INVALID)
+    return {
+        "status": max((v["status"] for v in validations), key=severity.index),
+        "attempts": max(v["attempts"] for v in validations),
+        "output": "\n\n".join(v["output"] for v in validations if v["status"] != PASSED and v["output"]),
+        "seconds": round(sum(v["seconds"] for v in validations), 3),
+    }
+
+
+def summarize(results: list[dict]) -> dict:
+    """Counts of validation statuses over results that were validated."""
+    counts = {}
+    for result in results:
+        status = (result.get("validation") or {}).get("status")
+        if status:
+            counts[status] = counts.get(status, 0) + 1
+    return counts
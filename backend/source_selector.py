@@ -0,0 +1,249 @@
+# backend/source_selector.py
+import hashlib
+import os
+import posixpath
+import re
+
+# --- Configuration ---
+SOURCE_MAX_FILE_BYTES = int(os.environ.get('SOURCE_MAX_FILE_BYTES', str(256 * 1024)))
+SOURCE_MAX_TOTAL_BYTES = int(os.environ.get('SOURCE_MAX_TOTAL_BYTES', str(4 * 1024 * 1024)))
+
+# Always applied before the archive's .gitignore files and the request's own patterns. Names that
+# are also ordinary package names (build, env, ...) are anchored to the project root: the archive
+# root, or its single top-level folder.
+DEFAULT_EXCLUDE_PATTERNS = (
+    "node_modules/", "bower_components/", "jspm_packages/", "vendor/", "third_party/", "site-packages/",
+    ".git/", ".hg/", ".svn/", ".venv/", "venv/", "/env/", "__pycache__/", ".tox/", ".mypy_cache/",
+    "/dist/", "/build/", "/out/", "/target/", "/bin/", "/obj/", "coverage/", ".next/", ".nuxt/",
+    "__MACOSX/",
+    "*.min.js", "*-min.js", "*.bundle.js", "*.chunk.js", "*.d.ts",
+    "*_pb2.py", "*_pb2_grpc.py", "*.pb.go", "*.g.cs", "*.designer.cs", "*.Designer.cs", "*.generated.*",
+)
+
+# Markers that code generators put in a comment near the top of their output; phrases only, so a
+# comment about "an auto-generated id" does not count
+_GENERATED_MARKERS = re.compile(
+    r"@generated|\bdo not edit\b|\bcode generated by\b|<auto-generated"
+    r"|\b(?:auto-?generated|automatically generated)\s+(?:by|from|file|code|using|with)\b"
+    r"|\bthis (?:file|code|module) (?:is|was|has been) (?:auto-?|automatically )?generated\b",
+    re.IGNORECASE)
+_COMMENT_LINE = re.compile(r"^\s*(?:#|//|/\*|\*|<!--|--)")
+_GENERATED_HEADER_CHARS = 1000
+# Minified code: very long lines or a very high average line length
+_MINIFIED_MIN_BYTES = 1024
+_MINIFIED_MAX_LINE = 1000
+_MINIFIED_AVG_LINE = 200
+
+
+# --- gitignore-style patterns ---
+def _glob_to_regex(glob: str) -> str:
+    regex = []
+    index = 0
+    while index < len(glob):
+        char = glob[index]
+        if glob.startswith("**/", index):
+            regex.append("(?:.*/)?")
+            index += 3
+            continue
+        if glob.startswith("/**", index) and index + 3 == len(glob):
+            regex.append("/.*")
+            index += 3
+            continue
+        if glob.startswith("**", index):
+            regex.append(".*")
+            index += 2
+            continue
+        if char == "*":
+            regex.append("[^/]*")
+        elif char == "?":
+            regex.append("[^/]")
+        elif char == "[":
+            end = glob.find("]", index + 1)
+            if end == -1:
+                regex.append(re.escape(char))
+            else:
+                body = glob[index + 1:end]
+                if body.startswith("!"):
+                    body = "^" + body[1:]
+                regex.append(f"[{body}]")
+                index = end
+        elif char == "\\" and index + 1 < len(glob):
+            index += 1
+            regex.append(re.escape(glob[index]))
+        else:
+            regex.append(re.escape(char))
+        index += 1
+    return "".join(regex)
+
+
+class IgnoreRule:
+    """
+    One gitignore line. A pattern without a slash (other than a trailing one) matches a
+    name at any depth; with a slash it is anchored to `base` (the .gitignore's folder).
+    A trailing slash matches directories only; a leading '!' re-includes.
+    """
+
+    def __init__(self, pattern: str, base: str = "", source: str = "default"):
+        self.pattern = pattern
+        self.source = source
+        self.negated = pattern.startswith("!")
+        body = pattern[1:] if self.negated else pattern
+        self.directory_only = body.endswith("/")
+        body = body.rstrip("/")
+        anchored = "/" in body
+        body = body.lstrip("/")
+        prefix = re.escape(base.strip("/") + "/") if base.strip("/") else ""
+        if not anchored:
+            prefix += "(?:.*/)?"
+        self._regex = re.compile(f"^{prefix}{_glob_to_regex(body)}$")
+
+    def matches(self, path: str, is_dir: bool) -> bool:
+        if self.directory_only and not is_dir:
+            return False
+        return bool(self._regex.match(path))
+
+
+def parse_ignore_lines(text: str, base: str = "", source: str = "request") -> list[IgnoreRule]:
+    rules = []
+    for line in text.splitlines():
+        line = line.rstrip()
+        if not line or line.startswith("#"):
+            continue
+        rules.append(IgnoreRule(line, base, source))
+    return rules
+
+
+def split_patterns(value: str | None) -> list[str]:
+    """Patterns from a form field: one per line or comma-separated."""
+    return [part.strip() for part in re.split(r"[,\n]", value or "") if part.strip()]
+
+
+# --- Content heuristics ---
+def minified_reason(content: str) -> str | None:
+    if len(content) < _MINIFIED_MIN_BYTES:
+        return None
+    lines = content.splitlines() or [content]
+    longest = max(len(line) for line in lines)
+    average = len(content) / len(lines)
+    if longest > _MINIFIED_MAX_LINE:
+        return f"a line of {longest} characters"
+    if average > _MINIFIED_AVG_LINE:
+        return f"average line length {average:.0f}"
+    return None
+
+
+def generated_reason(content: str) -> str | None:
+    for line in content[:_GENERATED_HEADER_CHARS].splitlines():
+        match = _COMMENT_LINE.match(line) and _GENERATED_MARKERS.search(line)
+        if match:
+            return f"'{match.group(0)}' marker"
+    return None
+
+
+class SourceSelector:
+    """
+    Decides which code files of an archive are sent to the model.
+
+    Path rules are checked before anything is decompressed: DEFAULT_EXCLUDE_PATTERNS, then
+    the archive's .gitignore files, then the request's exclude patterns (later rules win,
+    '!' re-includes). With include patterns, only files that match one, or sit in a folder
+    that matches one, are considered at all.
+    Content checks (empty, minified, generated, duplicate, size caps) run on what is left.
+    Every skipped file is recorded in `skipped` with the reason.
+    """
+
+    def __init__(self, include: list[str] = None, exclude: list[str] = None, use_gitignore: bool = True,
+                 max_file_bytes: int = SOURCE_MAX_FILE_BYTES, max_total_bytes: int = SOURCE_MAX_TOTAL_BYTES):
+        self.include_rules = [IgnoreRule(pattern, source="include") for pattern in include or []]
+        self.default_rules = []
+        self.set_project_root("")
+        self.gitignore_rules = []
+        self.request_rules = [IgnoreRule(pattern, source="request") for pattern in exclude or []]
+        self.use_gitignore = use_gitignore
+        self.max_file_bytes = max_file_bytes
+        self.max_total_bytes = max_total_bytes
+        self.skipped = []
+        self._selected_bytes = 0
+        self._hashes = {}
+
+    def set_project_root(self, root: str) -> None:
+        """Anchors the root-only default patterns ('/build/', ...) to `root` (e.g. a zip's single top folder)."""
+        self.default_rules = [IgnoreRule(pattern, base=root if pattern.startswith("/") else "", source="default")
+                              for pattern in DEFAULT_EXCLUDE_PATTERNS]
+
+    def add_gitignore(self, gitignore_path: str, text: str) -> None:
+        if self.use_gitignore:
+            base = posixpath.dirname(gitignore_path)
+            self.gitignore_rules.extend(parse_ignore_lines(text, base, source=gitignore_path))
+
+    def _skip(self, path: str, reason: str, detail: str | None = None) -> bool:
+        self.skipped.append({"path": path, "reason": reason, "detail": detail})
+        return False
+
+    def skip(self, path: str, reason: str, detail: str | None = None) -> None:
+        """Records a file left out before these rules apply (e.g. an archive path outside the archive)."""
+        self._skip(path, reason, detail)
+
+    @staticmethod
+    def _candidates(path: str) -> list[tuple[str, bool]]:
+        """(path, is_dir) for each folder of `path`, outermost first, then the file itself."""
+        parts = path.split("/")
+        return [("/".join(parts[:depth]), True) for depth in range(1, len(parts))] + [(path, False)]
+
+    def _is_included(self, path: str) -> bool:
+        """
+        True if an include rule matches `path` or one of its folders; an included folder
+        includes everything below it unless a '!' rule matches further down.
+        """
+        included = False
+        for candidate, is_dir in self._candidates(path):
+            for rule in self.include_rules:
+                if rule.matches(candidate, is_dir):
+                    included = not rule.negated
+        return included
+
+    def _excluding_rule(self, path: str) -> IgnoreRule | None:
+        """The rule that excludes `path` or one of its folders, or None if it is kept."""
+        # Gitignore files are ordered by depth, so deeper (more specific) files come later
+        rules = self.default_rules + sorted(self.gitignore_rules, key=lambda r: r.source.count("/")) \
+            + self.request_rules
+        for candidate, is_dir in self._candidates(path):
+            decision = None
+            for rule in rules:
+                if rule.matches(candidate, is_dir):
+                    decision = None if rule.negated else rule
+            if decision is not None:
+                return decision  # An excluded folder excludes everything below it
+        return None
+
+    def accept_path(self, path: str, size: int) -> bool:
+        """Path and declared-size checks, before the file is read."""
+        if self.include_rules and not self._is_included(path):
+            return self._skip(path, "not_included")
+        rule = self._excluding_rule(path)
+        if rule is not None:
+            return self._skip(path, "gitignored" if rule.source not in ("default", "request") else "excluded",
+                              f"'{rule.pattern}' ({rule.source})")
+        if size > self.max_file_bytes:
+            return self._skip(path, "too_large", f"{size} bytes, limit {self.max_file_bytes}")
+        return True
+
+    def accept_content(self, path: str, content: str) -> bool:
+        """Content checks, in archive-path order; the first copy of duplicated content is kept."""
+        if not content.strip():
+            return self._skip(path, "empty")
+        reason = minified_reason(content)
+        if reason:
+            return self._skip(path, "minified", reason)
+        reason = generated_reason(content)
+        if reason:
+            return self._skip(path, "generated", reason)
+        digest = hashlib.sha256(content.replace("\r\n", "\n").encode('utf-8')).hexdigest()
+        if digest in self._hashes:
+            return self._skip(path, "duplicate", f"same content as {self._hashes[digest]}")
+        size = len(content.encode('utf-8'))
+        if self._selected_bytes + size > self.max_total_bytes:
+            return self._skip(path, "total_size_cap", f"limit {self.max_total_bytes} bytes")
+        self._hashes[digest] = path
+        self._selected_bytes += size
+        return True
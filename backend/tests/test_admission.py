@@ -0,0 +1,66 @@
+# backend/tests/test_admission.py
+import threading
+import unittest
+from unittest import mock
+
+import admission
+
+
+class ConcurrencyLimiterTests(unittest.TestCase):
+
+    def test_requests_beyond_the_limit_are_rejected(self):
+        limiter = admission.ConcurrencyLimiter(2)
+        slots = [limiter.try_acquire(), limiter.try_acquire()]
+        with self.assertRaises(admission.AdmissionRejected) as rejected:
+            limiter.try_acquire()
+        self.assertEqual(rejected.exception.status_code, 503)
+        self.assertGreaterEqual(rejected.exception.retry_after, 1)
+        self.assertEqual(limiter.stats()["rejected"], 1)
+
+        slots[0].release()
+        slots[0].release()  # Idempotent
+        self.assertEqual(limiter.stats()["in_flight"], 1)
+        limiter.try_acquire()
+        self.assertTrue(limiter.stats()["saturated"])
+
+    def test_waiting_request_gets_the_released_slot(self):
+        limiter = admission.ConcurrencyLimiter(1, max_waiting=1, max_wait_seconds=5)
+        slot = limiter.try_acquire()
+        threading.Timer(0.05, slot.release).start()
+        limiter.try_acquire()
+        self.assertEqual(limiter.stats()["in_flight"], 1)
+        self.assertEqual(limiter.stats()["rejected"], 0)
+
+
+class RateLimiterTests(unittest.TestCase):
+
+    def test_bucket_allows_a_burst_then_refills(self):
+        limiter = admission.RateLimiter(per_minute=60, burst=3)
+        with mock.patch.object(admission.time, "monotonic", return_value=100.0):
+            for _ in range(3):
+                limiter.check("client-a")
+            with self.assertRaises(admission.AdmissionRejected) as rejected:
+                limiter.check("client-a")
+            limiter.check("client-b")  # Buckets are per client
+        self.assertEqual(rejected.exception.status_code, 429)
+        self.assertEqual(rejected.exception.retry_after, 1)
+        with mock.patch.object(admission.time, "monotonic", return_value=101.0):
+            limiter.check("client-a")  # One token back after a second
+
+    def test_least_recently_seen_clients_are_forgotten(self):
+        limiter = admission.RateLimiter(per_minute=60, burst=1, max_clients=2)
+        with mock.patch.object(admission.time, "monotonic", return_value=100.0):
+            for client in ("a", "b", "c"):
+                limiter.check(client)
+            limiter.check("a")  # Evicted, so it starts with a full bucket again
+            with self.assertRaises(admission.AdmissionRejected):
+                limiter.check("c")
+
+    def test_zero_rate_disables_limiting(self):
+        limiter = admission.RateLimiter(per_minute=0, burst=1)
+        for _ in range(5):
+            limiter.check("client")
+
+
+if __name__ == '__main__':
+    unittest.main()
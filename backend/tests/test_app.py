@@ -0,0 +1,91 @@
+# backend/tests/test_app.py
+import io
+import time
+import unittest
+import zipfile
+from unittest import mock
+
+import app
+
+
+class BundleTestPathTests(unittest.TestCase):
+
+    def test_paths_stay_inside_the_bundle(self):
+        cases = {
+            "../../../home/user/.bashrc_evil.py": "python-unittest/home/user/test_.bashrc_evil.py",
+            "/abs/pkg/mod.py": "python-unittest/abs/pkg/test_mod.py",
+            "src\\..\\..\\win.py": "python-unittest/src/test_win.py",
+            "src/calc.py": "python-unittest/src/test_calc.py",
+        }
+        for path, expected in cases.items():
+            with self.subTest(path=path):
+                self.assertEqual(app.bundle_test_path({"path": path, "language": "python", "framework": "unittest"}),
+                                 expected)
+
+    def test_target_folder_is_one_safe_segment(self):
+        test_path = app.bundle_test_path({"path": "calc.go", "language": "go", "framework": "../../testing"})
+        folder, test_name = test_path.split("/")
+        self.assertNotIn("..", folder.split("/"))
+        self.assertEqual(test_name, "calc_test.go")
+
+
+class IncrementalUploadTests(unittest.TestCase):
+
+    def test_incremental_is_rejected_for_both_zip_modes(self):
+        archive = io.BytesIO()
+        with zipfile.ZipFile(archive, 'w') as zip_file:
+            zip_file.writestr("calc.py", "def add(a, b):\n    return a + b\n")
+        client = app.app.test_client()
+        for zip_mode in ('combined', 'per_file'):
+            with self.subTest(zip_mode=zip_mode):
+                response = client.post('/api/jobs', content_type='multipart/form-data', data={
+                    'file': (io.BytesIO(archive.getvalue()), 'calc.zip'), 'uploadType': 'zip',
+                    'zipMode': zip_mode, 'incremental': 'true'})
+                self.assertEqual(response.status_code, 400)
+                self.assertIn("single-file", response.get_json()["error"])
+
+
+class _FakeStream:
+    """An Ollama chat stream that takes a while, ending with the statistics chunk."""
+
+    def __init__(self):
+        self.parts = [{"message": {"content": "```python\nimport calc\n"}, "done": False},
+                      {"message": {"content": "x = 1\n"}, "done": False},
+                      {"message": {"content": ""}, "done": True, "eval_count": 10, "eval_duration": 10 ** 9}]
+
+    def __iter__(self):
+        for part in self.parts:
+            time.sleep(0.05)
+            yield part
+
+    def close(self):
+        pass
+
+
+class StreamedRequestTimingTests(unittest.TestCase):
+
+    def test_sse_request_records_the_llm_stage_after_the_body(self):
+        client = app.app.test_client()
+        finish = mock.Mock(wraps=app.finish_request_timing)
+        with mock.patch.object(app, "finish_request_timing", finish), \
+                mock.patch.object(app.llm_service.ollama_pool.default_pool, "chat_stream", return_value=_FakeStream()), \
+                mock.patch.object(app.generation_cache.default_cache, "get", return_value=None):
+            response = client.post('/api/upload-and-generate/stream', content_type='multipart/form-data', data={
+                'file': (io.BytesIO(b"def add(a, b):\n    return a + b\n"), 'calc.py'), 'uploadType': 'single'})
+            finish.assert_not_called()  # The body has not been generated yet
+            body = response.get_data(as_text=True)
+            response.close()
+
+        self.assertIn("event: done", body)
+        finish.assert_called_once()
+        timer, endpoint = finish.call_args.args[:2]
+        self.assertEqual(endpoint, '/api/upload-and-generate/stream')
+        self.assertEqual(list(timer.stages), ['save', 'extract', 'prompt_build', 'llm'])
+        self.assertGreaterEqual(timer.stages['llm'], 0.1)
+        self.assertGreaterEqual(timer.total_seconds(), timer.stages['llm'])
+        self.assertEqual(len(timer.llm_calls), 1)
+        self.assertEqual(timer.llm_calls[0]["outcome"], "ok")
+
+
+if __name__ == '__main__':
+    unittest.main()
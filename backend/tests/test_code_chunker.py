@@ -0,0 +1,169 @@
+# backend/tests/test_code_chunker.py
+import ast
+import unittest
+
+import code_chunker
+
+
+def _go_method(receiver: str, name: str, lines: int = 30) -> str:
+    body = '\tfmt.Println("working")\n' * lines
+    return f"func ({receiver}) {name}(x int) int {{\n{body}\treturn x\n}}\n\n"
+
+
+class SplitIntoUnitsTests(unittest.TestCase):
+
+    def test_python_functions_and_classes(self):
+        code = "import os\n\nX = 1\n\n\ndef a():\n    return 1\n\n\nclass B:\n    def m(self):\n        return 2\n"
+        preamble, units = code_chunker.split_into_units(code, "mod.py")
+        self.assertIn("import os", preamble)
+        self.assertEqual([(u["name"], u["kind"]) for u in units], [("a", "function"), ("B", "class")])
+
+    def test_oversized_python_class_is_split_per_method(self):
+        methods = "".join(f"    def m{i}(self):\n" + "        x = 1\n" * 40 + "        return x\n\n" for i in range(3))
+        code = f"class Big:\n    LIMIT = 3\n\n{methods}"
+        _, units = code_chunker.split_into_units(code, "big.py", budget=200)
+        self.assertEqual([u["name"] for u in units], ["Big.m0", "Big.m1", "Big.m2"])
+        for unit in units:
+            self.assertTrue(unit["code"].startswith("class Big:"))
+            self.assertIn("LIMIT = 3", unit["code"])
+
+    def test_duplicate_python_names_are_made_unique(self):
+        code = ("from typing import overload\n\n\n@overload\ndef f(x: int) -> int: ...\n\n\n"
+                "@overload\ndef f(x: str) -> str: ...\n\n\ndef f(x):\n    return x\n")
+        _, units = code_chunker.split_into_units(code, "ov.py")
+        self.assertEqual([u["name"] for u in units], ["f", "f#2", "f#3"])
+
+    def test_go_methods_are_named_after_receiver_type(self):
+        code = ('package srv\n\nimport "fmt"\n\n' + _go_method("s *Server", "Start") + _go_method("Server", "Stop")
+                + "func init() {}\n\nfunc init() {}\n")
+        preamble, units = code_chunker.split_into_units(code, "srv.go")
+        self.assertIn("package srv", preamble)
+        self.assertEqual([u["name"] for u in units], ["Server.Start", "Server.Stop", "init", "init#2"])
+
+    def test_go_chunk_symbols_name_the_methods(self):
+        code = 'package srv\n\nimport "fmt"\n\n' + "".join(_go_method("s *Server", f"M{i}") for i in range(4))
+        chunks = code_chunker.chunk_source(code, "srv.go", budget=400)
+        self.assertGreater(len(chunks), 1)
+        symbols = [symbol for chunk in chunks for symbol in chunk["symbols"]]
+        self.assertEqual(symbols, ["Server.M0", "Server.M1", "Server.M2", "Server.M3"])
+        for chunk in chunks:
+            self.assertTrue(chunk["code"].startswith("package srv"))
+
+    def test_braces_in_strings_do_not_join_declarations(self):
+        code = 'function a() {\n  return "{";\n}\n\nfunction b() {\n  return 2;\n}\n'
+        _, units = code_chunker.split_into_units(code, "a.js")
+        self.assertEqual([u["name"] for u in units], ["a", "b"])
+
+    def test_small_source_is_one_chunk(self):
+        chunks = code_chunker.chunk_source("def a():\n    return 1\n", "a.py")
+        self.assertEqual(chunks, [{"symbols": None, "code": "def a():\n    return 1\n"}])
+
+    def test_oversized_unit_is_cut_into_line_windows(self):
+        code = "def long():\n" + "    x = 1\n" * 400
+        _, units = code_chunker.split_into_units(code, "long.py", budget=200)
+        self.assertGreater(len(units), 1)
+        self.assertEqual("".join(u["code"] for u in units), code)
+        self.assertTrue(units[0]["name"].startswith("long (part 1 of"))
+
+
+class MergeTestScriptsTests(unittest.TestCase):
+
+    def test_python_imports_hoisted_duplicates_renamed_single_main(self):
+        first = ("import unittest\nfrom calc import add\n\n\nclass TestCalc(unittest.TestCase):\n"
+                 "    def test_add(self):\n        self.assertEqual(add(1, 2), 3)\n\n\n"
+                 "if __name__ == '__main__':\n    unittest.main()\n")
+        second = ("import unittest\nfrom calc import sub\n\n\nclass TestCalc(unittest.TestCase):\n"
+                  "    def test_sub(self):\n        self.assertEqual(sub(2, 1), 1)\n\n\n"
+                  "if __name__ == '__main__':\n    unittest.main()\n")
+        merged = code_chunker.merge_test_scripts([first, second], "python")
+        tree = ast.parse(merged)
+        classes = [node.name for node in tree.body if isinstance(node, ast.ClassDef)]
+        self.assertEqual(classes, ["TestCalc", "TestCalc_2"])
+        self.assertEqual(merged.count("import unittest"), 1)
+        self.assertEqual(merged.count("__main__"), 1)
+
+    def test_single_script_is_returned_unchanged(self):
+        self.assertEqual(code_chunker.merge_test_scripts(["x = 1\n", ""], "python"), "x = 1\n")
+
+    def test_go_has_one_package_clause_and_import_block(self):
+        first = ('package srv\n\nimport (\n\t"strings"\n\t"testing"\n)\n\nfunc helper() int { return 1 }\n\n'
+                 'func TestStart(t *testing.T) {\n\tif strings.ToUpper("a") != "A" {\n\t\tt.Fatal("upper")\n\t}\n}\n')
+        second = ('package srv\n\nimport "testing"\n\nfunc helper() int { return 1 }\n\n'
+                  'func TestStart(t *testing.T) {\n\tt.Log("{")\n}\n')
+        merged = code_chunker.merge_test_scripts([first, second], "go")
+        self.assertEqual(merged.count("package srv"), 1)
+        self.assertEqual(merged.count("import ("), 1)
+        self.assertEqual(merged.count('"testing"'), 1)
+        self.assertEqual(merged.count("func helper()"), 1)
+        self.assertIn("func TestStart(", merged)
+        self.assertIn("func TestStart_2(", merged)
+        code = merged.replace('"{"', '""')
+        self.assertEqual(code.count("{"), code.count("}"))
+
+    def test_java_members_are_merged_into_one_class(self):
+        first = ("package calc;\n\nimport org.junit.jupiter.api.Test;\nimport static org.junit.jupiter.api.Assertions.*;\n\n"
+                 "public class CalcTest {\n    private final Calc calc = new Calc();\n\n"
+                 "    @Test\n    void testAdd() {\n        assertEquals(3, calc.add(1, 2));\n    }\n}\n")
+        second = ("package calc;\n\nimport org.junit.jupiter.api.Test;\n\n"
+                  "public class CalcTest {\n    private final Calc calc = new Calc();\n\n"
+                  "    @Test\n    void testAdd() {\n        assertEquals(\"}\", calc.show());\n    }\n\n"
+                  "    @Test\n    void testSub() {\n        assertEquals(1, calc.sub(2, 1));\n    }\n}\n")
+        merged = code_chunker.merge_test_scripts([first, second], "java")
+        self.assertEqual(merged.count("public class CalcTest"), 1)
+        self.assertEqual(merged.count("package calc;"), 1)
+        self.assertEqual(merged.count("import org.junit.jupiter.api.Test;"), 1)
+        self.assertEqual(merged.count("private final Calc calc"), 1)
+        self.assertIn("void testAdd()", merged)
+        self.assertIn("void testAdd_2()", merged)
+        self.assertIn("void testSub()", merged)
+        self.assertTrue(merged.rstrip().endswith("}"))
+        self.assertLess(merged.index("import static"), merged.index("public class"))
+
+    def test_csharp_keeps_namespace_and_merges_class(self):
+        first = ("using NUnit.Framework;\n\nnamespace Calc.Tests\n{\n    [TestFixture]\n    public class CalcTests\n    {\n"
+                 "        [Test]\n        public void Add() { Assert.AreEqual(3, 1 + 2); }\n    }\n}\n")
+        second = ("using NUnit.Framework;\nusing System;\n\nnamespace Calc.Tests\n{\n    public class CalcTests\n    {\n"
+                  "        [Test]\n        public void Sub()\n        {\n            Assert.AreEqual(1, 2 - 1);\n        }\n    }\n}\n")
+        merged = code_chunker.merge_test_scripts([first, second], "csharp")
+        self.assertEqual(merged.count("public class CalcTests"), 1)
+        self.assertEqual(merged.count("namespace Calc.Tests"), 1)
+        self.assertEqual(merged.count("using NUnit.Framework;"), 1)
+        self.assertIn("public void Add()", merged)
+        self.assertIn("public void Sub()", merged)
+        self.assertEqual(merged.count("{"), merged.count("}"))
+
+    def test_javascript_imports_are_deduplicated(self):
+        first = "const { add } = require('./calc');\n\ntest('adds', () => {\n  expect(add(1, 2)).toBe(3);\n});\n"
+        second = "const { add } = require('./calc');\n\ntest('adds again', () => {\n  expect(add(2, 2)).toBe(4);\n});\n"
+        merged = code_chunker.merge_test_scripts([first, second], "javascript")
+        self.assertEqual(merged.count("require('./calc')"), 1)
+        self.assertIn("test('adds'", merged)
+        self.assertIn("test('adds again'", merged)
+
+    def test_javascript_bindings_are_declared_once(self):
+        first = ("const assert = require('assert');\nconst { add } = require('./calc');\n"
+                 "const calc = makeCalc();\n\ntest('adds', () => {\n  const x = 1;\n  assert.equal(add(x, 2), 3);\n});\n")
+        second = ("const assert = require('assert');\nconst { add, sub: minus } = require('./calc');\n"
+                  "const calc = makeCalc();\nconst table = {\n  a: 1,\n};\n\n"
+                  "test('subtracts', () => {\n  const x = 1;\n  assert.equal(minus(2, x), 1);\n});\n")
+        merged = code_chunker.merge_test_scripts([first, second], "javascript")
+        self.assertEqual(merged.count("const assert"), 1)
+        self.assertEqual(merged.count("const calc"), 1)
+        self.assertEqual(merged.count("const x = 1;"), 2)  # Block-scoped, left alone
+        self.assertIn("const { add } = require('./calc');", merged)
+        self.assertIn("const { sub: minus } = require('./calc');", merged)
+        self.assertIn("const table = {\n  a: 1,\n};", merged)
+        self.assertLess(merged.index("sub: minus"), merged.index("test('adds'"))
+
+    def test_typescript_imports_keep_only_new_names(self):
+        first = "import { add } from './calc';\nimport type { Op } from './types';\n\ntest('a', () => {});\n"
+        second = ("import { add, sub as minus } from './calc';\nimport type { Op } from './types';\n"
+                  "import {\n  mul,\n} from './more';\n\ntest('b', () => {});\n")
+        merged = code_chunker.merge_test_scripts([first, second], "typescript")
+        self.assertEqual(merged.count("import type { Op }"), 1)
+        self.assertIn("import { sub as minus } from './calc';", merged)
+        self.assertIn("import {\n  mul,\n} from './more';", merged)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,63 @@
+# backend/tests/test_file_processor.py
+import io
+import unittest
+import zipfile
+from types import SimpleNamespace
+
+import file_processor
+import source_selector
+
+
+def _upload(members: dict) -> SimpleNamespace:
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, 'w') as archive:
+        for name, content in members.items():
+            archive.writestr(name, content)
+    buffer.seek(0)
+    return SimpleNamespace(stream=buffer)
+
+
+class ExtractZipCodeFilesTests(unittest.TestCase):
+
+    def test_members_outside_the_archive_are_skipped(self):
+        selector = source_selector.SourceSelector()
+        upload = _upload({
+            "../../../home/user/.bashrc_evil.py": "x = 1\n",
+            "src/../../up.py": "y = 2\n",
+            "/etc/abs.py": "z = 3\n",
+            "..\\win.py": "w = 4\n",
+            "src/ok.py": "v = 5\n",
+        })
+        files = file_processor.extract_zip_code_files(upload, selector)
+        self.assertEqual([path for path, _ in files], ["etc/abs.py", "src/ok.py"])
+        self.assertEqual(sorted(entry["path"] for entry in selector.skipped if entry["reason"] == "unsafe_path"),
+                         ["../../../home/user/.bashrc_evil.py", "..\\win.py", "src/../../up.py"])
+
+    def test_single_top_folder_is_the_project_root(self):
+        selector = source_selector.SourceSelector()
+        upload = _upload({"shop/build/gen.py": "a = 1\n", "shop/src/build/steps.py": "b = 2\n",
+                          "__MACOSX/shop/._x.py": "c = 3\n"})
+        files = file_processor.extract_zip_code_files(upload, selector)
+        self.assertEqual([path for path, _ in files], ["shop/src/build/steps.py"])
+
+    def test_not_a_zip_is_rejected(self):
+        with self.assertRaises(ValueError):
+            file_processor.extract_zip_code_files(SimpleNamespace(stream=io.BytesIO(b"not a zip")))
+
+
+class HandleAndExtractCodeTests(unittest.TestCase):
+
+    def test_single_files_are_read_from_the_upload_stream(self):
+        # No save(): two concurrent uploads of utils.py never share a path on disk
+        first = SimpleNamespace(read=io.BytesIO(b"def a():\n    return 1\n").read)
+        second = SimpleNamespace(read=io.BytesIO(b"def b():\n    return 2\n").read)
+        self.assertEqual(file_processor.handle_and_extract_code(first, 'single', 'utils.py'), "def a():\n    return 1\n")
+        self.assertEqual(file_processor.handle_and_extract_code(second, 'single', 'utils.py'), "def b():\n    return 2\n")
+
+    def test_unknown_upload_type(self):
+        with self.assertRaises(ValueError):
+            file_processor.handle_and_extract_code(SimpleNamespace(), 'tarball', 'x.tar')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,52 @@
+# backend/tests/test_generation_cache.py
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+import generation_cache
+
+
+class DiskTierTests(unittest.TestCase):
+
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.disk_dir = self._tmp.name
+
+    def tearDown(self):
+        self._tmp.cleanup()
+
+    def _cache(self, **kwargs) -> generation_cache.GenerationCache:
+        return generation_cache.GenerationCache(max_entries=1, disk_dir=self.disk_dir, **kwargs)
+
+    def _files(self) -> list[str]:
+        return sorted(name[:-len(".json")] for _, _, names in os.walk(self.disk_dir) for name in names)
+
+    def test_least_recently_used_files_are_evicted(self):
+        cache = self._cache(disk_max_bytes=300)  # Room for three entries of about 90 bytes
+        for key in ("aa1", "bb2", "cc3"):
+            cache.set(key, "x" * 50)
+        self.assertEqual(cache.get("aa1"), "x" * 50)  # From disk; now the most recently used
+        before = cache.stats()
+        cache.set("dd4", "x" * 50)
+        self.assertEqual(self._files(), ["aa1", "cc3", "dd4"])
+        after = cache.stats()
+        self.assertEqual(after["disk_evictions"], before["disk_evictions"] + 1)
+        self.assertEqual(after["evictions"], before["evictions"] + 1)  # "aa1" left memory when "dd4" came in
+
+    def test_writes_do_not_walk_the_directory(self):
+        cache = self._cache(disk_max_bytes=10 ** 6)
+        with mock.patch.object(generation_cache.os, "walk", wraps=os.walk) as walk:
+            for index in range(20):
+                cache.set(f"k{index:02d}", "value")
+        self.assertEqual(walk.call_count, 1)
+
+    def test_existing_files_are_counted_after_a_restart(self):
+        self._cache(disk_max_bytes=10 ** 6).set("aa1", "x" * 100)
+        cache = self._cache(disk_max_bytes=150)
+        cache.set("bb2", "x" * 100)
+        self.assertEqual(self._files(), ["bb2"])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,49 @@
+# backend/tests/test_import_index.py
+import unittest
+
+import import_index
+
+PYTHON_FILES = [
+    ("proj/pkg/__init__.py", "from .models import User\n"),
+    ("proj/pkg/models.py",
+     'class User:\n    """A user of the shop.\n\n    Long description."""\n\n'
+     '    def __init__(self, name: str):\n        self.name = name\n\n'
+     '    def _secret(self):\n        return 1\n\n'
+     '    def greet(self) -> str:\n        return "hi " + self.name\n\n\n'
+     'def helper(x):\n    return x\n'),
+    ("proj/pkg/service.py", "from pkg.models import User\nimport os\n\n\ndef register(name):\n    return User(name)\n"),
+]
+
+
+class UploadIndexTests(unittest.TestCase):
+
+    def test_python_imports_resolve_to_uploaded_modules_only(self):
+        index = import_index.UploadIndex(PYTHON_FILES)
+        self.assertEqual(index.imported_symbols("proj/pkg/service.py"), {"proj/pkg/models.py": ["User"]})
+        self.assertEqual(index.imported_symbols("proj/pkg/__init__.py"), {"proj/pkg/models.py": ["User"]})
+
+    def test_stubs_have_signatures_and_first_doc_paragraph_only(self):
+        stubs = import_index.UploadIndex(PYTHON_FILES).context_stubs("proj/pkg/service.py")
+        self.assertTrue(stubs.startswith("# From proj/pkg/models.py\nclass User:"))
+        self.assertIn('"""A user of the shop."""', stubs)
+        self.assertIn("def greet(self) -> str: ...", stubs)
+        self.assertIn("def __init__(self, name: str): ...", stubs)
+        self.assertNotIn("Long description", stubs)
+        self.assertNotIn("_secret", stubs)
+        self.assertNotIn("helper", stubs)  # Not imported
+        self.assertNotIn("return", stubs)
+
+    def test_javascript_relative_imports(self):
+        index = import_index.UploadIndex([
+            ("src/math.js", "export function add(a, b) {\n  return a + b;\n}\nexport const PI = 3.14;\n"),
+            ("src/app.js", "import { add } from './math';\nconst lodash = require('lodash');\n"),
+        ])
+        self.assertEqual(index.imported_symbols("src/app.js"), {"src/math.js": ["add"]})
+
+    def test_unparseable_python_is_skipped(self):
+        index = import_index.UploadIndex([("a.py", "def broken(:\n"), ("b.py", "import a\n")])
+        self.assertEqual(index.context_stubs("b.py"), "")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,73 @@
+# backend/tests/test_incremental_store.py
+import json
+import os
+import tempfile
+import unittest
+
+import incremental_store
+
+GO_MODULE = '''package srv
+
+import "fmt"
+
+func (s *Server) Start() {
+	fmt.Println("start")
+}
+
+func (s *Server) Stop() {
+	fmt.Println("stop")
+}
+'''
+
+PY_OVERLOADS = '''from typing import overload
+
+
+@overload
+def f(x: int) -> int: ...
+
+
+@overload
+def f(x: str) -> str: ...
+
+
+def f(x):
+    return x
+'''
+
+
+def _store_all(fingerprinted: dict) -> dict:
+    """The record the store keeps after every unit got a test block named after it."""
+    store = incremental_store.IncrementalStore(store_dir=None)
+    store.save("key", fingerprinted, {unit["name"]: f"# tests for {unit['name']}" for unit in fingerprinted["units"]})
+    return store.load("key")
+
+
+class IncrementalKeyTests(unittest.TestCase):
+
+    def test_go_methods_are_tracked_separately(self):
+        previous = _store_all(incremental_store.fingerprint_module(GO_MODULE, "srv.go"))
+        changed = GO_MODULE.replace('"stop"', '"stopping"')
+        plan = incremental_store.plan_regeneration(incremental_store.fingerprint_module(changed, "srv.go"), previous)
+        self.assertEqual(plan["regenerate"], ["Server.Stop"])
+        self.assertEqual(plan["reuse"], {"Server.Start": "# tests for Server.Start"})
+        self.assertEqual(plan["removed"], [])
+
+    def test_overloads_with_the_same_name_are_tracked_separately(self):
+        fingerprinted = incremental_store.fingerprint_module(PY_OVERLOADS, "ov.py")
+        self.assertEqual([unit["name"] for unit in fingerprinted["units"]], ["f", "f#2", "f#3"])
+        previous = _store_all(fingerprinted)
+        changed = PY_OVERLOADS.replace("return x", "return x * 2")
+        plan = incremental_store.plan_regeneration(incremental_store.fingerprint_module(changed, "ov.py"), previous)
+        self.assertEqual(plan["regenerate"], ["f#3"])
+        self.assertEqual(sorted(plan["reuse"]), ["f", "f#2"])
+
+    def test_records_from_the_old_format_are_ignored(self):
+        with tempfile.TemporaryDirectory() as store_dir:
+            with open(os.path.join(store_dir, "old.json"), 'w', encoding='utf-8') as f:
+                json.dump({"preamble_fingerprint": "x", "preamble_bindings": None,
+                           "units": {"func": {"fingerprint": "y", "test_block": "# stale"}}}, f)
+            self.assertIsNone(incremental_store.IncrementalStore(store_dir=store_dir).load("old"))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,47 @@
+# backend/tests/test_job_queue.py
+import threading
+import unittest
+
+import job_queue
+
+
+class JobQueueTests(unittest.TestCase):
+
+    def setUp(self):
+        self.release = threading.Event()
+        self.started = threading.Event()
+        self.queue = job_queue.JobQueue(workers=1, max_size=2)
+
+    def tearDown(self):
+        self.release.set()
+
+    def _blocking_work(self, job):
+        self.started.set()
+        self.release.wait(5)
+        return {"ok": True}
+
+    def test_cancelled_jobs_free_their_queue_slot(self):
+        running, _ = self.queue.submit("running", self._blocking_work)
+        self.assertTrue(self.started.wait(5))
+        first, _ = self.queue.submit("a", self._blocking_work)
+        self.queue.submit("b", self._blocking_work)
+        with self.assertRaises(job_queue.QueueFullError):
+            self.queue.submit("c", self._blocking_work)
+
+        self.queue.cancel(first.id)
+        self.assertEqual(first.status, job_queue.CANCELLED)
+        self.assertEqual(self.queue.depth(), 1)
+        job, attached = self.queue.submit("c", self._blocking_work)
+        self.assertFalse(attached)
+        self.assertEqual(job.status, job_queue.QUEUED)
+
+    def test_same_key_attaches_to_the_in_flight_job(self):
+        job, _ = self.queue.submit("key", self._blocking_work)
+        again, attached = self.queue.submit("key", self._blocking_work)
+        self.assertTrue(attached)
+        self.assertIs(again, job)
+        self.assertEqual(job.attached_requests, 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,61 @@
+# backend/tests/test_llm_streaming.py
+import unittest
+from unittest import mock
+
+import llm_service
+
+
+class _FakeStream:
+    """Ollama chat stream stand-in that records how many parts were read and whether it was closed."""
+
+    def __init__(self, texts):
+        self.parts = [{"message": {"content": text}, "done": False} for text in texts]
+        self.parts.append({"message": {"content": ""}, "done": True})
+        self.read = 0
+        self.closed = False
+
+    def __iter__(self):
+        for part in self.parts:
+            self.read += 1
+            yield part
+
+    def close(self):
+        self.closed = True
+
+
+class StreamingCodeExtractorTests(unittest.TestCase):
+
+    def _feed_all(self, chunks):
+        extractor = llm_service._StreamingCodeExtractor()
+        emitted = "".join(extractor.feed(chunk) for chunk in chunks) + extractor.flush()
+        return extractor, emitted
+
+    def test_fence_and_artifacts_split_across_chunks(self):
+        chunks = ["Here you go:\n``", "`python\nimport unittest\n<｜end", "▁of▁sentence｜>x = 1\n`", "``\nExplanation."]
+        extractor, emitted = self._feed_all(chunks)
+        self.assertEqual(emitted, "import unittest\nx = 1")
+        self.assertEqual(extractor.script(), "import unittest\nx = 1")
+
+    def test_text_without_a_fence_is_used_as_is(self):
+        extractor, emitted = self._feed_all(["def test_a():\n", "    assert True\n"])
+        self.assertEqual(extractor.script(), "def test_a():\n    assert True")
+
+
+class StreamTestsTests(unittest.TestCase):
+
+    def test_stream_is_closed_once_the_code_block_ends(self):
+        stream = _FakeStream(["```python\nx = 1\n", "```\n", "This test checks ...", " more prose"])
+        with mock.patch.object(llm_service.ollama_pool.default_pool, "chat_stream", return_value=stream):
+            events = list(llm_service.stream_tests_from_deepseek("prompt"))
+        self.assertEqual(events[-1], {"type": "done", "generated_script": "x = 1", "stopped_early": True})
+        self.assertEqual(stream.read, 2)
+        self.assertTrue(stream.closed)
+
+    def test_empty_output_is_an_error(self):
+        with mock.patch.object(llm_service.ollama_pool.default_pool, "chat_stream", return_value=_FakeStream([])):
+            events = list(llm_service.stream_tests_from_deepseek("prompt"))
+        self.assertEqual([event["type"] for event in events], ["error"])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,78 @@
+# backend/tests/test_ollama_pool.py
+import threading
+import unittest
+from types import SimpleNamespace
+from unittest import mock
+
+import ollama_pool
+
+
+class _FakeClient:
+    def __init__(self, loaded=(), fail=False):
+        self.loaded = list(loaded)
+        self.fail = fail
+        self.generated = []
+
+    def ps(self):
+        if self.fail:
+            raise ConnectionError("unreachable")
+        return SimpleNamespace(models=[SimpleNamespace(model=name, name=name) for name in self.loaded])
+
+    def generate(self, model, keep_alive):
+        if self.fail:
+            raise ConnectionError("unreachable")
+        self.generated.append(model)
+
+
+class HealthCheckTests(unittest.TestCase):
+
+    def _pool(self, probe, client):
+        pool = ollama_pool.OllamaPool(hosts=["http://gpu-1:11434"], max_concurrency=1)
+        pool.model = "llama3"
+        endpoint = pool.endpoints[0]
+        endpoint.healthy = False
+        endpoint.probe_client, endpoint.client = probe, client
+        return pool, endpoint
+
+    def _run_one_round(self, pool):
+        """Runs one pass of the health loop and waits for the rejoin threads it started."""
+        rounds = iter([None])
+        with mock.patch.object(ollama_pool.time, "sleep", side_effect=lambda _: next(rounds)):
+            with self.assertRaises(StopIteration):
+                pool._health_loop()
+        for thread in threading.enumerate():
+            if thread.name.startswith("ollama-rejoin-"):
+                thread.join(5)
+
+    def test_unreachable_endpoint_is_not_loaded(self):
+        client = _FakeClient()
+        pool, endpoint = self._pool(_FakeClient(fail=True), client)
+        self._run_one_round(pool)
+        self.assertFalse(endpoint.healthy)
+        self.assertEqual(client.generated, [])
+
+    def test_model_is_loaded_before_the_endpoint_rejoins(self):
+        client = _FakeClient()
+        pool, endpoint = self._pool(_FakeClient(), client)
+        self._run_one_round(pool)
+        self.assertEqual(client.generated, ["llama3"])
+        self.assertTrue(endpoint.healthy)
+        self.assertFalse(endpoint.rejoining)
+
+    def test_loaded_model_is_not_loaded_again(self):
+        client = _FakeClient()
+        pool, endpoint = self._pool(_FakeClient(loaded=["llama3:latest"]), client)
+        self._run_one_round(pool)
+        self.assertEqual(client.generated, [])
+        self.assertTrue(endpoint.healthy)
+
+    def test_failed_model_load_keeps_the_endpoint_out(self):
+        pool, endpoint = self._pool(_FakeClient(), _FakeClient(fail=True))
+        self._run_one_round(pool)
+        self.assertFalse(endpoint.healthy)
+        self.assertFalse(endpoint.rejoining)
+        self.assertEqual(endpoint.last_error, "unreachable")
+
+
+if __name__ == '__main__':
+    unittest.main()
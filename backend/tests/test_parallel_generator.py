@@ -0,0 +1,40 @@
+# backend/tests/test_parallel_generator.py
+import threading
+import time
+import unittest
+from unittest import mock
+
+import parallel_generator
+
+
+class GenerateForUnitsTests(unittest.TestCase):
+
+    def test_at_most_max_in_flight_units_are_submitted(self):
+        lock = threading.Lock()
+        state = {"running": 0, "peak": 0}
+
+        def fake_generation(messages, use_cache):
+            with lock:
+                state["running"] += 1
+                state["peak"] = max(state["peak"], state["running"])
+            time.sleep(0.01)
+            with lock:
+                state["running"] -= 1
+            return f"# tests for {messages}", "miss"
+
+        units = [{"name": f"u{index}", "messages": f"m{index}"} for index in range(8)]
+        submit = mock.patch.object(parallel_generator._executor, "submit", wraps=parallel_generator._executor.submit)
+        with mock.patch.object(parallel_generator.llm_service, "get_tests_with_cache", side_effect=fake_generation), \
+                submit as submitted:
+            progress = []
+            results = parallel_generator.generate_for_units(
+                units, max_in_flight=2, on_unit_done=lambda done, total: progress.append((done, total)))
+
+        self.assertEqual([result["generated_script"] for result in results], [f"# tests for m{i}" for i in range(8)])
+        self.assertEqual(submitted.call_count, 8)
+        self.assertLessEqual(state["peak"], 2)
+        self.assertEqual(progress[-1], (8, 8))
+
+
+if __name__ == '__main__':
+    unittest.main()
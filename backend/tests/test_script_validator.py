@@ -0,0 +1,74 @@
+# backend/tests/test_script_validator.py
+import unittest
+from unittest import mock
+
+import script_validator
+
+SOURCES = {"pkg/calc.py": "def add(a, b):\n    return a + b\n"}
+GOOD = "import unittest\nfrom calc import add\n\n\nclass T(unittest.TestCase):\n    def test_add(self):\n        self.assertEqual(add(1, 2), 3)\n"
+
+
+class PrecheckTests(unittest.TestCase):
+
+    def test_problems_found_without_running_anything(self):
+        self.assertIsNone(script_validator.precheck_script(GOOD, "calc", "python"))
+        self.assertIn("SyntaxError", script_validator.precheck_script("def test(:\n", "calc", "python"))
+        self.assertIn("never imports", script_validator.precheck_script("import os\n", "calc", "python"))
+        self.assertIn("artifacts", script_validator.precheck_script(GOOD + "<｜end｜>", "calc", "python"))
+        self.assertIsNone(script_validator.precheck_script("const { add } = require('./calc');", "calc", "javascript"))
+
+
+class ValidateScriptTests(unittest.TestCase):
+
+    def test_missing_sandbox_skips_the_run(self):
+        with mock.patch.object(script_validator, "VALIDATION_SANDBOX", "no-such-bwrap-executable"), \
+                mock.patch.object(script_validator.subprocess, "Popen") as popen:
+            outcome = script_validator.validate_script(GOOD, "calc", "python", "unittest", SOURCES, "pkg/calc.py")
+        self.assertEqual(outcome["status"], script_validator.SKIPPED)
+        self.assertIn("not installed", outcome["output"])
+        popen.assert_not_called()
+
+    def test_sandbox_keeps_the_upload_inside_its_directory(self):
+        self.assertIsNone(script_validator._sandbox_path("/tmp/box", "../../etc/passwd"))
+        self.assertEqual(script_validator._sandbox_path("/tmp/box", "/pkg/calc.py"), "/tmp/box/pkg/calc.py")
+
+    def test_sandbox_command_isolates_and_limits(self):
+        with mock.patch.object(script_validator.shutil, "which", return_value="/usr/bin/bwrap"):
+            command = script_validator._sandbox_command("/tmp/box", "/tmp/box/pkg", ["python", "-m", "unittest"],
+                                                        {"HOME": "/tmp/box"})
+        self.assertEqual(command[0], "/usr/bin/bwrap")
+        for flag in ("--unshare-all", "--die-with-parent", "--clearenv"):
+            self.assertIn(flag, command)
+        self.assertEqual(command[command.index("--bind") + 1:command.index("--bind") + 3], ["/tmp/box", "/tmp/box"])
+        self.assertEqual(command[-3:], ["python", "-m", "unittest"])
+
+
+class ValidateAndRepairTests(unittest.TestCase):
+
+    def test_only_failing_units_are_sent_back_with_their_output(self):
+        units = [{"name": name, "messages": [{"role": "user", "content": name}], "module_name": "calc",
+                  "source_path": "pkg/calc.py"} for name in ("ok", "broken")]
+        results = [{"name": "ok", "generated_script": GOOD}, {"name": "broken", "generated_script": "def test(:\n"}]
+        regenerate = mock.Mock(return_value=[{"name": "broken", "generated_script": GOOD}])
+        with mock.patch.object(script_validator, "run_script",
+                               return_value={"status": script_validator.PASSED, "output": "", "seconds": 0.1}), \
+                mock.patch.object(script_validator, "VALIDATION_MAX_RETRIES", 1):
+            script_validator.validate_and_repair(units, results, "python", "unittest", SOURCES, regenerate)
+
+        (repair_units,), _ = regenerate.call_args
+        self.assertEqual([unit["name"] for unit in repair_units], ["broken"])
+        self.assertIn("SyntaxError", repair_units[0]["messages"][-1]["content"])
+        self.assertEqual([r["validation"]["status"] for r in results], ["passed", "passed"])
+        self.assertEqual([r["validation"]["attempts"] for r in results], [1, 2])
+
+    def test_merged_validation_reports_the_worst_chunk(self):
+        merged = script_validator.merge_validations([
+            {"status": "passed", "attempts": 1, "output": "", "seconds": 0.5},
+            {"status": "timeout", "attempts": 2, "output": "killed", "seconds": 1.0},
+            None,
+        ])
+        self.assertEqual(merged, {"status": "timeout", "attempts": 2, "output": "killed", "seconds": 1.5})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,62 @@
+# backend/tests/test_source_selector.py
+import unittest
+
+import source_selector
+
+PATHS = ["src/a.py", "src/pkg/b.py", "src/gen/c.py", "lib/d.py", "node_modules/e.js"]
+
+
+def _accepted(selector: source_selector.SourceSelector) -> list[str]:
+    return [path for path in PATHS if selector.accept_path(path, 1)]
+
+
+class AcceptPathTests(unittest.TestCase):
+
+    def test_include_folder_selects_everything_below_it(self):
+        for pattern in ("src/", "src", "/src"):
+            with self.subTest(pattern=pattern):
+                self.assertEqual(_accepted(source_selector.SourceSelector(include=[pattern])),
+                                 ["src/a.py", "src/pkg/b.py", "src/gen/c.py"])
+
+    def test_include_negation_below_an_included_folder(self):
+        selector = source_selector.SourceSelector(include=["src/", "!src/gen/"])
+        self.assertEqual(_accepted(selector), ["src/a.py", "src/pkg/b.py"])
+        self.assertEqual([entry["path"] for entry in selector.skipped if entry["reason"] == "not_included"],
+                         ["src/gen/c.py", "lib/d.py", "node_modules/e.js"])
+
+    def test_include_file_pattern_and_default_excludes(self):
+        selector = source_selector.SourceSelector(include=["*.py", "*.js"])
+        self.assertEqual(_accepted(selector), ["src/a.py", "src/pkg/b.py", "src/gen/c.py", "lib/d.py"])
+        self.assertEqual(selector.skipped[-1]["reason"], "excluded")
+
+    def test_gitignore_and_request_excludes(self):
+        selector = source_selector.SourceSelector(exclude=["lib/"])
+        selector.add_gitignore("src/.gitignore", "gen/\n")
+        self.assertEqual(_accepted(selector), ["src/a.py", "src/pkg/b.py"])
+        self.assertEqual([entry["reason"] for entry in selector.skipped], ["gitignored", "excluded", "excluded"])
+
+    def test_build_like_folders_are_only_excluded_at_the_project_root(self):
+        paths = ["build/gen.py", "src/main/java/com/acme/build/Builder.java", "app/env/settings.py", "dist/x.js"]
+        selector = source_selector.SourceSelector()
+        self.assertEqual([p for p in paths if selector.accept_path(p, 1)],
+                         ["src/main/java/com/acme/build/Builder.java", "app/env/settings.py"])
+        selector = source_selector.SourceSelector()
+        selector.set_project_root("shop")
+        self.assertEqual([p for p in ("shop/build/gen.py", "shop/app/build/b.py") if selector.accept_path(p, 1)],
+                         ["shop/app/build/b.py"])
+
+
+class ContentHeuristicsTests(unittest.TestCase):
+
+    def test_generated_markers_need_a_generator_comment(self):
+        self.assertIsNone(source_selector.generated_reason('def new_id():\n    """Returns an auto-generated id."""\n'))
+        self.assertIsNone(source_selector.generated_reason("# The key is auto-generated when missing\n"))
+        for header in ("# Code generated by protoc-gen-go. DO NOT EDIT.\n", "// <auto-generated>\n",
+                       "/**\n * @generated\n */\n", "# This file was automatically generated by SWIG.\n",
+                       "// Auto-generated by openapi-generator\n"):
+            with self.subTest(header=header):
+                self.assertIsNotNone(source_selector.generated_reason(header + "x = 1\n"))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,115 @@
+# backend/timing.py
+import threading
+import time
+from contextlib import contextmanager
+
+# Request stages, in pipeline order
+STAGES = ('save', 'extract', 'prompt_build', 'llm', 'validate', 'post_process')
+
+_local = threading.local()
+
+
+class StageTimer:
+    """
+    Accumulates wall-clock seconds per named stage for one request, plus the individual
+    spans (stage, start offset, duration) and the Ollama statistics of its LLM calls.
+    """
+
+    def __init__(self, request_id: str | None = None):
+        self.request_id = request_id
+        self.started = time.perf_counter()
+        self.stages = {}
+        self.spans = []
+        self.llm_calls = []
+        self._lock = threading.Lock()  # LLM calls report from worker threads
+
+    def add(self, name: str, seconds: float, started: float | None = None) -> None:
+        with self._lock:
+            self.stages[name] = self.stages.get(name, 0.0) + seconds
+            if started is not None:
+                self.spans.append((name, started - self.started, seconds))
+
+    def add_llm_call(self, stats: dict) -> None:
+        with self._lock:
+            self.llm_calls.append(stats)
+
+    def total_seconds(self) -> float:
+        return time.perf_counter() - self.started
+
+    def server_timing_header(self) -> str:
+        """Formats the stages (and the total) as a Server-Timing header value, in milliseconds."""
+        entries = [f"{name};dur={seconds * 1000:.1f}" for name, seconds in self.stages.items()]
+        entries.append(f"total;dur={self.total_seconds() * 1000:.1f}")
+        return ", ".join(entries)
+
+    def to_log_dict(self) -> dict:
+        """The request's spans and LLM statistics, for the structured request log line."""
+        with self._lock:
+            return {
+                "request_id": self.request_id,
+                "duration_ms": round(self.total_seconds() * 1000, 1),
+                "stages_ms": {name: round(seconds * 1000, 1) for name, seconds in self.stages.items()},
+                "spans": [{"stage": name, "start_ms": round(offset * 1000, 1), "duration_ms": round(seconds * 1000, 1)}
+                          for name, offset, seconds in self.spans],
+                "llm": list(self.llm_calls),
+            }
+
+
+def start_request(request_id: str | None = None) -> StageTimer:
+    """Starts a timer for the request handled by the current thread."""
+    _local.timer = StageTimer(request_id)
+    return _local.timer
+
+
+def current() -> StageTimer | None:
+    return getattr(_local, 'timer', None)
+
+
+def end_request() -> StageTimer | None:
+    timer = current()
+    _local.timer = None
+    return timer
+
+
+@contextmanager
+def bind(timer: StageTimer | None):
+    """Makes `timer` the current timer of this thread, e.g. in a worker doing part of a request."""
+    previous = current()
+    _local.timer = timer
+    try:
+        yield timer
+    finally:
+        _local.timer = previous
+
+
+def bind_iterable(iterable, timer: StageTimer | None):
+    """
+    Iterates `iterable` with `timer` bound while each item is produced, e.g. a streamed
+    response body, which is generated after the request's own handler has returned.
+    """
+    iterator = iter(iterable)
+    try:
+        while True:
+            with bind(timer):
+                try:
+                    item = next(iterator)
+                except StopIteration:
+                    return
+            yield item
+    finally:
+        close = getattr(iterator, 'close', None)
+        if close is not None:
+            with bind(timer):
+                close()
+
+
+@contextmanager
+def stage(name: str):
+    """Times a block as stage `name` of the current request; a no-op outside a timed request."""
+    timer = current()
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        if timer is not None:
+            timer.add(name, time.perf_counter() - started, started)